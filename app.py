@@ -1,42 +1,195 @@
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import json
+import time
 import numpy as np
 
-from datetime import datetime
+from datetime import datetime, date, timedelta
 
 
 # Import utility modules
-from utils.data_validator import validate_inputs, validate_number_plate
-from utils.inventory_manager import InventoryManager
-from utils.service_center import ServiceCenter
-from utils.model_predictor import predict_service_time
+from utils.data_validator import parse_service_request, validate_service_requests
+from utils.inventory_manager import SERVICE_REQUIREMENTS
+from utils.center_registry import CenterRegistry, InvalidCenterError, UnknownCenterError, DEFAULT_CENTER_ID
+from utils.admission import AdmissionController
+from utils.event_stream import StreamSlots
+from utils.drift_monitor import DriftMonitor, load_reference
+from utils.tiered_predictor import TieredPredictor, CircuitBreaker, load_model_predictor
+from utils.model_predictor import ServiceTimePredictor, LookupServiceTimePredictor
 from utils.helpers import generate_service_id
+from utils.service_store import ServiceStore
+from utils.metrics import MetricsRegistry
+from utils.queue_forecast import forecast_completion
+from utils.assets import AssetPipeline
+from utils.booking import SlotUnavailableError, MAX_SEARCH_DAYS, BOOKING_HORIZON_DAYS, format_minute, parse_minute
+from utils.warmup import Warmup, SAMPLE_REQUEST, WARMUP_HEADER
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
 # Enable CORS for all routes
 CORS(app)
 
-# Initialize service components
-service_center = ServiceCenter(total_workers=8)
-inventory_manager = InventoryManager('inventory.json')
+# Render's proxy appends the client address to X-Forwarded-For. Only the hops
+# our own proxies add can be trusted, so request.remote_addr is taken from
+# the right-hand end; anything further left is whatever the client sent.
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 1))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
+
+# Fingerprinted, precompressed static files (built by `python -m utils.assets`)
+assets = AssetPipeline(app)
+
+# Persistent record of every booking
+service_store = ServiceStore(os.environ.get('SERVICE_DB_PATH', 'data/service_jobs.db'))
+
+def record_transition(service_id, status, at):
+    """Mirror queue lifecycle changes (in service, done, expired) into the store"""
+    try:
+        service_store.update_status(service_id, status, completed_at=None if status in ('in_service', 'overdue') else at)
+    except Exception as e:
+        print(f"Error recording {status} for {service_id}: {e}")
+
+# Initialize service components: each center gets its own bays, queue,
+# inventory and live queue feed, loaded on first use
+center_registry = CenterRegistry(
+    default_inventory_file='inventory.json',
+    inventory_dir=os.environ.get('CENTER_INVENTORY_DIR', 'inventories'),
+    config_file=os.environ.get('CENTER_CONFIG_FILE', 'centers.json'),
+    max_loaded=int(os.environ.get('MAX_LOADED_CENTERS', 256)),
+    on_transition=record_transition,
+    load_appointments=lambda center_id: service_store.get_appointments(center_id, date.today().isoformat())
+)
+
+# Request/stage latency metrics; set METRICS_MULTIPROC_DIR under gunicorn so
+# /metrics merges every worker's numbers
+metrics = MetricsRegistry(os.environ.get('METRICS_MULTIPROC_DIR'))
+
+# Trained model first, heuristic whenever the model is missing, slow or failing
+MODEL_PATH = os.environ.get('MODEL_PATH', 'models/volvo_service_predictor.pkl')
+predictor = TieredPredictor(
+    # Shared mode serves the memory-mapped export, so workers share one copy of the weights
+    primary=load_model_predictor(
+        MODEL_PATH, shared=os.environ.get('SHARED_MODEL_WEIGHTS', 'True').lower() == 'true'),
+    # The table-driven heuristic gives the same estimates with fewer operations
+    fallback=LookupServiceTimePredictor() if os.environ.get('HEURISTIC_LOOKUP', 'True').lower() == 'true'
+    else ServiceTimePredictor(),
+    budget_ms=float(os.environ.get('PREDICTION_BUDGET_MS', 25)),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get('PREDICTION_BREAKER_FAILURES', 5)),
+        reset_seconds=float(os.environ.get('PREDICTION_BREAKER_RESET_SECONDS', 30))
+    )
+)
+
+# Live accuracy (from real completion times) and input drift against the
+# feature histograms saved with the trained model; merged across workers
+# through the metrics directory
+drift_monitor = DriftMonitor(
+    load_reference(MODEL_PATH) if os.path.exists(MODEL_PATH) else None,
+    window=int(os.environ.get('DRIFT_WINDOW', 1000)),
+    state_dir=os.environ.get('METRICS_MULTIPROC_DIR')
+)
+
+# Load shedding for the expensive routes; cheap ones (health, tasks, static)
+# are never held back. Keep max concurrent + queue below gunicorn's threads.
+admission = AdmissionController(
+    rate=float(os.environ.get('ADMISSION_RATE', 5)),
+    burst=int(os.environ.get('ADMISSION_BURST', 20)),
+    max_concurrent=int(os.environ.get('ADMISSION_MAX_CONCURRENT', 4)),
+    max_queue=int(os.environ.get('ADMISSION_MAX_QUEUE', 2)),
+    max_wait=float(os.environ.get('ADMISSION_MAX_WAIT_SECONDS', 0.25)),
+    stall_seconds=float(os.environ.get('ADMISSION_STALL_SECONDS', 5))
+)
+ADMITTED_ENDPOINTS = {'predict', 'quote', 'quote_batch', 'search_slots', 'book_appointment'}
+
+# Each open event stream holds a gthread worker thread; keep streams plus
+# admitted requests below gunicorn's --threads
+stream_slots = StreamSlots(int(os.environ.get('STREAM_MAX_SUBSCRIBERS', 6)))
+STREAM_RETRY_AFTER = 30
+
+# Quotes reflect live queue and stock, so caches may only reuse them briefly
+QUOTE_MAX_AGE = 15
+MAX_QUOTE_BATCH = int(os.environ.get('MAX_QUOTE_BATCH', 500))
 
 # Debug: Print available models
 print("=== VOLVO SERVICE PREDICTOR STARTED ===")
-print("Available car models in inventory:", inventory_manager.get_available_models())
+print("Available car models in inventory:", center_registry.get(DEFAULT_CENTER_ID).inventory_manager.get_available_models())
 print("========================================")
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def admit_request():
+    """Shed load on expensive routes before any parsing or center lookup"""
+    if request.endpoint not in ADMITTED_ENDPOINTS:
+        return None
+    ticket, rejection = admission.admit(request.remote_addr)
+    if rejection is not None:
+        metrics.inc('admission_rejections_total', route=request.endpoint, reason=rejection.reason)
+        response = jsonify({
+            'success': False,
+            'error': 'Too many requests' if rejection.status == 429 else 'Service busy, please retry',
+            'reason': rejection.reason
+        })
+        response.status_code = rejection.status
+        response.headers['Retry-After'] = str(rejection.retry_after)
+        return response
+    g.admission_ticket = ticket
+
+@app.teardown_request
+def release_admission(error=None):
+    ticket = g.pop('admission_ticket', None)
+    if ticket is not None:
+        admission.release(ticket)
+
+def use_center(center_id):
+    """The center's partition, held against eviction until the request ends"""
+    center = center_registry.acquire(center_id)
+    g.setdefault('held_centers', []).append(center)
+    return center
+
+@app.teardown_request
+def release_centers(error=None):
+    for center in g.pop('held_centers', ()):
+        center_registry.release(center)
+
+@app.before_request
+def resolve_center():
+    """Route the request to its center's partition (query, header or JSON body)"""
+    center_id = request.args.get('center_id') or request.headers.get('X-Center-ID')
+    if not center_id and request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            center_id = body.get('center_id')
+    try:
+        g.center = use_center(center_id)
+    except InvalidCenterError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except UnknownCenterError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    # Synthetic warm-up traffic would skew the first latency buckets
+    if start is not None and WARMUP_HEADER not in request.headers:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - start,
+                        route=route, method=request.method)
+        metrics.inc('http_requests_total', route=route, method=request.method,
+                    status=response.status_code)
+        metrics.maybe_flush()
+        drift_monitor.maybe_flush()
+    return response
+
 @app.route('/')
 def index():
     """Main page with input form"""
     return render_template('index.html')
 
-@app.route('/static/<path:path>')
-def serve_static(path):
-    return send_from_directory('static', path)
-
 @app.route('/predict', methods=['POST'])
 def predict():
     """Predict service time endpoint"""
@@ -50,67 +203,45 @@ def predict():
                 'error': 'No data received'
             }), 400
         
-        # Validate inputs
-        validation_result = validate_inputs(data)
-        if not validation_result['valid']:
+        # Parse and validate the payload in one pass
+        with metrics.time_stage('/predict', 'validation'):
+            parsed = parse_service_request(data)
+        if not parsed['valid']:
             return jsonify({
                 'success': False,
-                'error': validation_result['error']
-            }), 400
-        
-        # Validate number plate format
-        if not validate_number_plate(data['car_number_plate']):
-            return jsonify({
-                'success': False,
-                'error': 'Invalid car number plate format. Use format like MH12AB1234'
-            }), 400
-        
-        # Validate that at least one task is selected
-        selected_tasks = data.get('selected_tasks', [])
-        if not selected_tasks:
-            return jsonify({
-                'success': False,
-                'error': 'Please select at least one service task'
+                'error': parsed['error']
             }), 400
+        service_request = parsed['request']
         
         # Generate service ID
         service_id = generate_service_id()
         
+        center = g.center
+        
         # Get current queue info
-        queue_info = service_center.get_queue_info()
+        with metrics.time_stage('/predict', 'get_queue_info'):
+            queue_info = center.service_center.get_queue_info()
         
         # Prepare features for ML prediction
-        selected_tasks = data.get('selected_tasks', [])
-        number_of_tasks = len(selected_tasks)
-        
-        features = {
-            'car_model': data['car_model'],
-            'manufacture_year': int(data['manufacture_year']),
-            'fuel_type': data['fuel_type'],
-            'service_type': data['service_type'],
-            'last_service_days': int(data['last_service_days']),
-            'total_kilometers': int(data['total_kilometers']),
-            'km_since_last_service': int(data['km_since_last_service']),
-            'number_of_tasks': number_of_tasks,
-            'worker_availability': queue_info['worker_availability'],
-            'selected_tasks': selected_tasks
-        }
+        features = service_request.to_features(queue_info['worker_availability'])
         
         # Predict service time
-        predicted_time = predict_service_time(features)
-        
-        # Calculate additional metrics
-        workload_percentage = queue_info['workload_percentage']
-        queue_position = service_center.add_to_queue(service_id)
+        with metrics.time_stage('/predict', 'predict_service_time'):
+            predicted_time, prediction_tier, fallback_reason = predictor.predict(features)
+        metrics.inc('predictions_total', route='/predict', tier=prediction_tier,
+                    reason=fallback_reason or 'none')
+        drift_monitor.observe_features(features)
         
         # Check parts availability based on selected tasks
-        parts_availability = inventory_manager.check_parts_availability_for_tasks(
-            data['car_model'], 
-            data['service_type'], 
-            selected_tasks
-        )
+        with metrics.time_stage('/predict', 'check_parts_availability'):
+            parts_availability = center.inventory_manager.check_parts_availability_for_tasks(
+                service_request.car_model, 
+                service_request.service_type, 
+                service_request.selected_tasks
+            )
         
-        # Determine workload level
+        # Calculate additional metrics
+        workload_percentage = queue_info['workload_percentage']
         if workload_percentage < 40:
             workload_level = "Low"
         elif workload_percentage < 70:
@@ -118,23 +249,48 @@ def predict():
         else:
             workload_level = "High"
         
+        # Enqueue last: anything that can fail has run, so a client that
+        # gets an error never leaves a job in the queue
+        with metrics.time_stage('/predict', 'add_to_queue'):
+            queue_position = center.service_center.add_to_queue(service_id, float(predicted_time))
+        
+        # Persist the booking; a storage hiccup shouldn't lose the customer's quote
+        with metrics.time_stage('/predict', 'persist'):
+            try:
+                # A free bay may already have taken the job
+                live_job = center.service_center.get_job(service_id)
+                service_store.record_service(
+                    service_id,
+                    service_request.car_number_plate,
+                    features,
+                    float(predicted_time),
+                    parts_availability,
+                    int(queue_position),
+                    status=live_job['status'] if live_job else 'waiting',
+                    center_id=center.center_id
+                )
+            except Exception as e:
+                print(f"Error recording service {service_id}: {e}")
+        
         # Prepare response
         response = {
             'success': True,
             'service_id': service_id,
             'predicted_service_time': float(predicted_time),
+            'prediction_tier': prediction_tier,
             'workload_percentage': float(workload_percentage),
             'workload_level': workload_level,
             'queue_position': int(queue_position),
             'parts_availability': parts_availability,
-            'car_model': data['car_model'],
-            'car_number_plate': data['car_number_plate'],
-            'last_service_days': int(data['last_service_days']),
-            'selected_tasks': selected_tasks,
-            'number_of_tasks': number_of_tasks
+            'car_model': service_request.car_model,
+            'car_number_plate': service_request.car_number_plate,
+            'last_service_days': service_request.last_service_days,
+            'selected_tasks': service_request.selected_tasks,
+            'number_of_tasks': service_request.number_of_tasks
         }
         
-        return jsonify(response)
+        with metrics.time_stage('/predict', 'serialization'):
+            return jsonify(response)
         
     except Exception as e:
         return jsonify({
@@ -142,24 +298,545 @@ def predict():
             'error': f'Prediction failed: {str(e)}'
         }), 500
 
+@app.route('/quote')
+def quote():
+    """Read-only estimate for the booking form: no ID, no queue slot, nothing stored"""
+    try:
+        data = request.args.to_dict()
+        # selected_tasks may be repeated, comma-separated, or both
+        data['selected_tasks'] = [
+            task for value in request.args.getlist('selected_tasks')
+            for task in value.split(',') if task
+        ]
+        
+        parsed = parse_service_request(data, require_plate=False)
+        if not parsed['valid']:
+            return jsonify({
+                'success': False,
+                'error': parsed['error']
+            }), 400
+        service_request = parsed['request']
+        
+        center = g.center
+        queue_info = center.service_center.get_queue_info()
+        features = service_request.to_features(queue_info['worker_availability'])
+        workload_percentage = queue_info['workload_percentage']
+        predicted_time, prediction_tier, fallback_reason = predictor.quote(features)
+        metrics.inc('predictions_total', route='/quote', tier=prediction_tier,
+                    reason=fallback_reason or 'none')
+        
+        if workload_percentage < 40:
+            workload_level = "Low"
+        elif workload_percentage < 70:
+            workload_level = "Medium"
+        else:
+            workload_level = "High"
+        
+        response = jsonify({
+            'success': True,
+            'predicted_service_time': float(predicted_time),
+            'prediction_tier': prediction_tier,
+            'parts_availability': center.inventory_manager.parts_status_for_tasks(
+                service_request.car_model,
+                service_request.selected_tasks
+            ),
+            'workload_percentage': float(workload_percentage),
+            'workload_level': workload_level,
+            'queue_length': queue_info['queue_length'],
+            'center_id': center.center_id
+        })
+        # Identical inputs and state give identical bodies, so a content
+        # ETag lets the browser revalidate with a 304
+        response.headers['Cache-Control'] = f'public, max-age={QUOTE_MAX_AGE}'
+        response.vary.add('X-Center-ID')
+        response.add_etag()
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Quote failed: {str(e)}'
+        }), 500
+
+@app.route('/quote/batch', methods=['POST'])
+def quote_batch():
+    """Read-only estimates for a list of booking payloads, e.g. a fleet.
+    
+    Rows are validated column-wise; invalid rows are reported by index and
+    don't stop the valid ones from being quoted.
+    """
+    try:
+        data = request.get_json(silent=True)
+        payloads = data.get('requests') if isinstance(data, dict) else None
+        if not isinstance(payloads, list) or not payloads:
+            return jsonify({
+                'success': False,
+                'error': 'requests must be a non-empty list of booking payloads'
+            }), 400
+        if len(payloads) > MAX_QUOTE_BATCH:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_QUOTE_BATCH} requests per batch'
+            }), 400
+        
+        with metrics.time_stage('/quote/batch', 'validation'):
+            validated = validate_service_requests(payloads, require_plate=False)
+        
+        center = g.center
+        queue_info = center.service_center.get_queue_info()
+        quotes = []
+        for row, service_request in validated['requests']:
+            features = service_request.to_features(queue_info['worker_availability'])
+            predicted_time, prediction_tier, fallback_reason = predictor.quote(features)
+            metrics.inc('predictions_total', route='/quote/batch', tier=prediction_tier,
+                        reason=fallback_reason or 'none')
+            quotes.append({
+                'row': row,
+                'predicted_service_time': float(predicted_time),
+                'prediction_tier': prediction_tier,
+                'parts_availability': center.inventory_manager.parts_status_for_tasks(
+                    service_request.car_model,
+                    service_request.selected_tasks
+                )
+            })
+        
+        return jsonify({
+            'success': True,
+            'quotes': quotes,
+            'errors': validated['errors'],
+            'workload_percentage': float(queue_info['workload_percentage']),
+            'queue_length': queue_info['queue_length'],
+            'center_id': center.center_id
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Quote failed: {str(e)}'
+        }), 500
+
 @app.route('/api/inventory')
 def get_inventory():
     """Get current inventory status"""
     try:
-        inventory = inventory_manager.get_inventory_status()
+        inventory = g.center.inventory_manager.get_inventory_status()
         return jsonify(inventory)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/inventory/low-stock')
+def low_stock_parts():
+    """All parts at or below their reorder threshold (optionally for one model)"""
+    try:
+        parts = g.center.inventory_manager.get_low_stock_parts(request.args.get('car_model'))
+        return jsonify({'count': len(parts), 'parts': parts})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory/capability')
+def service_capability():
+    """Which models can take a given service type with current stock"""
+    try:
+        service_type = request.args.get('service_type', '')
+        if service_type not in SERVICE_REQUIREMENTS:
+            return jsonify({
+                'error': f'Unknown service_type. Use one of: {", ".join(SERVICE_REQUIREMENTS)}'
+            }), 400
+        models = g.center.inventory_manager.get_service_capability(service_type)
+        return jsonify({
+            'service_type': service_type,
+            'capable_models': [model for model, status in models.items() if status['capable']],
+            'models': models
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/inventory/projections')
+def stock_projections():
+    """Projected days to stock-out and reorder suggestions from running usage rates"""
+    try:
+        lead_time_days = float(request.args.get('lead_time_days', 7))
+        cover_days = float(request.args.get('cover_days', 14))
+        projections = g.center.inventory_manager.get_stock_projections(
+            request.args.get('car_model'), lead_time_days, cover_days
+        )
+        return jsonify({'lead_time_days': lead_time_days, 'cover_days': cover_days, 'parts': projections})
+    except ValueError:
+        return jsonify({'error': 'Invalid lead_time_days or cover_days'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/system/status')
 def system_status():
     """Get system status and queue information"""
     try:
-        queue_info = service_center.get_queue_info()
+        queue_info = g.center.service_center.get_queue_info()
         return jsonify(queue_info)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/system/stream')
+def system_stream():
+    """Server-Sent Events stream of queue and workload changes"""
+    if not stream_slots.acquire():
+        response = jsonify({'error': 'Too many live streams open; poll /api/system/status instead'})
+        response.headers['Retry-After'] = str(STREAM_RETRY_AFTER)
+        return response, 503
+    
+    response = Response(
+        stream_with_context(g.center.queue_events.stream()),
+        mimetype='text/event-stream'
+    )
+    # Runs when the client disconnects, even if the stream never started
+    response.call_on_close(stream_slots.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/queue/forecast')
+def queue_forecast():
+    """P50/P90 completion times for every queued job and the whole bay"""
+    try:
+        trials = min(max(int(request.args.get('trials', 10000)), 100), 100000)
+        seed = request.args.get('seed')
+        service_center = g.center.service_center
+        live_jobs = service_center.get_jobs()
+        jobs = [job for job in live_jobs if job['status'] == 'waiting']
+        in_service = sum(job['status'] == 'in_service' for job in live_jobs)
+        start = time.perf_counter()
+        forecast = forecast_completion(
+            [job.get('predicted_time') for job in jobs],
+            service_center.total_workers,
+            busy_workers=service_center.current_workload + in_service,
+            trials=trials,
+            seed=int(seed) if seed is not None else None
+        )
+        for job, job_forecast in zip(jobs, forecast['jobs']):
+            job_forecast['service_id'] = job['service_id']
+        forecast['trials'] = trials
+        forecast['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        return jsonify(forecast)
+    except ValueError:
+        return jsonify({'error': 'Invalid trials or seed parameter'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/service/<service_id>')
+def get_service(service_id):
+    """Look up a booking by service ID"""
+    try:
+        job = service_store.get_service(service_id)
+        if job is None:
+            return jsonify({'error': 'Service not found'}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/service/<service_id>/start', methods=['POST'])
+def start_service(service_id):
+    """Put a waiting job in a bay now, ahead of the simulated schedule"""
+    try:
+        job = service_store.get_service(service_id)
+        center = use_center(job['center_id']) if job else g.center
+        
+        with center.lock:
+            started = center.service_center.start_service(service_id)
+        if not started:
+            if job is None:
+                return jsonify({'error': 'Service not found'}), 404
+            live_job = center.service_center.get_job(service_id)
+            if live_job is not None or job['status'] != 'waiting':
+                status = live_job['status'] if live_job is not None else job['status']
+                return jsonify({'error': f'Service is {status}, not waiting'}), 409
+            # Queued by another worker; the store is still the source of truth
+            service_store.update_status(service_id, 'in_service')
+        
+        return jsonify({
+            'success': True,
+            'service_id': service_id,
+            'status': 'in_service'
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/service/<service_id>/complete', methods=['POST'])
+def complete_service(service_id):
+    """Mark a job done, free its bay and (by default) take the parts it used out of stock"""
+    try:
+        data = request.get_json(silent=True) or {}
+        job = service_store.get_service(service_id)
+        center = use_center(job['center_id']) if job else g.center
+        
+        with center.lock:
+            record = center.service_center.complete_service(service_id)
+        if job is None and record is None:
+            return jsonify({'error': 'Service not found'}), 404
+        
+        # Real durations only: the body's actual_hours, or the bay time this worker saw
+        actual_hours = data.get('actual_hours')
+        if actual_hours is None and record is not None and record['started_at'] is not None:
+            actual_hours = (record['finished_at'] - record['started_at']) / 3600
+        if record is None:
+            # Not live in this worker's queue (already finished, or queued by
+            # another worker); the store is still the source of truth
+            if job['status'] == 'done':
+                return jsonify({'error': 'Service already completed'}), 409
+            service_store.complete_service(service_id)
+        
+        # Recorded only once the completion is accepted, so retries aren't counted twice
+        predicted_hours = record['predicted_time'] if record is not None else job['predicted_time']
+        if actual_hours is not None and predicted_hours is not None and float(actual_hours) > 0:
+            drift_monitor.observe_outcome(float(predicted_hours), float(actual_hours))
+        
+        parts_consumed = {}
+        if job is not None and data.get('consume_parts', True):
+            features = job['features']
+            with center.lock:
+                parts_consumed = center.inventory_manager.consume_parts_for_tasks(
+                    features.get('car_model', ''), features.get('selected_tasks', [])
+                )
+        
+        return jsonify({
+            'success': True,
+            'service_id': service_id,
+            'status': 'done',
+            'parts_consumed': parts_consumed
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/monitoring/drift')
+def drift_report():
+    """Rolling prediction error and per-feature drift (PSI) against the training data"""
+    try:
+        return jsonify(drift_monitor.report())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/queue/history')
+def queue_history():
+    """Recently finished or expired jobs for this center, newest first"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        history = g.center.service_center.recent_history(limit)
+        for job in history:
+            for key in ('enqueued_at', 'started_at', 'finished_at'):
+                if job[key] is not None:
+                    job[key] = datetime.fromtimestamp(job[key]).isoformat()
+        return jsonify({'count': len(history), 'jobs': history})
+    except ValueError:
+        return jsonify({'error': 'Invalid limit parameter'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/vehicle/<plate>/history')
+def vehicle_history(plate):
+    """Service history for a vehicle, newest first"""
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+        before = request.args.get('before')
+        if before:
+            before = datetime.fromisoformat(before).timestamp()
+        history = service_store.get_vehicle_history(plate, limit=limit, before=before)
+        return jsonify({
+            'car_number_plate': plate.strip().upper(),
+            'services': history,
+            'next_before': history[-1]['created_at'] if len(history) == limit else None
+        })
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or before parameter'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def appointment_json(appointment):
+    return {
+        'appointment_id': appointment['appointment_id'],
+        'date': appointment['day'],
+        'bay': appointment['bay'],
+        'start': format_minute(appointment['start']),
+        'end': format_minute(appointment['end']),
+        'car_number_plate': appointment.get('car_number_plate'),
+        'predicted_service_time': appointment.get('predicted_time')
+    }
+
+def parse_booking_day(value):
+    """ISO date within the booking horizon (today if empty); raises ValueError"""
+    today = date.today()
+    day = date.fromisoformat(value) if value else today
+    if day < today or day > today + timedelta(days=BOOKING_HORIZON_DAYS):
+        raise ValueError(f'Date must be between today and {BOOKING_HORIZON_DAYS} days ahead')
+    return day
+
+def earliest_minute(day):
+    """Nothing can start in the past: today's search begins now"""
+    if day == date.today():
+        now = datetime.now()
+        return now.hour * 60 + now.minute
+    return None
+
+def appointment_duration(data, center):
+    """(hours, parsed request or None) from an explicit `hours` or the booking fields"""
+    if data.get('hours') not in (None, ''):
+        hours = float(data['hours'])
+        if not 0 < hours <= 24:
+            raise ValueError('hours must be between 0 and 24')
+        return hours, None
+    parsed = parse_service_request(data, require_plate=False)
+    if not parsed['valid']:
+        raise ValueError(parsed['error'])
+    # A booked appointment has its bay to itself
+    features = parsed['request'].to_features(center.service_center.total_workers)
+    hours, _, _ = predictor.quote(features)
+    return hours, parsed['request']
+
+@app.route('/api/slots')
+def search_slots():
+    """Earliest free slot on each day from `date`, sized by `hours` or the booking fields"""
+    try:
+        data = request.args.to_dict()
+        data['selected_tasks'] = [
+            task for value in request.args.getlist('selected_tasks')
+            for task in value.split(',') if task
+        ]
+        day = parse_booking_day(data.get('date'))
+        days = min(max(int(data.get('days', 1)), 1), MAX_SEARCH_DAYS)
+        hours, _ = appointment_duration(data, g.center)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        bookings = g.center.bookings
+        duration = bookings.duration_minutes(hours)
+        last_day = date.today() + timedelta(days=BOOKING_HORIZON_DAYS)
+        slots = []
+        for offset in range(days):
+            current = day + timedelta(days=offset)
+            if current > last_day:
+                break
+            slot = bookings.earliest_slot(current.isoformat(), duration, earliest_minute(current))
+            if slot:
+                slots.append({
+                    'date': current.isoformat(),
+                    'bay': slot['bay'],
+                    'start': format_minute(slot['start']),
+                    'end': format_minute(slot['end'])
+                })
+        return jsonify({
+            'success': True,
+            'center_id': g.center.center_id,
+            'duration_hours': hours,
+            'duration_minutes': duration,
+            'slots': slots
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/slots/windows')
+def slot_windows():
+    """Every free window on one day, per bay (`min_hours` filters short ones)"""
+    try:
+        day = parse_booking_day(request.args.get('date'))
+        min_minutes = int(float(request.args.get('min_hours', 0)) * 60)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        windows = g.center.bookings.free_windows(day.isoformat(), min_minutes, earliest_minute(day))
+        return jsonify({
+            'success': True,
+            'center_id': g.center.center_id,
+            'date': day.isoformat(),
+            'bays': [
+                {'bay': bay, 'windows': [{'start': format_minute(s), 'end': format_minute(e)} for s, e in free]}
+                for bay, free in windows.items()
+            ]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/appointments', methods=['POST'])
+def book_appointment():
+    """Book a slot: `start` (HH:MM) and `bay` are optional; without `start` the day's earliest slot is taken"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'No data received'}), 400
+    center = g.center
+    try:
+        day = parse_booking_day(data.get('date'))
+        hours, service_request = appointment_duration(data, center)
+        start = parse_minute(data['start']) if data.get('start') else None
+        bay = int(data['bay']) if data.get('bay') not in (None, '') else None
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        bookings = center.bookings
+        duration = bookings.duration_minutes(hours)
+        with center.lock:
+            bookings.drop_before(date.today().isoformat())
+            # Other workers may have booked or cancelled on this day
+            bookings.reload_day(day.isoformat(), service_store.get_appointments_on(center.center_id, day.isoformat()))
+            if start is None:
+                slot = bookings.earliest_slot(day.isoformat(), duration, earliest_minute(day), bay)
+                if slot is None:
+                    return jsonify({'success': False, 'error': f'No free slot of {duration} minutes on {day}'}), 409
+                start, bay = slot['start'], slot['bay']
+            else:
+                bookings.check_window(start, start + duration)
+                if earliest_minute(day) is not None and start < earliest_minute(day):
+                    return jsonify({'success': False, 'error': 'Start time is in the past'}), 400
+            if bay is None:
+                bay = bookings.choose_bay(day.isoformat(), start, start + duration)
+                if bay is None:
+                    return jsonify({'success': False, 'error': f'Every bay is booked at {format_minute(start)}'}), 409
+            bookings.check(day.isoformat(), start, start + duration, bay)
+            
+            appointment = {
+                'appointment_id': generate_service_id(),
+                'day': day.isoformat(),
+                'bay': bay,
+                'start': start,
+                'end': start + duration,
+                'car_number_plate': service_request.car_number_plate if service_request else data.get('car_number_plate'),
+                'features': service_request.to_features(center.service_center.total_workers) if service_request else None,
+                'predicted_time': hours
+            }
+            # The store re-checks inside its transaction, so other workers can't double-book
+            if not service_store.book_appointment(appointment, center_id=center.center_id):
+                return jsonify({'success': False, 'error': 'Slot was just taken'}), 409
+            bookings.add(appointment)
+        return jsonify({'success': True, 'appointment': appointment_json(appointment)}), 201
+    except SlotUnavailableError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/appointments/<appointment_id>', methods=['GET', 'DELETE'])
+def appointment_detail(appointment_id):
+    """Look up or cancel a future appointment"""
+    try:
+        # The store, not this worker's calendar, knows every worker's bookings
+        appointment = service_store.get_appointment(appointment_id)
+        if appointment is None:
+            return jsonify({'error': 'Appointment not found'}), 404
+        if request.method == 'DELETE':
+            center = use_center(appointment['center_id'])
+            with center.lock:
+                if not service_store.cancel_appointment(appointment_id):
+                    return jsonify({'error': 'Appointment not found'}), 404
+                center.bookings.remove(appointment_id)
+            return jsonify({'success': True, 'cancelled': appointment_json(appointment)})
+        return jsonify({'success': True, 'appointment': appointment_json(appointment)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus text-format metrics merged across workers"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/tasks')
 def get_available_tasks():
     """Get available service tasks"""
@@ -209,7 +886,7 @@ def test_route():
         'message': 'Server is running!',
         'timestamp': datetime.now().isoformat(),
         'status': 'OK',
-        'inventory_models': inventory_manager.get_available_models()
+        'inventory_models': g.center.inventory_manager.get_available_models()
     })
 
 @app.route('/health')
@@ -219,11 +896,28 @@ def health_check():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'service': 'Volvo Service Time Predictor',
-        'inventory_models': inventory_manager.get_available_models(),
-        'total_workers': service_center.total_workers,
-        'current_queue': len(service_center.queue)
+        'center_id': g.center.center_id,
+        'inventory_models': g.center.inventory_manager.get_available_models(),
+        'total_workers': g.center.service_center.total_workers,
+        'current_queue': len(g.center.service_center.queue),
+        'loaded_centers': len(center_registry.loaded_centers()),
+        'ready': warmup.ready,
+        'prediction': predictor.status(),
+        'admission': admission.status(),
+        'open_streams': stream_slots.count()
     })
 
+@app.route('/health/live')
+def liveness_check():
+    """Liveness: the process is up and answering"""
+    return jsonify({'status': 'alive', 'timestamp': datetime.now().isoformat()})
+
+@app.route('/health/ready')
+def readiness_check():
+    """Readiness: 503 until warm-up has run, so no traffic pays cold-path costs"""
+    status = warmup.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -259,7 +953,8 @@ def update_inventory():
         if not all([car_model, part_name, new_quantity is not None]):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        success = inventory_manager.update_part_quantity(car_model, part_name, new_quantity)
+        with g.center.lock:
+            success = g.center.inventory_manager.update_part_quantity(car_model, part_name, new_quantity)
         
         if success:
             return jsonify({
@@ -291,7 +986,8 @@ def add_new_part():
         if not all([car_model, part_name, quantity is not None]):
             return jsonify({'error': 'Missing required fields'}), 400
         
-        success = inventory_manager.add_part(car_model, part_name, quantity, min_threshold)
+        with g.center.lock:
+            success = g.center.inventory_manager.add_part(car_model, part_name, quantity, min_threshold)
         
         if success:
             return jsonify({
@@ -303,6 +999,61 @@ def add_new_part():
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+# Warm-up: push synthetic work through every hot path before taking traffic
+warmup = Warmup()
+
+def warmup_steps():
+    """(name, fn) pairs that load lazy state and fill caches on each hot path"""
+    tasks = SAMPLE_REQUEST['selected_tasks']
+    headers = {WARMUP_HEADER: '1'}
+    client = app.test_client()
+    
+    def inventory():
+        center = center_registry.get(DEFAULT_CENTER_ID)
+        for car_model in center.inventory_manager.get_available_models():
+            center.inventory_manager.parts_status_for_tasks(car_model, tasks)
+        center.inventory_manager.get_low_stock_parts()
+    
+    def prediction():
+        parsed = parse_service_request(dict(SAMPLE_REQUEST), require_plate=False)
+        if not parsed['valid']:
+            raise ValueError(parsed['error'])
+        features = parsed['request'].to_features(1.0)
+        predictor.predict(features)
+        predictor.quote(features)
+    
+    def store():
+        service_store.get_service('warmup')
+    
+    def endpoint(path, **params):
+        def get():
+            response = client.get(path, query_string=params, headers=headers)
+            if response.status_code >= 500:
+                raise RuntimeError(f'{path} returned {response.status_code}')
+        return get
+    
+    quote_params = {k: v for k, v in SAMPLE_REQUEST.items() if k != 'selected_tasks'}
+    return [
+        ('inventory', inventory),
+        ('prediction', prediction),
+        ('store', store),
+        ('GET /', endpoint('/')),
+        ('GET /quote', endpoint('/quote', selected_tasks=','.join(tasks), **quote_params)),
+        ('GET /api/inventory', endpoint('/api/inventory')),
+        ('GET /api/system/status', endpoint('/api/system/status')),
+        ('GET /api/queue/forecast', endpoint('/api/queue/forecast', trials=200)),
+    ]
+
+def finish_warmup(duration):
+    metrics.set_gauge('warmup_duration_seconds', duration)
+
+if os.environ.get('WARMUP', '1') == '0':
+    warmup.ready = True
+elif os.environ.get('WARMUP_ASYNC', 'False').lower() == 'true':
+    warmup.run_in_background(warmup_steps(), on_done=finish_warmup)
+else:
+    finish_warmup(warmup.run(warmup_steps()))
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('DEBUG', 'False').lower() == 'true'
@@ -0,0 +1,195 @@
+"""Synthetic Volvo service-time dataset generator.
+
+Produces rows in the schema models/train_model.py trains on, with the
+target computed by the same factors as ServiceTimePredictor plus noise.
+Everything is vectorised per chunk, so memory stays bounded by the chunk
+size no matter how many rows are written:
+
+    python -m data.generate_dataset --rows 10000000 --seed 42 \\
+        --output data/volvo_service_time_india_10m.csv
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.model_predictor import (
+    SERVICE_TYPE_TIMES, TASK_TIMES, CURRENT_YEAR,
+    DATASET_SERVICE_TYPES, DATASET_FUEL_TYPES, DATASET_CAR_MODELS,
+    DATASET_PARTS_AVAILABILITY, adjustment_factors
+)
+
+COLUMNS = [
+    'Car_Model', 'Manufacture_Year', 'Fuel_Type', 'Service_Type',
+    'Last_Service_Days_Ago', 'Total_Kms', 'Km_From_Last_Service',
+    'Parts_Availability', 'Worker_Availability', 'No_Of_Tasks',
+    'Service_Time_Hours'
+]
+
+CAR_MODELS = list(DATASET_CAR_MODELS)
+CAR_MODEL_WEIGHTS = [0.20, 0.28, 0.24, 0.10, 0.06, 0.12]
+
+SERVICE_TYPES = list(DATASET_SERVICE_TYPES)
+SERVICE_TYPE_WEIGHTS = [0.35, 0.20, 0.25, 0.12, 0.08]
+
+FUEL_TYPES = list(DATASET_FUEL_TYPES)
+FUEL_TYPE_WEIGHTS = [0.45, 0.30, 0.15, 0.10]
+
+# Waiting on parts stretches the job; the heuristic has no equivalent input
+PARTS_AVAILABILITY = list(DATASET_PARTS_AVAILABILITY)
+PARTS_AVAILABILITY_WEIGHTS = [0.60, 0.30, 0.10]
+PARTS_DELAY_FACTORS = [1.0, 1.1, 1.3]
+
+MIN_MANUFACTURE_YEAR = 2010
+MAX_TASKS = 10
+MAX_WORKERS = 20
+MIN_SERVICE_HOURS = 0.5
+
+DEFAULT_CHUNK_SIZE = 250000
+
+
+def _categorical(rng, size, weights):
+    """Category codes drawn with the given weights"""
+    cumulative = np.cumsum(weights)
+    return np.searchsorted(cumulative / cumulative[-1], rng.random(size), side='right').astype(np.int8)
+
+
+def generate_chunk(rng, size, noise_sigma=0.1, jitter=0.2):
+    """One DataFrame of `size` synthetic rows.
+
+    Car age, mileage and service interval are correlated the way they are
+    on the road: older cars have more kilometres, and the distance since the
+    last service grows with the days since it. The target starts from
+    max(service base time, summed task times). It is then scaled by
+    adjustment_factors and the parts delay. Finally it gets mean-preserving
+    log-normal noise with sigma `noise_sigma` and a uniform +/- `jitter`
+    hours, like the live heuristic.
+    """
+    model_codes = _categorical(rng, size, CAR_MODEL_WEIGHTS)
+    fuel_codes = _categorical(rng, size, FUEL_TYPE_WEIGHTS)
+    service_codes = _categorical(rng, size, SERVICE_TYPE_WEIGHTS)
+    parts_codes = _categorical(rng, size, PARTS_AVAILABILITY_WEIGHTS)
+
+    # Skew towards recent cars: age ~ exponential, capped at the oldest year
+    max_age = CURRENT_YEAR - MIN_MANUFACTURE_YEAR
+    age = np.minimum(rng.exponential(4.0, size).astype(np.int16), max_age)
+    manufacture_year = (CURRENT_YEAR - age).astype(np.int16)
+
+    # ~12,000 km a year with a wide spread between drivers
+    yearly_km = rng.lognormal(np.log(12000), 0.45, size)
+    total_kms = ((age + rng.random(size)) * yearly_km).astype(np.int32)
+
+    last_service_days = np.minimum(rng.gamma(2.0, 110.0, size), 3650).astype(np.int16)
+    km_from_last_service = np.minimum(
+        last_service_days * yearly_km / 365 * rng.uniform(0.7, 1.3, size), total_kms
+    ).astype(np.int32)
+
+    worker_availability = rng.integers(1, MAX_WORKERS + 1, size, dtype=np.int8)
+    number_of_tasks = np.minimum(rng.poisson(2.5, size) + 1, MAX_TASKS).astype(np.int8)
+
+    # Summed task hours: draw MAX_TASKS task picks per row, keep the first n
+    task_hours = np.fromiter(TASK_TIMES.values(), dtype=np.float32)
+    picks = rng.integers(0, len(task_hours), (size, MAX_TASKS), dtype=np.int8)
+    kept = np.arange(MAX_TASKS, dtype=np.int8) < number_of_tasks[:, None]
+    task_time = (task_hours[picks] * kept).sum(axis=1)
+
+    service_hours = np.array([SERVICE_TYPE_TIMES[s] for s in SERVICE_TYPES], dtype=np.float32)
+    hours = np.maximum(service_hours[service_codes], task_time)
+    hours *= adjustment_factors(
+        manufacture_year, total_kms, last_service_days, number_of_tasks, worker_availability
+    )
+    hours *= np.asarray(PARTS_DELAY_FACTORS, dtype=np.float32)[parts_codes]
+    if noise_sigma:
+        hours *= np.exp(rng.normal(-0.5 * noise_sigma ** 2, noise_sigma, size))
+    if jitter:
+        hours += rng.uniform(-jitter, jitter, size)
+    hours = np.round(np.maximum(hours, MIN_SERVICE_HOURS), 2)
+
+    def labels(names, codes):
+        return pd.Categorical.from_codes(codes, categories=names)
+
+    return pd.DataFrame({
+        'Car_Model': labels(CAR_MODELS, model_codes),
+        'Manufacture_Year': manufacture_year,
+        'Fuel_Type': labels([DATASET_FUEL_TYPES[f] for f in FUEL_TYPES], fuel_codes),
+        'Service_Type': labels([DATASET_SERVICE_TYPES[s] for s in SERVICE_TYPES], service_codes),
+        'Last_Service_Days_Ago': last_service_days,
+        'Total_Kms': total_kms,
+        'Km_From_Last_Service': km_from_last_service,
+        'Parts_Availability': labels(PARTS_AVAILABILITY, parts_codes),
+        'Worker_Availability': worker_availability,
+        'No_Of_Tasks': number_of_tasks,
+        'Service_Time_Hours': hours
+    }, columns=COLUMNS)
+
+
+def iter_chunks(rows, chunk_size=DEFAULT_CHUNK_SIZE, seed=42, **options):
+    """Yield DataFrames totalling `rows` rows.
+
+    Chunk i draws from its own generator seeded with (seed, i). The same
+    seed and chunk size therefore always give the same file.
+    """
+    for index, start in enumerate(range(0, rows, chunk_size)):
+        rng = np.random.default_rng([seed, index])
+        yield generate_chunk(rng, min(chunk_size, rows - start), **options)
+
+
+def write_dataset(output, rows, chunk_size=DEFAULT_CHUNK_SIZE, seed=42, file_format=None, **options):
+    """Stream the dataset to CSV or Parquet, one chunk at a time"""
+    file_format = file_format or ('parquet' if output.endswith('.parquet') else 'csv')
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    writer = None
+    written = 0
+    try:
+        for chunk in iter_chunks(rows, chunk_size, seed, **options):
+            if file_format == 'parquet':
+                try:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                except ImportError:
+                    raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(output, mode='w' if written == 0 else 'a',
+                             header=written == 0, index=False)
+            written += len(chunk)
+            print(f"  {written:,}/{rows:,} rows")
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Volvo service-time dataset')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--output', default='data/volvo_service_time_india_10k.csv')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default=None,
+                        help='defaults to the output file extension')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--noise-sigma', type=float, default=0.1,
+                        help='sigma of the multiplicative log-normal noise')
+    parser.add_argument('--jitter', type=float, default=0.2,
+                        help='uniform +/- hours added after scaling')
+    args = parser.parse_args()
+
+    print(f"🚗 Generating {args.rows:,} rows -> {args.output}")
+    start = time.perf_counter()
+    written = write_dataset(
+        args.output, args.rows, args.chunk_size, args.seed, args.format,
+        noise_sigma=args.noise_sigma, jitter=args.jitter
+    )
+    elapsed = time.perf_counter() - start
+    print(f"✅ Wrote {written:,} rows in {elapsed:.1f}s ({written / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+if __name__ == '__main__':
+    main()
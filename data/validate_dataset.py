@@ -0,0 +1,87 @@
+"""Validate and clean a service-time dataset before training.
+
+Applies the same rules as the booking validator (year range, non-negative
+km and days, task-count limits, known categories) to whole columns, one
+chunk at a time, so memory stays bounded by the chunk size:
+
+    python -m data.validate_dataset data/volvo_service_time_india_10m.csv \\
+        --output data/volvo_service_time_india_10m_clean.csv --report report.json
+
+Prints how many rows break each rule and writes the surviving rows.
+Exits non-zero if --max-dropped is given and more rows than that share
+were dropped.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from utils.data_validator import (
+    DATASET_CATEGORIES, validate_dataset, merge_dataset_reports, format_dataset_report
+)
+
+DEFAULT_CHUNK_SIZE = 500000
+
+
+def iter_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """DataFrame chunks of a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet input needs pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+    # Reading labels as categories parses each distinct string once
+    yield from pd.read_csv(path, chunksize=chunk_size,
+                           dtype={column: 'category' for column in DATASET_CATEGORIES})
+
+
+def clean_dataset(path, output=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Validate `path` chunk by chunk, appending clean rows to `output` (CSV). Returns the merged report."""
+    if output and os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    reports = []
+    for chunk in iter_chunks(path, chunk_size):
+        clean, report = validate_dataset(chunk)
+        if output:
+            clean.to_csv(output, mode='w' if not reports else 'a', header=not reports, index=False)
+        reports.append(report)
+        print(f"  {sum(r['rows'] for r in reports):,} rows checked")
+    return merge_dataset_reports(reports)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate and clean a service-time dataset')
+    parser.add_argument('input', help='CSV or Parquet dataset')
+    parser.add_argument('--output', help='CSV file for the clean rows (omit to only report)')
+    parser.add_argument('--report', help='also write the per-rule report as JSON')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--max-dropped', type=float, default=None,
+                        help='fail if more than this fraction of rows is dropped')
+    args = parser.parse_args()
+
+    print(f"🔍 Validating {args.input}")
+    start = time.perf_counter()
+    report = clean_dataset(args.input, args.output, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    print(format_dataset_report(report))
+    print(f"⏱️  {report['rows']:,} rows in {elapsed:.1f}s ({report['rows'] / max(elapsed, 1e-9):,.0f} rows/s)")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    dropped = report['dropped_rows'] / max(report['rows'], 1)
+    if args.max_dropped is not None and dropped > args.max_dropped:
+        print(f"❌ Dropped {dropped:.1%} of rows, more than {args.max_dropped:.1%}")
+        sys.exit(1)
+    print("✅ Dataset validated")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+"""Gunicorn hooks that keep the shared metrics directory in step with the workers.
+
+The directory holds both metric snapshots and drift-monitor state.
+
+    gunicorn app:app --config gunicorn.conf.py ...
+"""
+import os
+
+from utils.drift_monitor import clear_drift_states, remove_drift_state
+from utils.metrics import clear_multiproc_dir, mark_process_dead
+
+
+def on_starting(server):
+    """Start each run with an empty METRICS_MULTIPROC_DIR"""
+    multiproc_dir = os.environ.get('METRICS_MULTIPROC_DIR')
+    if multiproc_dir:
+        clear_multiproc_dir(multiproc_dir)
+        clear_drift_states(multiproc_dir)
+
+
+def child_exit(server, worker):
+    """Archive an exited worker's counters and histograms; drop its gauges and drift state"""
+    multiproc_dir = os.environ.get('METRICS_MULTIPROC_DIR')
+    if multiproc_dir:
+        mark_process_dead(worker.pid, multiproc_dir)
+        remove_drift_state(worker.pid, multiproc_dir)
@@ -0,0 +1,104 @@
+import time
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+DEFAULT_TREE_COUNTS = (25, 50, 100, 200)
+DEFAULT_DEPTHS = (4, 3)
+
+
+def effective_rounds(model):
+    """Boosting rounds the model actually predicts with (best_iteration + 1 after early stopping)"""
+    best_iteration = getattr(model, 'best_iteration', None)
+    rounds = model.get_booster().num_boosted_rounds()
+    return rounds if best_iteration is None else min(best_iteration + 1, rounds)
+
+
+def truncate(model, n_trees):
+    """A standalone XGBRegressor holding only the first `n_trees` boosting rounds.
+
+    Slicing the booster copies just those trees. Round-tripping the slice
+    through its raw bytes gives a model that is smaller on disk and in
+    memory, not a view that still carries every tree.
+    """
+    booster = model.get_booster()[:min(n_trees, effective_rounds(model))]
+    variant = xgb.XGBRegressor()
+    variant.load_model(bytearray(booster.save_raw('ubj')))
+    return variant
+
+
+def train_shallow(params, max_depth, X_train, y_train, X_test, y_test):
+    """Retrain with the same hyperparameters but shallower trees"""
+    model = xgb.XGBRegressor(**{**params, 'max_depth': max_depth})
+    model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=False)
+    return model
+
+
+def build_variants(model, X_train, y_train, X_test, y_test,
+                   depths=DEFAULT_DEPTHS, tree_counts=DEFAULT_TREE_COUNTS):
+    """(name, model) candidates: the full model, shallower retrains, and prefixes of each"""
+    params = model.get_params()
+    bases = [(params['max_depth'], model)]
+    for depth in depths:
+        if depth < params['max_depth']:
+            print(f"  Training depth-{depth} variant...")
+            bases.append((depth, train_shallow(params, depth, X_train, y_train, X_test, y_test)))
+
+    variants = []
+    for depth, base in bases:
+        rounds = effective_rounds(base)
+        for n_trees in sorted({n for n in tree_counts if n < rounds} | {rounds}):
+            variants.append((f'depth{depth}_trees{n_trees}', truncate(base, n_trees)))
+    return variants
+
+
+def benchmark(model, X_test, y_test, latency_rows=1000, warmup=50):
+    """Accuracy, single-row latency percentiles (ms), batch throughput and size of one variant"""
+    X_test = np.ascontiguousarray(X_test)
+    for i in range(min(warmup, len(X_test))):
+        model.predict(X_test[i:i + 1])
+    rows = min(latency_rows, len(X_test))
+    timings = np.empty(rows)
+    for i in range(rows):
+        start = time.perf_counter()
+        model.predict(X_test[i:i + 1])
+        timings[i] = time.perf_counter() - start
+    p50, p99 = np.percentile(timings * 1000, [50, 99])
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        'mae': float(mean_absolute_error(y_test, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'r2': float(r2_score(y_test, y_pred)),
+        'p50_ms': float(p50),
+        'p99_ms': float(p99),
+        'batch_rows_per_s': len(X_test) / batch_seconds,
+        'trees': model.get_booster().num_boosted_rounds(),
+        'model_bytes': len(model.get_booster().save_raw('ubj'))
+    }
+
+
+def select_variant(results, p99_budget_ms, mae_tolerance=0.05):
+    """Pick the cheapest variant within budget whose MAE is near the best.
+
+    A variant qualifies when its single-row p99 is within the budget and
+    its MAE is at most (1 + mae_tolerance) times the best MAE of all
+    variants. Among those, the highest batch throughput wins; throughput
+    tracks CPU per prediction and is steadier than a p99 sample. If some
+    variants meet the budget but none is accurate enough, the most
+    accurate of those is returned; if none meets the budget, the fastest
+    by p99. Returns (name, unmet), where unmet is None, 'mae_tolerance'
+    or 'p99_budget'.
+    """
+    best_mae = min(result['mae'] for result in results.values())
+    within_budget = [name for name, result in results.items() if result['p99_ms'] <= p99_budget_ms]
+    qualifying = [name for name in within_budget if results[name]['mae'] <= best_mae * (1 + mae_tolerance)]
+    if qualifying:
+        return max(qualifying, key=lambda name: results[name]['batch_rows_per_s']), None
+    if within_budget:
+        return min(within_budget, key=lambda name: results[name]['mae']), 'mae_tolerance'
+    return min(results, key=lambda name: results[name]['p99_ms']), 'p99_budget'
@@ -0,0 +1,199 @@
+"""Accuracy-versus-latency comparison of the serving heuristic and the XGBoost model.
+
+    python -m models.evaluate --data data/volvo_service_time_india_10k.csv
+
+By default it scores train_model's holdout rows: the file is cleaned with
+the same validate_dataset rules and split with the same holdout_size and
+random_state. Those rows are kept out of training, early stopping and
+variant selection, so none of the model was tuned on them. Pass --holdout
+to score every clean row of a separate file instead. Results are printed
+and written as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from models.train_model import VolvoServicePredictor, TARGET_COLUMN, HOLDOUT_SIZE, split_holdout
+from utils.data_validator import validate_dataset, format_dataset_report
+from utils.model_predictor import ServiceTimePredictor, features_from_dataset_row
+
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+def rss_bytes():
+    """Current resident set size, from /proc where available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is the peak, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def accuracy(y_true, y_pred):
+    return {
+        'mae': float(mean_absolute_error(y_true, y_pred)),
+        'rmse': float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        'r2': float(r2_score(y_true, y_pred))
+    }
+
+
+def single_row_latency(predict_one, rows, warmup=50):
+    """Per-call latency percentiles in milliseconds"""
+    for row in rows[:warmup]:
+        predict_one(row)
+    timings = np.empty(len(rows))
+    for i, row in enumerate(rows):
+        start = time.perf_counter()
+        predict_one(row)
+        timings[i] = time.perf_counter() - start
+    timings *= 1000
+    result = {f'p{p}_ms': float(v) for p, v in zip(LATENCY_PERCENTILES, np.percentile(timings, LATENCY_PERCENTILES))}
+    result['mean_ms'] = float(timings.mean())
+    return result
+
+
+def batch_throughput(predict_all, repeats=3):
+    """Best-of-`repeats` rows per second for one call over the whole set"""
+    best = float('inf')
+    predictions = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predictions = predict_all()
+        best = min(best, time.perf_counter() - start)
+    return predictions, best
+
+
+def evaluate_heuristic(df, latency_rows, seed):
+    """Score ServiceTimePredictor; its +/-0.2h jitter is seeded for repeatability"""
+    rss_before = rss_bytes()
+    predictor = ServiceTimePredictor()
+    model_rss = rss_bytes() - rss_before
+    features = [features_from_dataset_row(row) for row in df.to_dict('records')]
+
+    random.seed(seed)
+    latency = single_row_latency(predictor.predict, features[:latency_rows])
+
+    random.seed(seed)
+    predictions, elapsed = batch_throughput(
+        lambda: np.array([predictor.predict(f) for f in features])
+    )
+    return {
+        **accuracy(df[TARGET_COLUMN], predictions),
+        'single_row': latency,
+        'batch_rows_per_s': len(df) / elapsed,
+        'model_rss_bytes': model_rss
+    }
+
+
+def evaluate_model(df, model_path, latency_rows):
+    """Score the trained XGBoost model, per row as served and vectorised in batch"""
+    rss_before = rss_bytes()
+    predictor = VolvoServicePredictor().load_model(model_path)
+    model_rss = rss_bytes() - rss_before
+
+    raw_rows = df.drop(columns=[TARGET_COLUMN]).to_dict('records')
+    latency = single_row_latency(predictor.predict_service_time, raw_rows[:latency_rows])
+
+    predictions, elapsed = batch_throughput(lambda: predictor.predict_batch(df))
+    return {
+        **accuracy(df[TARGET_COLUMN], predictions),
+        'single_row': latency,
+        'batch_rows_per_s': len(df) / elapsed,
+        'model_rss_bytes': model_rss,
+        'model_file_bytes': os.path.getsize(model_path)
+    }
+
+
+def load_evaluation_rows(data_path, holdout=False, holdout_size=HOLDOUT_SIZE, random_state=42, limit=None,
+                         validate=True):
+    """The held-out rows: the whole file, or train_model's holdout split of it.
+
+    Training splits the validated dataset, so the split is taken after the
+    same cleaning; splitting the raw file would shift rows across it.
+    """
+    df = pd.read_csv(data_path)
+    if validate:
+        df, report = validate_dataset(df)
+        print(format_dataset_report(report))
+    if not holdout:
+        _, holdout_index = split_holdout(len(df), holdout_size, random_state)
+        if not len(holdout_index):
+            raise ValueError('--holdout-size is 0: pass --holdout with a separate file')
+        df = df.iloc[holdout_index]
+    if limit:
+        df = df.iloc[:limit]
+    return df.reset_index(drop=True)
+
+
+def print_report(report):
+    print("\n" + "=" * 72)
+    print(f"📊 EVALUATION ({report['rows']:,} rows from {report['data']})")
+    print("=" * 72)
+    print(f"{'predictor':<12}{'MAE':>8}{'RMSE':>8}{'R²':>8}{'p50 ms':>9}{'p99 ms':>9}{'rows/s':>12}{'model MB':>10}")
+    for name, result in report['predictors'].items():
+        if 'error' in result:
+            print(f"{name:<12}{result['error']}")
+            continue
+        print(
+            f"{name:<12}{result['mae']:>8.3f}{result['rmse']:>8.3f}{result['r2']:>8.3f}"
+            f"{result['single_row']['p50_ms']:>9.3f}{result['single_row']['p99_ms']:>9.3f}"
+            f"{result['batch_rows_per_s']:>12,.0f}{result['model_rss_bytes'] / 2 ** 20:>10.1f}"
+        )
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare heuristic and ML service-time predictors')
+    parser.add_argument('--data', default='data/volvo_service_time_india_10k.csv')
+    parser.add_argument('--holdout', action='store_true',
+                        help='score every row of --data instead of the training holdout split')
+    parser.add_argument('--model', default='models/volvo_service_predictor.pkl')
+    parser.add_argument('--holdout-size', type=float, default=HOLDOUT_SIZE,
+                        help='the --holdout-size the model was trained with')
+    parser.add_argument('--random-state', type=int, default=42)
+    parser.add_argument('--limit', type=int, default=None, help='cap the number of rows scored')
+    parser.add_argument('--latency-rows', type=int, default=2000,
+                        help='rows timed one call at a time')
+    parser.add_argument('--no-validate', action='store_true',
+                        help='skip dataset validation (only for models trained with --no-validate)')
+    parser.add_argument('--output', default='models/evaluation_report.json')
+    args = parser.parse_args()
+
+    df = load_evaluation_rows(args.data, args.holdout, args.holdout_size, args.random_state, args.limit,
+                              validate=not args.no_validate)
+    report = {
+        'data': args.data,
+        'rows': len(df),
+        'holdout': args.holdout,
+        'generated_at': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'predictors': {}
+    }
+
+    print("🔎 Evaluating heuristic predictor...")
+    report['predictors']['heuristic'] = evaluate_heuristic(df, args.latency_rows, args.random_state)
+
+    print("🔎 Evaluating XGBoost model...")
+    if os.path.exists(args.model):
+        report['predictors']['xgboost'] = evaluate_model(df, args.model, args.latency_rows)
+    else:
+        report['predictors']['xgboost'] = {'error': f'model file not found: {args.model}'}
+
+    report['peak_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    print_report(report)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"📁 Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""Export a trained model as flat arrays for memory-mapped serving.
+
+    python -m models.export_shared_model --model models/volvo_service_predictor.pkl
+
+Writes `models/volvo_service_predictor.shared/`: one `.npy` file per array
+(tree structure, thresholds, leaf values, scaler mean and scale) and a
+`manifest.json` with the feature order, encoder classes and metadata.
+utils/shared_model.SharedModelPredictor serves it. train_model.py exports
+after every save, so this is only needed for models trained earlier.
+With --check N, N synthetic rows are scored both ways and the command fails
+if the answers differ by more than --tolerance hours.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from utils.shared_model import (
+    SHARED_MODEL_VERSION, MANIFEST, SharedModelPredictor, shared_model_path
+)
+
+NUMERICAL_COLUMNS = ['Manufacture_Year', 'Last_Service_Days_Ago', 'Total_Kms',
+                     'Km_From_Last_Service', 'Worker_Availability', 'No_Of_Tasks']
+SUPPORTED_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror')
+
+
+def flatten_trees(booster, n_trees):
+    """Packed node arrays for the first `n_trees` trees of an XGBoost booster.
+
+    Node ids are offset so all trees share one set of arrays, and each
+    leaf's children point at the leaf itself. Returns (arrays, base_score,
+    depth of the deepest tree).
+    """
+    learner = json.loads(booster.save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in SUPPORTED_OBJECTIVES:
+        raise ValueError(f'Cannot export a model with objective {objective}')
+    model = learner['gradient_booster']['model']
+    trees = model['trees'][:n_trees]
+
+    total = sum(len(tree['left_children']) for tree in trees)
+    arrays = {
+        'left': np.empty(total, dtype=np.int32),
+        'right': np.empty(total, dtype=np.int32),
+        'feature': np.zeros(total, dtype=np.int32),
+        'threshold': np.zeros(total, dtype=np.float32),
+        'default_left': np.zeros(total, dtype=bool),
+        'leaf_value': np.zeros(total, dtype=np.float32),
+        'roots': np.empty(len(trees), dtype=np.int32),
+    }
+    depth = 0
+    offset = 0
+    for t, tree in enumerate(trees):
+        if any(tree['split_type']):
+            raise ValueError('Cannot export categorical splits')
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        right = np.asarray(tree['right_children'], dtype=np.int64)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        nodes = np.arange(len(left))
+        leaf = left == -1
+        span = slice(offset, offset + len(left))
+        arrays['left'][span] = np.where(leaf, nodes, left) + offset
+        arrays['right'][span] = np.where(leaf, nodes, right) + offset
+        arrays['feature'][span] = np.where(leaf, 0, tree['split_indices'])
+        arrays['threshold'][span] = np.where(leaf, 0, conditions)
+        arrays['default_left'][span] = np.asarray(tree['default_left'], dtype=bool) & ~leaf
+        # A leaf's split condition holds its value
+        arrays['leaf_value'][span] = np.where(leaf, conditions, 0)
+        arrays['roots'][t] = offset
+
+        level = np.zeros(len(left), dtype=np.int64)
+        for node in nodes:
+            if not leaf[node]:
+                level[left[node]] = level[right[node]] = level[node] + 1
+        depth = max(depth, int(level.max()))
+        offset += len(left)
+
+    base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    return arrays, base_score, depth
+
+
+def export_shared_model(model_path, export_dir=None):
+    """Write the flat export of a model file; returns its directory.
+
+    The export is built in a temporary directory and swapped in with
+    renames. Workers still mapping the old files keep valid (unlinked)
+    pages until they reload.
+    """
+    # Imported here so `--skip-missing` works where only the serving
+    # requirements (no joblib, xgboost or scikit-learn) are installed
+    import joblib
+    from models.distill import effective_rounds
+
+    export_dir = export_dir or shared_model_path(model_path)
+    stat = os.stat(model_path)
+    model_data = joblib.load(model_path)
+    model = model_data['model']
+    feature_columns = model_data['feature_columns']
+    scaler = model_data['scaler']
+
+    arrays, base_score, depth = flatten_trees(model.get_booster(), effective_rounds(model))
+    # StandardScaler casts its statistics to the input's float32 before
+    # transforming; doing the same keeps values that sit on a split threshold
+    # on the same side
+    arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float32)
+    arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float32)
+    metadata = model_data.get('metadata', {})
+    manifest = {
+        'version': SHARED_MODEL_VERSION,
+        'source': [stat.st_size, stat.st_mtime_ns],
+        'feature_columns': feature_columns,
+        'numerical_indices': [feature_columns.index(column) for column in NUMERICAL_COLUMNS],
+        'classes': {column: [str(label) for label in encoder.classes_]
+                    for column, encoder in model_data['label_encoders'].items()},
+        'base_score': base_score,
+        'depth': depth,
+        'trees': len(arrays['roots']),
+        'metadata': {
+            'training_date': metadata.get('training_date'),
+            'variant': metadata.get('variant'),
+            'reference_histograms': metadata.get('reference_histograms')
+        }
+    }
+
+    staging = f'{export_dir}.tmp-{os.getpid()}'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for name, array in arrays.items():
+        np.save(os.path.join(staging, f'{name}.npy'), array)
+    with open(os.path.join(staging, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+
+    retired = f'{export_dir}.old-{os.getpid()}'
+    if os.path.exists(export_dir):
+        os.replace(export_dir, retired)
+    os.replace(staging, export_dir)
+    shutil.rmtree(retired, ignore_errors=True)
+    return export_dir
+
+
+def check_parity(model_path, export_dir, rows=10000, seed=7):
+    """Largest absolute difference (hours) between the pickled and the exported model"""
+    from data.generate_dataset import generate_chunk
+    from models.train_model import VolvoServicePredictor
+
+    df = generate_chunk(np.random.default_rng(seed), rows)
+    expected = VolvoServicePredictor().load_model(model_path).predict_batch(df)
+    shared = SharedModelPredictor(export_dir)
+    actual = shared.predict_batch(df)
+    single = np.array([shared.predict_service_time(row) for row in df.head(200).to_dict('records')])
+    return float(max(np.max(np.abs(actual - expected)), np.max(np.abs(single - expected[:len(single)]))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a trained model for memory-mapped serving')
+    parser.add_argument('--model', default='models/volvo_service_predictor.pkl')
+    parser.add_argument('--output', default=None, help='export directory (default: next to the model)')
+    parser.add_argument('--check', type=int, default=0, metavar='ROWS',
+                        help='compare both predictors on this many synthetic rows')
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help='largest accepted difference in hours for --check')
+    parser.add_argument('--skip-missing', action='store_true',
+                        help='exit cleanly when there is no trained model, or no training '
+                             'dependencies to read it (for build scripts)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"No trained model at {args.model}; nothing to export")
+        sys.exit(0 if args.skip_missing else 1)
+
+    try:
+        export_dir = export_shared_model(args.model, args.output)
+    except ImportError as e:
+        print(f"Cannot export {args.model} without the training dependencies: {e}")
+        sys.exit(0 if args.skip_missing else 1)
+    shared = SharedModelPredictor(export_dir)
+    print(f"✅ Exported {len(shared.arrays['roots'])} trees (depth {shared.depth}, "
+          f"{shared.mapped_bytes() / 1024:.0f} KiB of arrays) to {export_dir}")
+
+    if args.check:
+        difference = check_parity(args.model, export_dir, args.check)
+        print(f"📐 Max difference over {args.check:,} rows: {difference:.2e} hours")
+        if difference > args.tolerance:
+            print(f"❌ Exported model differs by more than {args.tolerance:g} hours")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Parity check and benchmark of the table-driven heuristic.
+
+    python -m models.heuristic_benchmark --rows 200000
+
+Scores random bookings, covering every service type, band, task count
+and some out-of-table inputs, with ServiceTimePredictor and
+LookupServiceTimePredictor. It reports:
+
+* how many raw estimates differ, per call and in batch,
+* how many quotes (rounded to 0.1 h) differ,
+* per-call latency of estimate() and batch rows/s of the vectorised paths
+  (adjustment_factors versus the table gather).
+
+The lookup multiplies in the arithmetic order, so every estimate must be
+bit-identical; it exits non-zero if any estimate or quote differs.
+"""
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+from utils.model_predictor import (
+    SERVICE_TYPE_TIMES, DEFAULT_SERVICE_TIME, TASK_TIMES, CURRENT_YEAR,
+    ServiceTimePredictor, LookupServiceTimePredictor, adjustment_factors
+)
+
+
+def random_bookings(rows, seed=42):
+    rng = random.Random(seed)
+    service_types = list(SERVICE_TYPE_TIMES) + ['unknown']
+    tasks = list(TASK_TIMES)
+    bookings = []
+    for _ in range(rows):
+        selected = rng.sample(tasks, rng.randint(0, 8))
+        bookings.append({
+            'service_type': rng.choice(service_types),
+            # A few future years exercise the arithmetic fallback
+            'manufacture_year': rng.randint(2000, CURRENT_YEAR + 1),
+            'total_kilometers': rng.uniform(0, 400000),
+            'last_service_days': rng.randint(0, 800),
+            'number_of_tasks': len(selected),
+            'worker_availability': rng.randint(0, 9),
+            'selected_tasks': selected
+        })
+    return bookings
+
+
+def per_call_ns(estimate, bookings, repeats=3):
+    """Best-of-`repeats` mean nanoseconds per estimate() call"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for booking in bookings:
+            estimate(booking)
+        best = min(best, time.perf_counter() - start)
+    return best / len(bookings) * 1e9
+
+
+def batch_columns(bookings):
+    """Column arrays, with base time = max(service base, task time) per row, for in-table rows"""
+    rows = [b for b in bookings if b['manufacture_year'] <= CURRENT_YEAR]
+    base = np.array([
+        max(SERVICE_TYPE_TIMES.get(b['service_type'], DEFAULT_SERVICE_TIME),
+            sum(TASK_TIMES.get(t, 0) for t in b['selected_tasks']))
+        for b in rows
+    ])
+    columns = [np.array([b[name] for b in rows]) for name in (
+        'manufacture_year', 'total_kilometers', 'last_service_days',
+        'number_of_tasks', 'worker_availability')]
+    return base, columns
+
+
+def best_seconds(fn, repeats=5):
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parity and speed of the lookup-table heuristic')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    arithmetic = ServiceTimePredictor()
+    lookup = LookupServiceTimePredictor()
+    bookings = random_bookings(args.rows, args.seed)
+
+    estimate_mismatches = 0
+    quote_mismatches = 0
+    for booking in bookings:
+        estimate_mismatches += arithmetic.estimate(booking) != lookup.estimate(booking)
+        quote_mismatches += arithmetic.quote(booking) != lookup.quote(booking)
+
+    arithmetic_ns = per_call_ns(arithmetic.estimate, bookings)
+    lookup_ns = per_call_ns(lookup.estimate, bookings)
+
+    base, columns = batch_columns(bookings)
+    _, arithmetic_s = best_seconds(lambda: base * adjustment_factors(*columns))
+    actual, lookup_s = best_seconds(lambda: lookup.estimate_batch(base, *columns))
+    in_table = [b for b in bookings if b['manufacture_year'] <= CURRENT_YEAR]
+    expected = np.array([arithmetic.estimate(b) for b in in_table])
+    batch_mismatches = int(np.count_nonzero(actual != expected))
+
+    print(f"📐 Parity over {len(bookings):,} bookings")
+    print(f"   estimates differing (per call): {estimate_mismatches}")
+    print(f"   estimates differing (batch):    {batch_mismatches}")
+    print(f"   quotes differing:               {quote_mismatches}")
+    print("⏱️  Per call (estimate)")
+    print(f"   arithmetic {arithmetic_ns:8.0f} ns   lookup {lookup_ns:8.0f} ns   "
+          f"speedup {arithmetic_ns / lookup_ns:.2f}x")
+    print(f"⏱️  Batch ({len(base):,} rows)")
+    print(f"   arithmetic {len(base) / arithmetic_s:12,.0f} rows/s   lookup {len(base) / lookup_s:12,.0f} rows/s   "
+          f"speedup {arithmetic_s / lookup_s:.2f}x")
+
+    if estimate_mismatches or batch_mismatches or quote_mismatches:
+        print("❌ Lookup table disagrees with the arithmetic heuristic")
+        sys.exit(1)
+    print("✅ Lookup table matches the arithmetic heuristic")
+
+
+if __name__ == '__main__':
+    main()
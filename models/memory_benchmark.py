@@ -0,0 +1,119 @@
+"""Resident memory per server worker: pickled model versus shared export.
+
+    python -m models.memory_benchmark --workers 4
+
+For each loading mode, starts `--workers` fresh interpreters, as gunicorn
+does without --preload. Each one loads the model the way app.py does,
+serves a few predictions, and waits until every worker is loaded, so
+pages that are really shared show up as shared. Then each reads
+/proc/self/smaps_rollup:
+
+* RSS - every page the worker has resident, shared or not
+* PSS - shared pages divided among the processes mapping them; summed
+        over workers, this is what the machine actually pays
+* USS - pages only this worker has (private); what one more worker costs
+
+The "load" columns are the growth from just before the model was loaded.
+Needs Linux for PSS/USS; elsewhere only peak RSS is reported.
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import resource
+import sys
+
+MODES = ('pickle', 'shared')
+PREDICTIONS = 100
+
+
+def memory_kib():
+    """{'rss', 'pss', 'uss'} of this process in KiB (pss/uss are None off Linux)"""
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1])
+        return {'rss': fields['Rss'], 'pss': fields['Pss'],
+                'uss': fields['Private_Clean'] + fields['Private_Dirty']}
+    except (OSError, KeyError):
+        return {'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'pss': None, 'uss': None}
+
+
+def worker(mode, model_path, barrier, results):
+    """One server worker: load the model as app.py does, predict, then measure"""
+    from utils.tiered_predictor import load_model_predictor
+    from utils.data_validator import parse_service_request
+    from utils.warmup import SAMPLE_REQUEST
+
+    features = parse_service_request(dict(SAMPLE_REQUEST), require_plate=False)['request'].to_features(1.0)
+    before = memory_kib()
+    with contextlib.redirect_stdout(io.StringIO()):
+        predict = load_model_predictor(model_path, shared=mode == 'shared')
+    if predict is None:
+        results.put((mode, None, None))
+        return
+    for _ in range(PREDICTIONS):
+        predict(features)
+    # Measure only once every worker has mapped the model
+    barrier.wait()
+    results.put((mode, before, memory_kib()))
+    barrier.wait()
+
+
+def measure(mode, model_path, workers):
+    """[(before, after)] memory of `workers` concurrent workers loading in `mode`"""
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(mode, model_path, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    samples = []
+    for _ in processes:
+        _, before, after = results.get()
+        if before is None:
+            barrier.abort()
+            raise RuntimeError(f'Could not load {model_path} in {mode} mode')
+        samples.append((before, after))
+    for process in processes:
+        process.join()
+    return samples
+
+
+def mean(values):
+    return sum(values) / len(values) / 1024 if None not in values else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-worker memory of the pickled and the shared model')
+    parser.add_argument('--model', default='models/volvo_service_predictor.pkl')
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    from utils.shared_model import is_current
+    if not os.path.exists(args.model) or not is_current(args.model):
+        print(f"❌ Needs {args.model} and a current export: python -m models.export_shared_model")
+        sys.exit(1)
+
+    def mib(value):
+        return f'{value:8.1f}' if value is not None else '     n/a'
+
+    print(f"🧠 Memory per worker, {args.workers} workers (MiB)")
+    print(f"   {'mode':<8} {'RSS':>8} {'PSS':>8} {'USS':>8} {'load RSS':>9} {'load USS':>9} {'total PSS':>10}")
+    for mode in MODES:
+        samples = measure(mode, args.model, args.workers)
+        after = [a for _, a in samples]
+        load_rss = mean([a['rss'] - b['rss'] for b, a in samples])
+        load_uss = mean([a['uss'] - b['uss'] if a['uss'] is not None else None for b, a in samples])
+        total_pss = sum(a['pss'] for a in after) / 1024 if after[0]['pss'] is not None else None
+        print(f"   {mode:<8} {mib(mean([a['rss'] for a in after]))} {mib(mean([a['pss'] for a in after]))} "
+              f"{mib(mean([a['uss'] for a in after]))} {mib(load_rss)}  {mib(load_uss)}  {mib(total_pss)}")
+
+
+if __name__ == '__main__':
+    main()
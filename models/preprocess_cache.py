@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import shutil
+
+import joblib
+import numpy as np
+
+# Bump when the layout or the preprocessing itself changes
+CACHE_VERSION = 2
+HASH_CHUNK_BYTES = 4 * 1024 * 1024
+ARRAY_NAMES = ('X_train', 'X_test', 'y_train', 'y_test')
+
+
+class PreprocessCache:
+    """On-disk cache of encoded, split and scaled training matrices.
+
+    Entries are keyed by a digest of the source file together with the
+    preprocessing config. Each entry is a directory holding one ``.npy``
+    file per array, plus ``state.pkl`` with the fitted encoders and scaler.
+    Arrays are loaded with ``mmap_mode='r'``, so a hit costs a few page
+    faults rather than a CSV parse.
+
+    Hashing a large file is the slowest part of a hit. The digest of each
+    file is therefore remembered next to its size and mtime, and is reused
+    until either one changes.
+    """
+
+    def __init__(self, cache_dir='models/cache'):
+        self.cache_dir = cache_dir
+        self.digest_index = os.path.join(cache_dir, 'digests.json')
+
+    def _load_digest_index(self):
+        try:
+            with open(self.digest_index, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def file_digest(self, path):
+        """BLAKE2b of the file's bytes, reusing the last digest if size and mtime match"""
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        index = self._load_digest_index()
+        entry = index.get(os.path.abspath(path))
+        if entry and entry[:2] == signature:
+            return entry[2]
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                digest.update(block)
+        digest = digest.hexdigest()
+
+        index[os.path.abspath(path)] = signature + [digest]
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.digest_index + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.digest_index)
+        return digest
+
+    def key(self, data_path, config):
+        """Cache key for a data file and a JSON-serialisable preprocessing config"""
+        payload = json.dumps(
+            {'version': CACHE_VERSION, 'data': self.file_digest(data_path), 'config': config},
+            sort_keys=True
+        )
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def load(self, key):
+        """(arrays, state) for a key, or None on a miss"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        try:
+            arrays = tuple(
+                np.load(os.path.join(entry_dir, f'{name}.npy'), mmap_mode='r')
+                for name in ARRAY_NAMES
+            )
+            state = joblib.load(os.path.join(entry_dir, 'state.pkl'))
+        except (OSError, ValueError, EOFError):
+            return None
+        return arrays, state
+
+    def store(self, key, arrays, state):
+        """Write an entry, then move it into place so readers never see half of one"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        tmp_dir = f'{entry_dir}.tmp{os.getpid()}'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, array in zip(ARRAY_NAMES, arrays):
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), np.ascontiguousarray(array))
+        joblib.dump(state, os.path.join(tmp_dir, 'state.pkl'))
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another run stored the same entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,32 @@
+import numpy as np
+
+# Parts_Availability is not known when a booking is made, so it can't drift
+MONITORED_CATEGORICAL = ['Car_Model', 'Fuel_Type', 'Service_Type']
+MONITORED_NUMERICAL = ['Manufacture_Year', 'Last_Service_Days_Ago', 'Total_Kms',
+                       'Km_From_Last_Service', 'Worker_Availability', 'No_Of_Tasks']
+
+
+def reference_histograms(df, bins=10):
+    """Training-time feature distributions for drift monitoring.
+
+    Numerical columns get decile edges (duplicates dropped, so discrete
+    columns get one bin per value) and the share of rows in each bin. A
+    value v falls in bin bisect_right(edges, v), so there are
+    len(edges) + 1 bins. Categorical columns get the share of each label.
+    Everything is plain lists and floats so it pickles with the model
+    and serialises to JSON.
+    """
+    reference = {'rows': int(len(df)), 'numerical': {}, 'categorical': {}}
+    quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+    for column in MONITORED_NUMERICAL:
+        values = df[column].to_numpy(dtype=float)
+        edges = np.unique(np.quantile(values, quantiles))
+        counts = np.bincount(np.searchsorted(edges, values, side='right'), minlength=len(edges) + 1)
+        reference['numerical'][column] = {
+            'edges': edges.tolist(),
+            'proportions': (counts / counts.sum()).tolist()
+        }
+    for column in MONITORED_CATEGORICAL:
+        shares = df[column].astype(str).value_counts(normalize=True)
+        reference['categorical'][column] = {str(label): float(share) for label, share in shares.items()}
+    return reference
@@ -0,0 +1,228 @@
+"""Offline scoring of large booking files.
+
+    python -m models.score bookings.csv --output scored.csv --predictor model
+
+Input is CSV or JSON lines in either of two schemas:
+
+* training-dataset rows (Car_Model, Service_Type, Total_Kms, ...), or
+* booking features as sent to /predict (car_model, service_type,
+  selected_tasks, ...). selected_tasks is a list in JSON lines, or a
+  comma/semicolon-separated string in CSV. worker_availability falls back
+  to --worker-availability when absent.
+
+The file is read in chunks and each chunk is scored by a process pool
+whose workers load the predictor once. At most --max-in-flight chunks are
+pending at a time, and results are written as soon as the oldest one is
+done. Output therefore stays in input order, and memory is bounded by
+chunk size times window however long the file is. Each output row is the
+input row plus a predicted_service_time column.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.model_predictor import (
+    SERVICE_TYPE_TIMES, DEFAULT_SERVICE_TIME, TASK_TIMES,
+    DATASET_SERVICE_TYPES, DATASET_FUEL_TYPES, adjustment_factors
+)
+
+OUTPUT_COLUMN = 'predicted_service_time'
+DEFAULT_CHUNK_SIZE = 20000
+
+# Booking feature name -> training-dataset column, for plain copies
+FEATURE_COLUMNS = {
+    'car_model': 'Car_Model',
+    'manufacture_year': 'Manufacture_Year',
+    'last_service_days': 'Last_Service_Days_Ago',
+    'total_kilometers': 'Total_Kms',
+    'km_since_last_service': 'Km_From_Last_Service',
+    'worker_availability': 'Worker_Availability',
+    'number_of_tasks': 'No_Of_Tasks'
+}
+LABEL_BASE_TIMES = {DATASET_SERVICE_TYPES[key]: hours for key, hours in SERVICE_TYPE_TIMES.items()}
+
+# Set once per worker process by _init_worker
+_scorer = None
+
+
+def split_tasks(value):
+    """A selected_tasks cell (list, or comma/semicolon-separated string) as a list"""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if not isinstance(value, str):
+        return []
+    return [task.strip() for task in value.replace(';', ',').split(',') if task.strip()]
+
+
+def to_dataset_frame(chunk, worker_availability=4):
+    """(dataset-schema frame, task hours) for a chunk in either input schema"""
+    if 'Service_Type' in chunk.columns:
+        # Dataset rows carry a task count but not the tasks themselves
+        return chunk, np.zeros(len(chunk))
+
+    tasks = chunk['selected_tasks'].map(split_tasks) if 'selected_tasks' in chunk.columns \
+        else pd.Series([[]] * len(chunk), index=chunk.index)
+    task_hours = tasks.map(lambda names: sum(TASK_TIMES.get(name, 0) for name in names)).to_numpy(dtype=float)
+
+    frame = pd.DataFrame(index=chunk.index)
+    for feature, column in FEATURE_COLUMNS.items():
+        if feature in chunk.columns:
+            frame[column] = chunk[feature]
+    if 'Worker_Availability' not in frame:
+        frame['Worker_Availability'] = worker_availability
+    if 'Km_From_Last_Service' not in frame:
+        frame['Km_From_Last_Service'] = 0
+    if 'No_Of_Tasks' not in frame:
+        frame['No_Of_Tasks'] = tasks.map(len)
+    fuel = chunk['fuel_type'] if 'fuel_type' in chunk.columns else pd.Series('petrol', index=chunk.index)
+    frame['Fuel_Type'] = fuel.map(DATASET_FUEL_TYPES).fillna(fuel.astype(str).str.title())
+    frame['Service_Type'] = chunk['service_type'].map(DATASET_SERVICE_TYPES).fillna(
+        chunk['service_type'].astype(str).str.title() + ' Service')
+    frame['Parts_Availability'] = 'High'
+    return frame, task_hours
+
+
+class HeuristicScorer:
+    """ServiceTimePredictor.quote, vectorised over a chunk"""
+
+    def score(self, frame, task_hours):
+        base = frame['Service_Type'].map(LABEL_BASE_TIMES).fillna(DEFAULT_SERVICE_TIME).to_numpy(dtype=float)
+        hours = np.maximum(base, task_hours) * adjustment_factors(
+            frame['Manufacture_Year'].to_numpy(),
+            frame['Total_Kms'].to_numpy(dtype=float),
+            frame['Last_Service_Days_Ago'].to_numpy(),
+            frame['No_Of_Tasks'].to_numpy(),
+            frame['Worker_Availability'].to_numpy()
+        )
+        return np.round(np.maximum(hours, 1.0), 1)
+
+
+class ModelScorer:
+    """VolvoServicePredictor.predict_batch, one thread per worker process"""
+
+    def __init__(self, model_path):
+        from models.train_model import VolvoServicePredictor
+        self.predictor = VolvoServicePredictor().load_model(model_path)
+        # Parallelism comes from the process pool; don't oversubscribe cores
+        self.predictor.model.set_params(n_jobs=1)
+
+    def score(self, frame, task_hours):
+        return np.round(np.maximum(self.predictor.predict_batch(frame).astype(float), 1.0), 1)
+
+
+def make_scorer(predictor, model_path):
+    if predictor == 'model':
+        return ModelScorer(model_path)
+    return HeuristicScorer()
+
+
+def _init_worker(predictor, model_path):
+    global _scorer
+    _scorer = make_scorer(predictor, model_path)
+
+
+def format_chunk(chunk, output_format, header):
+    if output_format == 'jsonl':
+        return chunk.to_json(orient='records', lines=True)
+    return chunk.to_csv(index=False, header=header)
+
+
+def score_chunk(chunk, output_format, header, worker_availability, scorer=None):
+    """Score one chunk and return it formatted for the output file"""
+    frame, task_hours = to_dataset_frame(chunk, worker_availability)
+    chunk = chunk.assign(**{OUTPUT_COLUMN: (scorer or _scorer).score(frame, task_hours)})
+    text = format_chunk(chunk, output_format, header)
+    return text, len(chunk)
+
+
+def read_chunks(path, input_format, chunk_size):
+    if input_format == 'jsonl':
+        return pd.read_json(path, lines=True, chunksize=chunk_size)
+    return pd.read_csv(path, chunksize=chunk_size)
+
+
+def detect_format(path):
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def score_file(input_path, output, predictor='heuristic', model_path='models/volvo_service_predictor.pkl',
+               workers=None, chunk_size=DEFAULT_CHUNK_SIZE, max_in_flight=None,
+               input_format=None, output_format=None, worker_availability=4, progress_every=10.0):
+    """Stream input_path through a process pool into the `output` file object; returns rows written"""
+    input_format = input_format or detect_format(input_path)
+    output_format = output_format or input_format
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    max_in_flight = max_in_flight or 2 * max(workers, 1)
+
+    start = last_report = time.perf_counter()
+    rows = 0
+    chunks = read_chunks(input_path, input_format, chunk_size)
+
+    if workers == 0:
+        # In-process, for debugging and tiny files
+        scorer = make_scorer(predictor, model_path)
+        for i, chunk in enumerate(chunks):
+            text, n = score_chunk(chunk, output_format, i == 0, worker_availability, scorer)
+            output.write(text)
+            rows += n
+        return rows, time.perf_counter() - start
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(predictor, model_path)) as pool:
+        pending = deque()
+
+        def drain_oldest():
+            text, n = pending.popleft().result()
+            output.write(text)
+            return n
+
+        for i, chunk in enumerate(chunks):
+            pending.append(pool.submit(score_chunk, chunk, output_format, i == 0, worker_availability))
+            if len(pending) >= max_in_flight:
+                rows += drain_oldest()
+                now = time.perf_counter()
+                if now - last_report >= progress_every:
+                    print(f"  {rows:,} rows ({rows / (now - start):,.0f} rows/s)", file=sys.stderr)
+                    last_report = now
+        while pending:
+            rows += drain_oldest()
+    return rows, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a large booking file with a service-time predictor')
+    parser.add_argument('input', help='CSV or JSON-lines file of bookings or dataset rows')
+    parser.add_argument('--output', default='-', help="output file, or '-' for stdout")
+    parser.add_argument('--predictor', choices=['heuristic', 'model'], default='heuristic')
+    parser.add_argument('--model', default='models/volvo_service_predictor.pkl')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='scoring processes (default: CPU count; 0 scores in-process)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help='chunks pending at once (default: twice the workers)')
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], default=None)
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'], default=None)
+    parser.add_argument('--worker-availability', type=int, default=4,
+                        help='used for booking rows without a worker_availability column')
+    args = parser.parse_args()
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        rows, elapsed = score_file(
+            args.input, output, args.predictor, args.model, args.workers, args.chunk_size,
+            args.max_in_flight, args.input_format, args.output_format, args.worker_availability
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(f"✅ Scored {rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s) "
+          f"with the {args.predictor} predictor", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
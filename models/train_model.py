@@ -7,7 +7,37 @@ import xgboost as xgb
 import joblib
 import matplotlib.pyplot as plt
 import seaborn as sns
+import argparse
 import os
+import sys
+
+try:
+    from models.preprocess_cache import PreprocessCache
+    from models import distill
+    from models.reference_histograms import reference_histograms
+    from models.export_shared_model import export_shared_model
+except ImportError:  # run as a script: python models/train_model.py
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from preprocess_cache import PreprocessCache
+    import distill
+    from reference_histograms import reference_histograms
+    from export_shared_model import export_shared_model
+from utils.data_validator import validate_dataset, format_dataset_report, DATASET_SCHEMA_VERSION
+
+CATEGORICAL_COLUMNS = ['Car_Model', 'Fuel_Type', 'Service_Type', 'Parts_Availability']
+NUMERICAL_COLUMNS = ['Manufacture_Year', 'Last_Service_Days_Ago', 'Total_Kms',
+                     'Km_From_Last_Service', 'Worker_Availability', 'No_Of_Tasks']
+TARGET_COLUMN = 'Service_Time_Hours'
+# Share of the validated dataset that training, early stopping and variant
+# selection never see; models.evaluate scores it
+HOLDOUT_SIZE = 0.1
+
+def split_holdout(n_rows, holdout_size=HOLDOUT_SIZE, random_state=42):
+    """(training_index, holdout_index) over the rows of a validated dataset"""
+    rows = np.arange(n_rows)
+    if not holdout_size:
+        return rows, rows[:0]
+    return train_test_split(rows, test_size=holdout_size, random_state=random_state, shuffle=True)
 
 class VolvoServicePredictor:
     def __init__(self):
@@ -15,6 +45,9 @@ class VolvoServicePredictor:
         self.label_encoders = {}
         self.scaler = StandardScaler()
         self.feature_columns = []
+        self.variant_info = None
+        # Feature distributions of the training data, for drift monitoring
+        self.reference_histograms = None
         
     def load_and_explore_data(self, data_path):
         """Load and explore the dataset"""
@@ -42,16 +75,14 @@ class VolvoServicePredictor:
         df_processed = df.copy()
         
         # Encode categorical variables
-        categorical_columns = ['Car_Model', 'Fuel_Type', 'Service_Type', 'Parts_Availability']
-        
-        for col in categorical_columns:
+        for col in CATEGORICAL_COLUMNS:
             self.label_encoders[col] = LabelEncoder()
             df_processed[col] = self.label_encoders[col].fit_transform(df_processed[col])
             print(f"Encoded {col}: {len(self.label_encoders[col].classes_)} categories")
             print(f"  Categories: {list(self.label_encoders[col].classes_)}")
         
         # Define feature columns
-        self.feature_columns = [col for col in df_processed.columns if col != 'Service_Time_Hours']
+        self.feature_columns = [col for col in df_processed.columns if col != TARGET_COLUMN]
         
         print(f"Feature columns: {self.feature_columns}")
         print(f"Target column: Service_Time_Hours")
@@ -109,16 +140,22 @@ class VolvoServicePredictor:
         
         print("✅ Feature analysis completed and plots saved")
     
-    def train_model(self, df, test_size=0.2, random_state=42):
-        """Train XGBoost model with comprehensive evaluation"""
-        print("🎯 Training XGBoost model...")
+    def prepare_training_data(self, df, test_size=0.2, random_state=42, holdout_size=HOLDOUT_SIZE):
+        """Encode, split and scale a raw dataset into float32 training matrices.
+        
+        The holdout rows are set aside first; the test split of the rest
+        drives early stopping and variant selection.
+        """
+        training_index, _ = split_holdout(len(df), holdout_size, random_state)
+        df = df.iloc[training_index].reset_index(drop=True)
+        self.reference_histograms = reference_histograms(df)
         
         # Preprocess data
         df_processed = self.preprocess_data(df)
         
         # Prepare features and target
-        X = df_processed[self.feature_columns]
-        y = df_processed['Service_Time_Hours']
+        X = df_processed[self.feature_columns].to_numpy(dtype=np.float32)
+        y = df_processed[TARGET_COLUMN].to_numpy(dtype=np.float32)
         
         print(f"X shape: {X.shape}, y shape: {y.shape}")
         
@@ -127,16 +164,81 @@ class VolvoServicePredictor:
             X, y, test_size=test_size, random_state=random_state, shuffle=True
         )
         
-        print(f"Training set: {X_train.shape[0]} samples")
-        print(f"Testing set: {X_test.shape[0]} samples")
+        # Scale numerical features (fitted on the training split only)
+        numerical_indices = [self.feature_columns.index(col) for col in NUMERICAL_COLUMNS]
+        X_train[:, numerical_indices] = self.scaler.fit_transform(X_train[:, numerical_indices])
+        X_test[:, numerical_indices] = self.scaler.transform(X_test[:, numerical_indices])
         
-        # Scale numerical features
-        numerical_cols = ['Manufacture_Year', 'Last_Service_Days_Ago', 'Total_Kms', 
-                         'Km_From_Last_Service', 'Worker_Availability', 'No_Of_Tasks']
+        return X_train, X_test, y_train, y_test
+    
+    def validate_data(self, df):
+        """Drop rows that break the dataset schema, printing a per-rule report"""
+        print("🔍 Validating dataset...")
+        clean, report = validate_dataset(df)
+        print(format_dataset_report(report))
+        if not report['clean_rows']:
+            raise ValueError('No valid rows left to train on')
+        return clean
+    
+    def load_training_matrices(self, data_path, test_size=0.2, random_state=42,
+                               cache_dir='models/cache', explore=True, validate=True,
+                               holdout_size=HOLDOUT_SIZE):
+        """Training matrices for a CSV, from the preprocessing cache when possible.
+        
+        Returns (matrices, df); df is None on a cache hit because the CSV
+        was never read. With `validate`, df is the cleaned dataset.
+        """
+        config = {
+            'categorical': CATEGORICAL_COLUMNS,
+            'numerical': NUMERICAL_COLUMNS,
+            'target': TARGET_COLUMN,
+            'test_size': test_size,
+            'random_state': random_state,
+            'holdout_size': holdout_size,
+            'validation': DATASET_SCHEMA_VERSION if validate else None
+        }
+        cache = PreprocessCache(cache_dir) if cache_dir else None
+        if cache:
+            key = cache.key(data_path, config)
+            cached = cache.load(key)
+            if cached:
+                matrices, state = cached
+                self.label_encoders = state['label_encoders']
+                self.scaler = state['scaler']
+                self.feature_columns = state['feature_columns']
+                self.reference_histograms = state.get('reference_histograms')
+                print(f"⚡ Using cached preprocessed data ({cache_dir}/{key})")
+                return matrices, None
+        
+        if explore:
+            df = self.load_and_explore_data(data_path)
+        else:
+            df = pd.read_csv(data_path)
+        if validate:
+            df = self.validate_data(df)
+        matrices = self.prepare_training_data(df, test_size, random_state, holdout_size)
+        
+        if cache:
+            cache.store(key, matrices, {
+                'label_encoders': self.label_encoders,
+                'scaler': self.scaler,
+                'feature_columns': self.feature_columns,
+                'reference_histograms': self.reference_histograms
+            })
+            print(f"💾 Cached preprocessed data ({cache_dir}/{key})")
+        return matrices, df
+    
+    def train_model(self, df=None, test_size=0.2, random_state=42, matrices=None):
+        """Train XGBoost model with comprehensive evaluation"""
+        print("🎯 Training XGBoost model...")
         
-        X_train[numerical_cols] = self.scaler.fit_transform(X_train[numerical_cols])
-        X_test[numerical_cols] = self.scaler.transform(X_test[numerical_cols])
+        if matrices is None:
+            matrices = self.prepare_training_data(df, test_size, random_state)
+        X_train, X_test, y_train, y_test = matrices
         
+        print(f"Training set: {X_train.shape[0]} samples")
+        print(f"Testing set: {X_test.shape[0]} samples")
+
         # Train XGBoost model with hyperparameters
         self.model = xgb.XGBRegressor(
             n_estimators=1000,
@@ -149,14 +251,14 @@ class VolvoServicePredictor:
             reg_lambda=1,
             random_state=random_state,
             n_jobs=-1,
-            eval_metric='rmse'
+            eval_metric='rmse',
+            early_stopping_rounds=50
         )
         
         print("🚀 Starting model training...")
         self.model.fit(
             X_train, y_train,
             eval_set=[(X_test, y_test)],
-            early_stopping_rounds=50,
             verbose=50
         )
         
@@ -184,6 +286,44 @@ class VolvoServicePredictor:
         
         return X_train, X_test, y_train, y_test, y_pred
     
+    def select_serving_variant(self, matrices, p99_budget_ms=1.0, mae_tolerance=0.05,
+                               depths=distill.DEFAULT_DEPTHS, tree_counts=distill.DEFAULT_TREE_COUNTS):
+        """Swap the trained model for the cheapest smaller variant that fits the latency budget"""
+        print(f"✂️  Building serving variants (p99 budget {p99_budget_ms} ms)...")
+        X_train, X_test, y_train, y_test = matrices
+        variants = distill.build_variants(self.model, X_train, y_train, X_test, y_test, depths, tree_counts)
+        
+        results = {}
+        for name, model in variants:
+            results[name] = distill.benchmark(model, X_test, y_test)
+        chosen, unmet = distill.select_variant(results, p99_budget_ms, mae_tolerance)
+        
+        print(f"{'variant':<20}{'trees':>7}{'MAE':>8}{'p50 ms':>9}{'p99 ms':>9}{'rows/s':>12}{'KB':>8}")
+        for name, result in results.items():
+            marker = ' ◀' if name == chosen else ''
+            print(
+                f"{name:<20}{result['trees']:>7}{result['mae']:>8.3f}{result['p50_ms']:>9.3f}"
+                f"{result['p99_ms']:>9.3f}{result['batch_rows_per_s']:>12,.0f}"
+                f"{result['model_bytes'] / 1024:>8.0f}{marker}"
+            )
+        if unmet == 'p99_budget':
+            print(f"⚠️  No variant met the {p99_budget_ms} ms p99 budget; using the fastest")
+        elif unmet == 'mae_tolerance':
+            print(f"⚠️  No variant within the {p99_budget_ms} ms p99 budget kept MAE within "
+                  f"{mae_tolerance:.0%} of the best; using the most accurate within budget")
+        
+        self.model = dict(variants)[chosen]
+        self.variant_info = {
+            'name': chosen,
+            'p99_budget_ms': p99_budget_ms,
+            'within_budget': unmet != 'p99_budget',
+            'unmet_constraint': unmet,
+            'mae_tolerance': mae_tolerance,
+            'results': results
+        }
+        print(f"✅ Serving variant: {chosen}")
+        return chosen
+    
     def plot_feature_importance(self):
         """Plot feature importance"""
         print("📊 Plotting feature importance...")
@@ -267,12 +407,20 @@ class VolvoServicePredictor:
             'metadata': {
                 'training_date': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'model_type': 'XGBoost',
-                'version': '1.0.0'
+                'version': '1.0.0',
+                'variant': self.variant_info,
+                'reference_histograms': self.reference_histograms
             }
         }
         
         joblib.dump(model_data, file_path)
         print(f"✅ Model saved to {file_path}")
+        
+        # Flat arrays the server workers memory-map and share
+        try:
+            print(f"✅ Shared-memory export saved to {export_shared_model(file_path)}")
+        except Exception as e:
+            print(f"⚠️ Could not export shared model weights: {e}")
     
     def load_model(self, file_path='models/volvo_service_predictor.pkl'):
         """Load the trained model and preprocessing objects"""
@@ -283,6 +431,8 @@ class VolvoServicePredictor:
         self.label_encoders = model_data['label_encoders']
         self.scaler = model_data['scaler']
         self.feature_columns = model_data['feature_columns']
+        self.variant_info = model_data.get('metadata', {}).get('variant')
+        self.reference_histograms = model_data.get('metadata', {}).get('reference_histograms')
         
         print("✅ Model loaded successfully")
         return self
@@ -308,7 +458,7 @@ class VolvoServicePredictor:
                 feature_vector.append(input_features[col])
         
         # Convert to array and scale numerical features
-        feature_array = np.array(feature_vector).reshape(1, -1)
+        feature_array = np.array(feature_vector, dtype=np.float32).reshape(1, -1)
         
         numerical_cols = ['Manufacture_Year', 'Last_Service_Days_Ago', 'Total_Kms', 
                          'Km_From_Last_Service', 'Worker_Availability', 'No_Of_Tasks']
@@ -322,8 +472,45 @@ class VolvoServicePredictor:
         
         return max(0, prediction)  # Ensure non-negative prediction
 
+    def encode_batch(self, df):
+        """Encoded and scaled float32 feature matrix for a DataFrame of raw rows"""
+        X = np.empty((len(df), len(self.feature_columns)), dtype=np.float32)
+        for i, col in enumerate(self.feature_columns):
+            if col in CATEGORICAL_COLUMNS:
+                # Unseen categories fall back to code 0, like predict_service_time
+                codes = {label: code for code, label in enumerate(self.label_encoders[col].classes_)}
+                X[:, i] = df[col].map(codes).fillna(0).to_numpy(dtype=np.float32)
+            else:
+                X[:, i] = df[col].to_numpy(dtype=np.float32)
+        
+        numerical_indices = [self.feature_columns.index(col) for col in NUMERICAL_COLUMNS]
+        X[:, numerical_indices] = self.scaler.transform(X[:, numerical_indices])
+        return X
+    
+    def predict_batch(self, df):
+        """Vectorised predict_service_time for every row of a DataFrame"""
+        if self.model is None:
+            raise ValueError("Model not trained or loaded yet!")
+        return np.maximum(self.model.predict(self.encode_batch(df)), 0)
+
 def main():
     """Main function to train and save the model"""
+    parser = argparse.ArgumentParser(description='Train the Volvo service time model')
+    parser.add_argument('--data', default='data/volvo_service_time_india_10k.csv')
+    parser.add_argument('--cache-dir', default='models/cache',
+                        help='preprocessed matrix cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='always re-preprocess the CSV')
+    parser.add_argument('--no-validate', action='store_true',
+                        help='train on the CSV as is, without dropping rows that break the schema')
+    parser.add_argument('--p99-budget-ms', type=float, default=1.0,
+                        help='single-row p99 inference budget for the serving variant')
+    parser.add_argument('--mae-tolerance', type=float, default=0.05,
+                        help='accepted MAE increase over the best variant, as a fraction')
+    parser.add_argument('--no-distill', action='store_true', help='serve the full model as trained')
+    parser.add_argument('--holdout-size', type=float, default=HOLDOUT_SIZE,
+                        help='share of rows kept out of training for models.evaluate')
+    args = parser.parse_args()
+    
     print("🚗 Volvo Service Time Prediction Model Training")
     print("="*60)
     
@@ -331,14 +518,24 @@ def main():
     predictor = VolvoServicePredictor()
     
     try:
-        # Load data
-        df = predictor.load_and_explore_data('data/volvo_service_time_india_10k.csv')
+        # Load data, or the cached matrices if the CSV hasn't changed
+        matrices, df = predictor.load_training_matrices(
+            args.data, cache_dir=None if args.no_cache else args.cache_dir,
+            validate=not args.no_validate, holdout_size=args.holdout_size
+        )
         
-        # Analyze features (fixed version)
-        predictor.analyze_features(df)
+        # Analyze features (fixed version); skipped on a cache hit
+        if df is not None:
+            predictor.analyze_features(df)
         
         # Train model
-        X_train, X_test, y_train, y_test, y_pred = predictor.train_model(df)
+        X_train, X_test, y_train, y_test, y_pred = predictor.train_model(matrices=matrices)
+        
+        # Pick the cheapest variant that meets the latency budget
+        if not args.no_distill:
+            predictor.select_serving_variant(
+                matrices, p99_budget_ms=args.p99_budget_ms, mae_tolerance=args.mae_tolerance
+            )
         
         # Save model
         predictor.save_model('models/volvo_service_predictor.pkl')
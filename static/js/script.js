@@ -57,8 +57,10 @@ function initializeTaskSelection() {
     // Pre-select some common tasks for demo
     setTimeout(() => {
         document.querySelector('input[value="oil_change"]').checked = true;
-        document.querySelector('input[value="air_filter"]').checked = true;
-        updateSelectedTasks();
+        const airFilter = document.querySelector('input[value="air_filter"]');
+        airFilter.checked = true;
+        // Bubbles to the form so the live quote refreshes too
+        airFilter.dispatchEvent(new Event('change', { bubbles: true }));
     }, 500);
 }
 
@@ -147,6 +149,14 @@ function initializeFormSubmission() {
 
             console.log('Response status:', response.status);
             
+            // Shed under load: the server says when to come back
+            if (response.status === 429 || response.status === 503) {
+                const retryAfter = response.headers.get('Retry-After') || 'a few';
+                showError(`The service is busy right now. Please try again in ${retryAfter} seconds.`);
+                showLoading(false);
+                return;
+            }
+            
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -155,11 +165,8 @@ function initializeFormSubmission() {
             console.log('Received response from server:', data);
 
             if (data.success) {
-                // Add delay to show loading animation
-                setTimeout(() => {
-                    displayResults(data);
-                    showLoading(false);
-                }, 1500);
+                displayResults(data);
+                showLoading(false);
             } else {
                 showError(data.error || 'Prediction failed');
                 showLoading(false);
@@ -171,6 +178,78 @@ function initializeFormSubmission() {
         }
     });
 
+    // Live estimate: once typing settles, ask the read-only /quote endpoint.
+    // Nothing is booked until the form is submitted.
+    const liveQuote = document.getElementById('liveQuote');
+    const liveQuoteTime = document.getElementById('liveQuoteTime');
+    const liveQuoteParts = document.getElementById('liveQuoteParts');
+    let quoteTimer = null;
+    let quoteController = null;
+
+    function scheduleQuote() {
+        clearTimeout(quoteTimer);
+        quoteTimer = setTimeout(requestQuote, 300);
+    }
+
+    async function requestQuote() {
+        const daysSinceLastService = calculateDaysSinceLastService();
+        const formData = getFormData();
+        const complete = daysSinceLastService !== null &&
+            formData.car_model && formData.fuel_type && formData.service_type &&
+            !isNaN(formData.manufacture_year) && !isNaN(formData.total_kilometers) &&
+            !isNaN(formData.km_since_last_service) && formData.selected_tasks.length > 0;
+        if (!complete) {
+            liveQuote.classList.remove('show');
+            return;
+        }
+
+        const params = new URLSearchParams({
+            car_model: formData.car_model,
+            manufacture_year: formData.manufacture_year,
+            fuel_type: formData.fuel_type,
+            service_type: formData.service_type,
+            last_service_days: daysSinceLastService,
+            total_kilometers: formData.total_kilometers,
+            km_since_last_service: formData.km_since_last_service,
+            selected_tasks: formData.selected_tasks.join(',')
+        });
+
+        // Only the latest quote matters; drop any still in flight
+        if (quoteController) {
+            quoteController.abort();
+        }
+        const controller = new AbortController();
+        quoteController = controller;
+        liveQuote.classList.add('stale');
+
+        try {
+            const response = await fetch(`/quote?${params}`, { signal: controller.signal });
+            if (response.status === 429 || response.status === 503) {
+                // Shed under load; keep showing the last estimate
+                return;
+            }
+            const data = await response.json();
+            if (data.success) {
+                liveQuoteTime.textContent = data.predicted_service_time.toFixed(1);
+                liveQuoteParts.textContent = data.parts_availability;
+                liveQuote.classList.add('show');
+            } else {
+                liveQuote.classList.remove('show');
+            }
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.error('Quote error:', error);
+            }
+        } finally {
+            if (quoteController === controller) {
+                liveQuote.classList.remove('stale');
+            }
+        }
+    }
+
+    form.addEventListener('input', scheduleQuote);
+    form.addEventListener('change', scheduleQuote);
+
     function getFormData() {
         const selectedTasks = Array.from(document.querySelectorAll('input[name="tasks"]:checked'))
             .map(checkbox => checkbox.value);
@@ -449,7 +528,7 @@ function prefillSampleData() {
     
     // Calculate days since last service
     const lastServiceDateInput = document.getElementById('last_service_date');
-    const event = new Event('change');
+    const event = new Event('change', { bubbles: true });
     lastServiceDateInput.dispatchEvent(event);
 }
 
@@ -0,0 +1,22 @@
+import numpy as np
+
+from models.heuristic_benchmark import random_bookings, batch_columns
+from utils.model_predictor import CURRENT_YEAR, ServiceTimePredictor, LookupServiceTimePredictor
+
+
+def test_every_quote_matches_the_arithmetic_heuristic():
+    arithmetic = ServiceTimePredictor()
+    lookup = LookupServiceTimePredictor()
+    mismatches = [
+        booking for booking in random_bookings(100000, seed=7)
+        if lookup.quote(booking) != arithmetic.quote(booking)
+    ]
+    assert mismatches == []
+
+
+def test_batch_estimates_are_bit_identical():
+    arithmetic = ServiceTimePredictor()
+    bookings = random_bookings(20000, seed=7)
+    base, columns = batch_columns(bookings)
+    expected = np.array([arithmetic.estimate(b) for b in bookings if b['manufacture_year'] <= CURRENT_YEAR])
+    np.testing.assert_array_equal(LookupServiceTimePredictor().estimate_batch(base, *columns), expected)
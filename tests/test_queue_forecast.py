@@ -0,0 +1,31 @@
+import time
+
+import numpy as np
+
+from utils.queue_forecast import DEFAULT_JOB_HOURS, forecast_completion
+
+# The forecast runs on every booking: 10k trials over 200 queued jobs
+BUDGET_MS = 50.0
+
+
+def test_jobs_go_to_the_next_free_bay():
+    forecast = forecast_completion([10, 1, 1, 1, 1], total_workers=2, noise_sigma=1e-6, seed=1)
+    assert [job['p50'] for job in forecast['jobs']] == [10.0, 1.0, 2.0, 3.0, 4.0]
+    assert forecast['bay']['p50'] == 10.0
+
+
+def test_empty_queue_reports_busy_bays():
+    forecast = forecast_completion([], total_workers=3, busy_workers=2, seed=1)
+    assert forecast['jobs'] == []
+    assert 0 < forecast['bay']['p50'] <= forecast['bay']['p90'] <= DEFAULT_JOB_HOURS
+
+
+def test_forecast_meets_latency_budget():
+    predicted = np.random.default_rng(0).uniform(1, 5, 200).tolist()
+    forecast_completion(predicted, total_workers=8, busy_workers=2, seed=1)
+    best = float('inf')
+    for _ in range(10):
+        start = time.perf_counter()
+        forecast_completion(predicted, total_workers=8, busy_workers=2, trials=10000, seed=1)
+        best = min(best, time.perf_counter() - start)
+    assert best * 1000 < BUDGET_MS
@@ -0,0 +1,156 @@
+"""Admission control for the expensive routes.
+
+Every admitted request passes three gates, cheapest first:
+
+1. A token bucket per client (`rate` requests/s, bursts up to `burst`).
+   An empty bucket is answered 429 with the time until the next token.
+   A request shed by the later gates gets its token back, so a client
+   isn't rate limited for requests the server turned away.
+2. A stall check. If the oldest in-flight request has run longer than
+   `stall_seconds`, the downstream path is stuck and new work is shed with
+   503 rather than piled on top. This clears by itself once the slow
+   requests finish.
+3. A concurrency limit. At most `max_concurrent` requests run at once, and
+   at most `max_queue` more may wait up to `max_wait` seconds for a place.
+   Anything beyond that is shed with 503.
+
+Shed requests cost a dict lookup and a lock, so routes outside the
+controller (health checks, task lists) keep answering under overload.
+Keep max_concurrent + max_queue below the server's thread count so those
+routes always have a thread.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+RATE_LIMITED = 'rate_limited'
+STALLED = 'stalled'
+QUEUE_FULL = 'queue_full'
+WAIT_TIMEOUT = 'wait_timeout'
+
+
+class Rejection:
+    """Why a request was turned away, and the status and Retry-After to send"""
+
+    __slots__ = ('reason', 'status', 'retry_after')
+
+    def __init__(self, reason, status, retry_after):
+        self.reason = reason
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBuckets:
+    """Per-client token buckets, bounded to the `max_clients` most recently seen"""
+
+    def __init__(self, rate=5.0, burst=20, max_clients=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.clock = clock
+        # client -> [tokens, last refill time]
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client):
+        """0 if a token was taken, else seconds until one is available"""
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = [float(self.burst), now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0
+            return (1 - bucket[0]) / self.rate
+
+    def refund(self, client):
+        """Give back a token taken for a request that was then shed"""
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is not None:
+                bucket[0] = min(self.burst, bucket[0] + 1)
+
+
+class AdmissionController:
+    """Token buckets, a stall check and a bounded concurrency limit in front of a route"""
+
+    def __init__(self, rate=5.0, burst=20, max_concurrent=4, max_queue=2, max_wait=0.25,
+                 stall_seconds=5.0, clock=time.monotonic):
+        self.buckets = TokenBuckets(rate, burst, clock=clock)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.stall_seconds = stall_seconds
+        self.clock = clock
+        # ticket -> start time of each admitted request
+        self._in_flight = {}
+        self._waiting = 0
+        self._next_ticket = 0
+        self._cond = threading.Condition()
+        self.rejected = {}
+
+    def _reject(self, reason, status, retry_after):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return None, Rejection(reason, status, retry_after)
+
+    def _oldest_age(self, now):
+        return now - min(self._in_flight.values()) if self._in_flight else 0.0
+
+    def admit(self, client):
+        """(ticket, None) when admitted, else (None, Rejection). Release every ticket."""
+        wait = self.buckets.take(client)
+        if wait:
+            with self._cond:
+                return self._reject(RATE_LIMITED, 429, wait)
+        ticket, rejection = self._admit()
+        if rejection is not None:
+            self.buckets.refund(client)
+        return ticket, rejection
+
+    def _admit(self):
+        """The stall check and concurrency limit for a request that had a token"""
+        with self._cond:
+            now = self.clock()
+            if self._oldest_age(now) > self.stall_seconds:
+                return self._reject(STALLED, 503, self.stall_seconds)
+            if len(self._in_flight) >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    return self._reject(QUEUE_FULL, 503, self.max_wait)
+                self._waiting += 1
+                try:
+                    deadline = time.monotonic() + self.max_wait
+                    while len(self._in_flight) >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return self._reject(WAIT_TIMEOUT, 503, self.max_wait)
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._next_ticket += 1
+            ticket = self._next_ticket
+            self._in_flight[ticket] = self.clock()
+            return ticket, None
+
+    def release(self, ticket):
+        with self._cond:
+            if self._in_flight.pop(ticket, None) is not None:
+                self._cond.notify()
+
+    def status(self):
+        with self._cond:
+            return {
+                'in_flight': len(self._in_flight),
+                'waiting': self._waiting,
+                'oldest_in_flight_seconds': round(self._oldest_age(self.clock()), 3),
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'rejected': dict(self.rejected)
+            }
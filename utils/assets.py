@@ -0,0 +1,139 @@
+"""Content-hashed, precompressed static assets.
+
+Build step (run at deploy time, see render.yaml):
+
+    python -m utils.assets
+
+copies every file under static/ to static/dist/ as name.<hash>.ext. It
+writes a .gz (and, if the brotli package is installed, a .br) next to each
+compressible file, plus manifest.json mapping original to hashed paths.
+Templates call asset_url('css/style.css'). Once the manifest exists that
+resolves to /assets/css/style.<hash>.css, which is served with a one-year
+immutable Cache-Control and the best encoding the browser accepts. Without
+a build it falls back to the plain /static URL.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always built
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.html', '.txt', '.map'}
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 31536000  # one year; the hash changes whenever the content does
+# Preferred first; each entry is (Accept-Encoding token, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def hashed_name(path, content, length=12):
+    """css/style.css -> css/style.<sha256 prefix>.css"""
+    root, ext = os.path.splitext(path)
+    return f'{root}.{hashlib.sha256(content).hexdigest()[:length]}{ext}'
+
+
+def build_assets(static_dir='static', dist_dir=None):
+    """Fingerprint and precompress every static file; returns the manifest"""
+    dist_dir = dist_dir or os.path.join(static_dir, 'dist')
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    manifest = {}
+
+    for root, dirs, files in os.walk(static_dir):
+        # Never fingerprint our own output
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        for filename in sorted(files):
+            source = os.path.join(root, filename)
+            path = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+
+            target_name = hashed_name(path, content)
+            target = os.path.join(dist_dir, target_name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(content)
+
+            if os.path.splitext(filename)[1] in COMPRESSIBLE_EXTENSIONS:
+                # mtime=0 keeps the .gz byte-identical across builds
+                with open(target + '.gz', 'wb') as f:
+                    f.write(gzip.compress(content, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target + '.br', 'wb') as f:
+                        f.write(brotli.compress(content, quality=11))
+            manifest[path] = target_name
+
+    os.makedirs(dist_dir, exist_ok=True)
+    with open(os.path.join(dist_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetPipeline:
+    """Serves built assets and exposes `asset_url` to templates"""
+
+    def __init__(self, app=None, dist_dir=None):
+        self.dist_dir = dist_dir
+        self.manifest = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.dist_dir = self.dist_dir or os.path.join(app.static_folder, 'dist')
+        self.manifest = self._load_manifest()
+        # Only names from the manifest are served from /assets
+        self._hashed = set(self.manifest.values())
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.add_template_global(self.asset_url, 'asset_url')
+        if self.manifest:
+            print(f"Serving {len(self.manifest)} fingerprinted assets from {self.dist_dir}")
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST_NAME), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def asset_url(self, path):
+        """URL for a static file: fingerprinted when built, plain /static otherwise"""
+        hashed = self.manifest.get(path)
+        if hashed is None:
+            return url_for('static', filename=path)
+        return url_for('assets', filename=hashed)
+
+    def serve(self, filename):
+        """Send a fingerprinted asset, precompressed if the client accepts it"""
+        if filename not in self._hashed:
+            return 'Not found', 404
+
+        encoding, suffix = None, ''
+        for token, candidate in ENCODINGS:
+            if request.accept_encodings[token] and os.path.exists(
+                    os.path.join(self.dist_dir, filename + candidate)):
+                encoding, suffix = token, candidate
+                break
+
+        response = send_from_directory(
+            self.dist_dir, filename + suffix,
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            max_age=IMMUTABLE_MAX_AGE
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        return response
+
+
+if __name__ == '__main__':
+    built = build_assets()
+    print(f"Built {len(built)} assets into static/dist")
+    for path, target in sorted(built.items()):
+        print(f"  {path} -> {target}")
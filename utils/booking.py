@@ -0,0 +1,235 @@
+"""Appointment calendars for a center's service bays.
+
+Times are whole minutes from midnight on a given date. Each bay keeps one
+BayDay per date: parallel sorted lists of booking starts and ends. Because
+bookings never overlap within a bay, both lists are sorted together, and
+every question is a bisect:
+
+* is [start, end) free?            bisect the starts, compare neighbours
+* earliest free gap of length d?   bisect to `not_before`, walk the gaps
+* all free windows                 walk the gaps (output-sensitive)
+
+Partitioning by date keeps each list to one working day's bookings, so
+weeks of future bookings cost a dict lookup, not a longer search.
+"""
+import math
+import threading
+from bisect import bisect_left, bisect_right
+
+DEFAULT_OPENING_HOUR = 9
+DEFAULT_CLOSING_HOUR = 18
+SLOT_MINUTES = 15
+MAX_SEARCH_DAYS = 28
+BOOKING_HORIZON_DAYS = 90
+
+
+class SlotUnavailableError(ValueError):
+    """Raised when a requested slot overlaps a booking or falls outside opening hours"""
+
+
+def format_minute(minute):
+    return f'{minute // 60:02d}:{minute % 60:02d}'
+
+
+def parse_minute(value):
+    """'HH:MM' -> minutes from midnight"""
+    hours, _, minutes = str(value).partition(':')
+    minute = int(hours) * 60 + int(minutes or 0)
+    if not 0 <= minute <= 24 * 60:
+        raise ValueError(f'Invalid time: {value}')
+    return minute
+
+
+class BayDay:
+    """One bay's bookings on one date, as parallel sorted start/end lists"""
+
+    __slots__ = ('starts', 'ends', 'ids')
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+
+    def is_free(self, start, end):
+        i = bisect_right(self.starts, start)
+        if i > 0 and self.ends[i - 1] > start:
+            return False
+        return i == len(self.starts) or self.starts[i] >= end
+
+    def add(self, start, end, appointment_id):
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, appointment_id)
+
+    def remove(self, start, appointment_id):
+        i = bisect_left(self.starts, start)
+        if i < len(self.ids) and self.ids[i] == appointment_id:
+            del self.starts[i], self.ends[i], self.ids[i]
+
+    def gaps(self, not_before, close):
+        """Free [start, end) windows from not_before until close"""
+        # The first booking that could bound a gap after not_before
+        i = bisect_right(self.ends, not_before)
+        cursor = not_before
+        for j in range(i, len(self.starts)):
+            if self.starts[j] > cursor:
+                yield cursor, min(self.starts[j], close)
+            cursor = max(cursor, self.ends[j])
+            if cursor >= close:
+                return
+        if cursor < close:
+            yield cursor, close
+
+    def earliest(self, duration, not_before, close):
+        for start, end in self.gaps(not_before, close):
+            if end - start >= duration:
+                return start
+        return None
+
+
+class BookingEngine:
+    """Per-bay calendars for future appointments at one center.
+
+    The engine is an in-memory index. Durable storage and the final
+    no-overlap check live in ServiceStore; the engine is filled from it
+    when a center is loaded and a day is reloaded before booking on it.
+    """
+
+    def __init__(self, total_workers=8, opening_hour=DEFAULT_OPENING_HOUR,
+                 closing_hour=DEFAULT_CLOSING_HOUR, slot_minutes=SLOT_MINUTES):
+        self.total_workers = total_workers
+        self.open_minute = opening_hour * 60
+        self.close_minute = closing_hour * 60
+        self.slot_minutes = slot_minutes
+        # date (ISO string) -> [BayDay per bay]
+        self._days = {}
+        self.appointments = {}
+        self._lock = threading.Lock()
+
+    def duration_minutes(self, hours):
+        """Whole slots needed for a job of `hours`"""
+        slots = max(1, math.ceil(round(hours * 60 / self.slot_minutes, 6)))
+        return slots * self.slot_minutes
+
+    def _align(self, minute):
+        return -(-minute // self.slot_minutes) * self.slot_minutes
+
+    def _bays(self, day, create=False):
+        bays = self._days.get(day)
+        if bays is None and create:
+            bays = self._days[day] = [BayDay() for _ in range(self.total_workers)]
+        return bays
+
+    def earliest_slot(self, day, duration, not_before=None, bay=None):
+        """{'bay', 'start', 'end'} of the earliest free slot on `day` (in any bay, or `bay`), or None"""
+        not_before = max(self.open_minute, self._align(not_before or 0))
+        candidates = range(self.total_workers) if bay is None else [self.check_bay(bay)]
+        with self._lock:
+            bays = self._bays(day)
+            if bays is None:
+                # Nothing booked that day: every bay is free from opening
+                if not_before + duration > self.close_minute:
+                    return None
+                return {'bay': candidates[0], 'start': not_before, 'end': not_before + duration}
+            best = None
+            for bay in candidates:
+                start = bays[bay].earliest(duration, not_before, self.close_minute)
+                if start is not None and (best is None or start < best[1]):
+                    best = (bay, start)
+                    if start == not_before:
+                        break
+        if best is None:
+            return None
+        return {'bay': best[0], 'start': best[1], 'end': best[1] + duration}
+
+    def free_windows(self, day, min_duration=0, not_before=None):
+        """{bay: [(start, end), ...]} of free windows at least `min_duration` long"""
+        not_before = max(self.open_minute, self._align(not_before or 0))
+        with self._lock:
+            bays = self._bays(day)
+            if bays is None:
+                window = [(not_before, self.close_minute)] if self.close_minute - not_before >= max(min_duration, 1) else []
+                return {bay: list(window) for bay in range(self.total_workers)}
+            return {
+                bay: [(s, e) for s, e in calendar.gaps(not_before, self.close_minute) if e - s >= max(min_duration, 1)]
+                for bay, calendar in enumerate(bays)
+            }
+
+    def check_bay(self, bay):
+        if not 0 <= bay < self.total_workers:
+            raise ValueError(f'No bay {bay} (this center has {self.total_workers})')
+        return bay
+
+    def check_window(self, start, end):
+        """Raise ValueError unless [start, end) is on the slot grid within opening hours"""
+        if start % self.slot_minutes:
+            raise ValueError(f'Slots start on {self.slot_minutes}-minute boundaries')
+        if start < self.open_minute or end > self.close_minute:
+            raise ValueError(
+                f'Slot must fall between {format_minute(self.open_minute)} and {format_minute(self.close_minute)}')
+
+    def check(self, day, start, end, bay):
+        """Raise ValueError for an invalid request, SlotUnavailableError if it is taken"""
+        self.check_bay(bay)
+        self.check_window(start, end)
+        bays = self._bays(day)
+        if bays is not None and not bays[bay].is_free(start, end):
+            raise SlotUnavailableError(f'Bay {bay} is already booked at {format_minute(start)} on {day}')
+
+    def choose_bay(self, day, start, end):
+        """First bay free for [start, end), or None"""
+        with self._lock:
+            bays = self._bays(day)
+            if bays is None:
+                return 0
+            for bay, calendar in enumerate(bays):
+                if calendar.is_free(start, end):
+                    return bay
+        return None
+
+    def _index(self, appointment):
+        self.check(appointment['day'], appointment['start'], appointment['end'], appointment['bay'])
+        self._bays(appointment['day'], create=True)[appointment['bay']].add(
+            appointment['start'], appointment['end'], appointment['appointment_id'])
+        self.appointments[appointment['appointment_id']] = appointment
+
+    def add(self, appointment):
+        """Index an appointment dict with day, bay, start, end and appointment_id"""
+        with self._lock:
+            self._index(appointment)
+        return appointment
+
+    def reload_day(self, day, appointments):
+        """Replace one date's bookings with `appointments`, e.g. fresh from the store.
+
+        Other workers book and cancel through the shared store, so this
+        engine's copy of a day can be stale until reloaded.
+        """
+        with self._lock:
+            for calendar in self._days.pop(day, ()):
+                for appointment_id in calendar.ids:
+                    self.appointments.pop(appointment_id, None)
+            for appointment in appointments:
+                try:
+                    self._index(appointment)
+                except ValueError as e:
+                    print(f"Skipping appointment {appointment['appointment_id']}: {e}")
+
+    def remove(self, appointment_id):
+        with self._lock:
+            appointment = self.appointments.pop(appointment_id, None)
+            if appointment is not None:
+                self._days[appointment['day']][appointment['bay']].remove(appointment['start'], appointment_id)
+        return appointment
+
+    def drop_before(self, day):
+        """Forget every date earlier than `day` (ISO strings sort by date)"""
+        with self._lock:
+            for past in [d for d in self._days if d < day]:
+                for calendar in self._days.pop(past):
+                    for appointment_id in calendar.ids:
+                        self.appointments.pop(appointment_id, None)
+
+    def booked_count(self):
+        return len(self.appointments)
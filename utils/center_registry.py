@@ -0,0 +1,203 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from utils.booking import BookingEngine, DEFAULT_OPENING_HOUR, DEFAULT_CLOSING_HOUR
+from utils.event_stream import QueueEventBroadcaster
+from utils.inventory_manager import InventoryManager
+from utils.service_center import ServiceCenter
+
+DEFAULT_CENTER_ID = 'default'
+CENTER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class InvalidCenterError(ValueError):
+    """Raised for center IDs that can't name a partition"""
+
+
+class UnknownCenterError(LookupError):
+    """Raised for well-formed center IDs that name no configured center"""
+
+
+class Center:
+    """Everything one dealership owns: its bays, queue, appointments, stock and live feed"""
+
+    def __init__(self, center_id, total_workers, inventory_file, on_transition=None,
+                 opening_hour=DEFAULT_OPENING_HOUR, closing_hour=DEFAULT_CLOSING_HOUR, appointments=()):
+        self.center_id = center_id
+        # Serialises multi-step operations on this center only
+        self.lock = threading.RLock()
+        self.service_center = ServiceCenter(total_workers=total_workers)
+        if on_transition is not None:
+            self.service_center.add_transition_listener(on_transition)
+        self.bookings = BookingEngine(total_workers, opening_hour, closing_hour)
+        for appointment in appointments:
+            try:
+                self.bookings.add(appointment)
+            except ValueError as e:
+                # e.g. opening hours changed since it was booked; keep the rest
+                print(f"Skipping appointment {appointment['appointment_id']}: {e}")
+        self.inventory_manager = InventoryManager(inventory_file)
+        self.queue_events = QueueEventBroadcaster(self.service_center.get_queue_info)
+        self.service_center.add_listener(self.queue_events.notify)
+        self.last_access = time.monotonic()
+        # Requests currently holding this center; guarded by the registry lock
+        self.users = 0
+
+    def is_idle(self):
+        """True when nothing is queued and no screen is listening"""
+        return not self.service_center.queue and self.queue_events.subscriber_count() == 0
+
+
+class CenterRegistry:
+    """Lazily loaded, bounded map of center ID to its partition.
+
+    Only the default center, the centers listed in the config file and
+    centers that already have an inventory file exist; any other ID raises
+    UnknownCenterError, so requests can't create centers.
+
+    Lookups are a single dict access under a short registry lock; loading a
+    center's inventory happens under a per-center lock instead, so one slow
+    load never blocks requests for other centers and a center is only ever
+    created once. When more than ``max_loaded`` centers are resident, the
+    least recently used idle ones are evicted (their inventory is already
+    on disk). Busy centers, and centers a request holds through
+    ``acquire``, are never evicted.
+    """
+
+    def __init__(self, default_inventory_file='inventory.json', inventory_dir='inventories',
+                 config_file='centers.json', default_workers=8, max_loaded=256,
+                 idle_ttl=1800, on_transition=None, load_appointments=None):
+        self.default_inventory_file = default_inventory_file
+        # callback(service_id, status, at) for job lifecycle changes in any center
+        self.on_transition = on_transition
+        # callback(center_id) -> stored future appointments, so an evicted
+        # center comes back with its calendar
+        self.load_appointments = load_appointments
+        self.inventory_dir = inventory_dir
+        self.default_workers = default_workers
+        self.max_loaded = max_loaded
+        self.idle_ttl = idle_ttl
+        self.config = self._load_config(config_file)
+        self._centers = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._last_sweep = time.monotonic()
+
+    def _load_config(self, config_file):
+        """Per-center overrides: {"center_id": {"total_workers": n, "inventory_file": path,
+        "opening_hour": h, "closing_hour": h}}"""
+        try:
+            if config_file and os.path.exists(config_file):
+                with open(config_file, 'r') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading center config: {e}")
+        return {}
+
+    def _inventory_path(self, center_id):
+        return os.path.join(self.inventory_dir, f'{center_id}.json')
+
+    def _exists(self, center_id):
+        """Only the default center, configured centers and ones with an inventory can be loaded"""
+        return (center_id == DEFAULT_CENTER_ID or center_id in self.config
+                or os.path.exists(self._inventory_path(center_id)))
+
+    def _create(self, center_id):
+        settings = self.config.get(center_id, {})
+        if 'inventory_file' in settings:
+            inventory_file = settings['inventory_file']
+        elif center_id == DEFAULT_CENTER_ID:
+            inventory_file = self.default_inventory_file
+        else:
+            os.makedirs(self.inventory_dir, exist_ok=True)
+            inventory_file = self._inventory_path(center_id)
+        return Center(
+            center_id,
+            settings.get('total_workers', self.default_workers),
+            inventory_file,
+            on_transition=self.on_transition,
+            opening_hour=settings.get('opening_hour', DEFAULT_OPENING_HOUR),
+            closing_hour=settings.get('closing_hour', DEFAULT_CLOSING_HOUR),
+            appointments=self.load_appointments(center_id) if self.load_appointments else ()
+        )
+
+    def get(self, center_id=None):
+        """Return the partition for a center, loading it on first use"""
+        return self._get(center_id, hold=False)
+
+    def acquire(self, center_id=None):
+        """Like get, but the center can't be evicted until it is released"""
+        return self._get(center_id, hold=True)
+
+    def release(self, center):
+        with self._lock:
+            center.users -= 1
+
+    def _lookup_locked(self, center_id, hold):
+        center = self._centers.get(center_id)
+        if center is not None:
+            self._centers.move_to_end(center_id)
+            center.last_access = time.monotonic()
+            if hold:
+                center.users += 1
+        return center
+
+    def _get(self, center_id, hold):
+        center_id = center_id or DEFAULT_CENTER_ID
+        with self._lock:
+            center = self._lookup_locked(center_id, hold)
+            if center is not None:
+                return center
+        if not CENTER_ID_PATTERN.match(center_id):
+            raise InvalidCenterError(f'Invalid center ID: {center_id}')
+        if not self._exists(center_id):
+            raise UnknownCenterError(f'Unknown center ID: {center_id}')
+
+        with self._lock:
+            loading = self._loading.setdefault(center_id, threading.Lock())
+
+        with loading:
+            with self._lock:
+                # Another thread may have loaded it while we waited
+                center = self._lookup_locked(center_id, hold)
+            if center is not None:
+                return center
+            created = self._create(center_id)
+            with self._lock:
+                self._centers[center_id] = created
+                self._loading.pop(center_id, None)
+                center = self._lookup_locked(center_id, hold)
+                self._evict_locked()
+        return center
+
+    def _evict_locked(self):
+        """Drop idle centers beyond capacity or past their idle TTL"""
+        now = time.monotonic()
+        sweep = now - self._last_sweep >= 60
+        if not sweep and len(self._centers) <= self.max_loaded:
+            return
+        for center_id in list(self._centers):
+            if center_id == DEFAULT_CENTER_ID:
+                continue
+            center = self._centers[center_id]
+            over_capacity = len(self._centers) > self.max_loaded
+            expired = now - center.last_access > self.idle_ttl
+            if not over_capacity and not (sweep and expired):
+                # OrderedDict is LRU-first: once we're within capacity only
+                # TTL expiry matters, and that is checked on sweeps only
+                if not sweep:
+                    break
+                continue
+            if center.users == 0 and center.is_idle():
+                del self._centers[center_id]
+        if sweep:
+            self._last_sweep = now
+
+    def loaded_centers(self):
+        """IDs of centers currently resident in this process"""
+        with self._lock:
+            return list(self._centers)
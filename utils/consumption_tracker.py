@@ -0,0 +1,98 @@
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+SECONDS_PER_DAY = 86400.0
+
+
+class ConsumptionTracker:
+    """Exponentially weighted daily usage rate for every (model, part) cell.
+
+    Each cell keeps just two numbers: the decayed rate and when it was last
+    updated. A decrement of ``q`` units at time ``t`` does
+
+        rate = rate * exp(-(t - last) / tau) + q / tau
+
+    which, for steady usage of r units/day, settles at r. The current
+    rate is the stored rate decayed to "now", so projections never replay
+    history and cost O(1) per part. Arrays are laid out like the
+    InventoryMatrix they shadow and grow with it.
+    """
+
+    def __init__(self, half_life_days=14.0):
+        # tau such that a usage event's weight halves every half_life_days
+        self.tau_days = half_life_days / math.log(2)
+        self.rate = np.zeros((0, 0))
+        self.last_update = np.zeros((0, 0))
+
+    def _ensure_shape(self, shape):
+        if self.rate.shape == shape:
+            return
+        rate = np.zeros(shape)
+        last_update = np.zeros(shape)
+        rows = min(shape[0], self.rate.shape[0])
+        cols = min(shape[1], self.rate.shape[1])
+        rate[:rows, :cols] = self.rate[:rows, :cols]
+        last_update[:rows, :cols] = self.last_update[:rows, :cols]
+        self.rate, self.last_update = rate, last_update
+
+    def record(self, shape, model_index, part_index, quantity, now=None):
+        """Fold one decrement into the running rate"""
+        self._ensure_shape(shape)
+        now = time.time() if now is None else now
+        last = self.last_update[model_index, part_index]
+        if last:
+            elapsed_days = max(0.0, (now - last) / SECONDS_PER_DAY)
+            self.rate[model_index, part_index] *= math.exp(-elapsed_days / self.tau_days)
+        self.rate[model_index, part_index] += quantity / self.tau_days
+        self.last_update[model_index, part_index] = now
+
+    def current_rates(self, shape, now=None):
+        """Daily usage rate of every cell, decayed to `now`"""
+        self._ensure_shape(shape)
+        now = time.time() if now is None else now
+        elapsed_days = np.maximum(0.0, (now - self.last_update) / SECONDS_PER_DAY)
+        return np.where(self.last_update > 0, self.rate * np.exp(-elapsed_days / self.tau_days), 0.0)
+
+    def project(self, quantity, threshold, lead_time_days=7.0, cover_days=14.0, now=None):
+        """Days until each cell runs out and how many units to reorder.
+
+        The reorder quantity tops stock up to cover the supplier lead time
+        plus `cover_days` of usage on top of the reorder threshold.
+        """
+        rates = self.current_rates(quantity.shape, now)
+        with np.errstate(divide='ignore'):
+            days_to_stockout = np.where(rates > 0, quantity / np.where(rates > 0, rates, 1.0), np.inf)
+        target = rates * (lead_time_days + cover_days) + threshold
+        reorder = np.ceil(np.maximum(0.0, target - quantity)).astype(np.int64)
+        return rates, days_to_stockout, reorder
+
+    def to_dict(self, models, parts):
+        """Export non-empty cells as {model: {part: [rate, last_update]}}"""
+        self._ensure_shape((len(models), len(parts)))
+        state = {}
+        for i, j in zip(*np.nonzero(self.last_update)):
+            state.setdefault(models[i], {})[parts[j]] = [float(self.rate[i, j]), float(self.last_update[i, j])]
+        return state
+
+    def load_dict(self, state, model_index, part_index):
+        """Restore state exported by to_dict, skipping unknown cells"""
+        self._ensure_shape((len(model_index), len(part_index)))
+        for model, parts in state.items():
+            for part, (rate, last_update) in parts.items():
+                i, j = model_index.get(model), part_index.get(part)
+                if i is not None and j is not None:
+                    self.rate[i, j] = rate
+                    self.last_update[i, j] = last_update
+
+    def save(self, path, models, parts):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(models, parts), f)
+
+    def load(self, path, model_index, part_index):
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.load_dict(json.load(f), model_index, part_index)
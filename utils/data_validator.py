@@ -1,52 +1,484 @@
 import re
+from itertools import chain
+from operator import methodcaller
+
+import numpy as np
+
+from utils.model_predictor import (
+    DATASET_CAR_MODELS, DATASET_FUEL_TYPES, DATASET_SERVICE_TYPES, DATASET_PARTS_AVAILABILITY
+)
+
+NUMBER_PLATE_PATTERN = re.compile(r'^[A-Z]{2}\d{1,2}[A-Z]{1,2}\d{1,4}$')
+NUMBER_PLATE_ERROR = 'Invalid car number plate format. Use format like MH12AB1234'
+
+MIN_MANUFACTURE_YEAR = 2000
+MAX_MANUFACTURE_YEAR = 2024
+MAX_LAST_SERVICE_DAYS = 3650
+MAX_TASKS = 20
 
 def validate_number_plate(number_plate):
     """Validate Indian car number plate format (MH12AB1234)"""
     if not number_plate:
         return False
-    pattern = r'^[A-Z]{2}\d{1,2}[A-Z]{1,2}\d{1,4}$'
-    return bool(re.match(pattern, number_plate.upper()))
-
-def validate_inputs(data):
-    """Validate all input fields"""
-    required_fields = [
-        'car_number_plate', 'car_model', 'manufacture_year', 
-        'fuel_type', 'service_type', 'last_service_days',
-        'total_kilometers', 'km_since_last_service', 'number_of_tasks'
-    ]
-    
-    # Check for missing fields
-    for field in required_fields:
-        if field not in data or data[field] is None:
+    return NUMBER_PLATE_PATTERN.match(number_plate.upper()) is not None
+
+# Compiled request schema: the fields a booking payload must carry and the
+# range rules for its numeric fields, in the order errors are reported.
+# Text fields must be non-empty strings; the plate has its own pattern below.
+# Each numeric rule is (field, minimum, maximum, below_min_error, above_max_error).
+REQUEST_TEXT_FIELDS = ('car_model', 'fuel_type', 'service_type')
+REQUEST_NUMERIC_RULES = (
+    ('manufacture_year', MIN_MANUFACTURE_YEAR, MAX_MANUFACTURE_YEAR,
+     'Manufacture year must be between 2000 and 2024',
+     'Manufacture year must be between 2000 and 2024'),
+    ('last_service_days', 0, MAX_LAST_SERVICE_DAYS,
+     'Last service days cannot be negative',
+     'Last service date seems too far in the past'),
+    ('total_kilometers', 0, None,
+     'Total kilometers cannot be negative', None),
+    ('km_since_last_service', 0, None,
+     'KM since last service cannot be negative', None),
+)
+REQUEST_REQUIRED_FIELDS = (
+    'car_number_plate', 'car_model', 'manufacture_year',
+    'fuel_type', 'service_type', 'last_service_days',
+    'total_kilometers', 'km_since_last_service'
+)
+NO_TASKS_ERROR = 'Please select at least one service task'
+TOO_MANY_TASKS_ERROR = 'Number of tasks cannot exceed 20'
+BAD_TASKS_ERROR = 'selected_tasks must be a list of task names'
+BAD_NUMBER_ERROR = 'Invalid numeric value in input fields'
+BAD_PAYLOAD_ERROR = 'Request body must be a JSON object'
+
+
+class ServiceRequest:
+    """A parsed and validated service booking payload"""
+    __slots__ = (
+        'car_number_plate', 'car_model', 'manufacture_year', 'fuel_type',
+        'service_type', 'last_service_days', 'total_kilometers',
+        'km_since_last_service', 'selected_tasks'
+    )
+
+    def __init__(self, car_number_plate, car_model, manufacture_year, fuel_type,
+                 service_type, last_service_days, total_kilometers,
+                 km_since_last_service, selected_tasks):
+        self.car_number_plate = car_number_plate
+        self.car_model = car_model
+        self.manufacture_year = manufacture_year
+        self.fuel_type = fuel_type
+        self.service_type = service_type
+        self.last_service_days = last_service_days
+        self.total_kilometers = total_kilometers
+        self.km_since_last_service = km_since_last_service
+        self.selected_tasks = selected_tasks
+
+    @property
+    def number_of_tasks(self):
+        """Task count is always derived from the selected tasks"""
+        return len(self.selected_tasks)
+
+    def to_features(self, worker_availability):
+        """Build the feature dict expected by predict_service_time"""
+        return {
+            'car_model': self.car_model,
+            'manufacture_year': self.manufacture_year,
+            'fuel_type': self.fuel_type,
+            'service_type': self.service_type,
+            'last_service_days': self.last_service_days,
+            'total_kilometers': self.total_kilometers,
+            'km_since_last_service': self.km_since_last_service,
+            'number_of_tasks': len(self.selected_tasks),
+            'worker_availability': worker_availability,
+            'selected_tasks': self.selected_tasks
+        }
+
+
+def _check_tasks(selected_tasks):
+    """Return an error message for a bad task list, or None"""
+    if not isinstance(selected_tasks, list) or not all(isinstance(t, str) for t in selected_tasks):
+        return BAD_TASKS_ERROR
+    if not selected_tasks:
+        return NO_TASKS_ERROR
+    if len(selected_tasks) > MAX_TASKS:
+        return TOO_MANY_TASKS_ERROR
+    return None
+
+
+def parse_service_request(data, require_plate=True):
+    """Parse and validate a booking payload in a single pass.
+
+    Returns {'valid': True, 'request': ServiceRequest} or
+    {'valid': False, 'error': message}. ``number_of_tasks`` sent by the
+    client is not trusted; the count comes from ``selected_tasks``.
+    Quotes pass ``require_plate=False``: the plate is then optional and
+    only validated when present.
+    """
+    if not isinstance(data, dict):
+        return {'valid': False, 'error': BAD_PAYLOAD_ERROR}
+    for field in REQUEST_REQUIRED_FIELDS:
+        if field == 'car_number_plate' and not require_plate:
+            continue
+        if data.get(field) is None:
             return {'valid': False, 'error': f'Missing required field: {field}'}
-    
-    # Validate numeric fields
+    for field in REQUEST_TEXT_FIELDS:
+        value = data[field]
+        if not isinstance(value, str) or not value.strip():
+            return {'valid': False, 'error': f'{field} must be a non-empty string'}
+
+    numbers = {}
+    try:
+        for field, minimum, maximum, low_error, high_error in REQUEST_NUMERIC_RULES:
+            value = int(data[field])
+            # Stored as SQLite INTEGER, so it must fit in 64 bits
+            if not -2 ** 63 <= value < 2 ** 63:
+                raise OverflowError(field)
+            if value < minimum:
+                return {'valid': False, 'error': low_error}
+            if maximum is not None and value > maximum:
+                return {'valid': False, 'error': high_error}
+            numbers[field] = value
+    except (ValueError, TypeError, OverflowError):
+        return {'valid': False, 'error': BAD_NUMBER_ERROR}
+
+    number_plate = data.get('car_number_plate')
+    if number_plate is not None or require_plate:
+        number_plate = str(number_plate).strip().upper()
+        if NUMBER_PLATE_PATTERN.match(number_plate) is None:
+            return {'valid': False, 'error': NUMBER_PLATE_ERROR}
+
+    selected_tasks = data.get('selected_tasks', [])
+    tasks_error = _check_tasks(selected_tasks)
+    if tasks_error:
+        return {'valid': False, 'error': tasks_error}
+
+    return {'valid': True, 'request': ServiceRequest(
+        car_number_plate=number_plate,
+        car_model=data['car_model'],
+        manufacture_year=numbers['manufacture_year'],
+        fuel_type=data['fuel_type'],
+        service_type=data['service_type'],
+        last_service_days=numbers['last_service_days'],
+        total_kilometers=numbers['total_kilometers'],
+        km_since_last_service=numbers['km_since_last_service'],
+        selected_tasks=selected_tasks
+    )}
+
+
+# Element types of an object column, as a ufunc over the whole column
+_type_of = np.frompyfunc(type, 1, 1)
+_length_of = np.frompyfunc(len, 1, 1)
+_strip = np.frompyfunc(methodcaller('strip'), 1, 1)
+# Every valid plate line becomes this marker; plates are upper-cased first, so no input can equal it
+_PLATE_LINES = re.compile(NUMBER_PLATE_PATTERN.pattern, re.MULTILINE)
+_VALID_PLATE = 'ok'
+MAX_INT_DIGITS = 18
+
+
+def _int_or_none(value):
+    """int(value) if it parses and fits in int64, else None"""
     try:
-        year = int(data['manufacture_year'])
-        if year < 2000 or year > 2024:
-            return {'valid': False, 'error': 'Manufacture year must be between 2000 and 2024'}
-        
-        last_service_days = int(data['last_service_days'])
-        if last_service_days < 0:
-            return {'valid': False, 'error': 'Last service days cannot be negative'}
-        if last_service_days > 3650:
-            return {'valid': False, 'error': 'Last service date seems too far in the past'}
-        
-        total_kms = int(data['total_kilometers'])
-        if total_kms < 0:
-            return {'valid': False, 'error': 'Total kilometers cannot be negative'}
-        
-        km_since_service = int(data['km_since_last_service'])
-        if km_since_service < 0:
-            return {'valid': False, 'error': 'KM since last service cannot be negative'}
-        
-        num_tasks = int(data['number_of_tasks'])
-        if num_tasks <= 0:
-            return {'valid': False, 'error': 'Number of tasks must be greater than 0'}
-        if num_tasks > 20:
-            return {'valid': False, 'error': 'Number of tasks cannot exceed 20'}
-            
-    except (ValueError, TypeError):
-        return {'valid': False, 'error': 'Invalid numeric value in input fields'}
-    
-    return {'valid': True}
\ No newline at end of file
+        number = int(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return number if -2 ** 63 <= number < 2 ** 63 else None
+
+
+_safe_int = np.frompyfunc(_int_or_none, 1, 1)
+
+
+def _column(rows, field, default=None):
+    """One field of every payload as an object array"""
+    return np.fromiter(map(methodcaller('get', field, default), rows), dtype=object, count=len(rows))
+
+
+def _int_column(values):
+    """Convert an object column to int64 the way int() treats JSON values.
+
+    Booleans, ints and finite floats convert by casting (floats truncate).
+    Strings that are an optional sign and ASCII digits are parsed by one
+    cast; the rare rest (underscores, non-ASCII digits) go through int()
+    itself. Values outside int64 are unparseable. Returns (array,
+    unparseable_mask).
+    """
+    kind = _type_of(values)
+    column = np.zeros(len(values), dtype=np.int64)
+    bad = np.ones(len(values), dtype=bool)
+
+    is_bool = kind == bool
+    column[is_bool] = values[is_bool].astype(np.int64)
+    bad[is_bool] = False
+
+    is_float = kind == float
+    floats = values[is_float].astype(np.float64)
+    finite = np.isfinite(floats) & (np.abs(floats) < 10.0 ** MAX_INT_DIGITS)
+    column[is_float] = np.trunc(np.where(finite, floats, 0)).astype(np.int64)
+    bad[is_float] = ~finite
+
+    is_int = kind == int
+    try:
+        column[is_int] = values[is_int].astype(np.int64)
+        bad[is_int] = False
+    except OverflowError:
+        ints = _safe_int(values[is_int])
+        fits = _type_of(ints) == int
+        column[is_int] = np.where(fits, ints, 0).astype(np.int64)
+        bad[is_int] = ~fits
+
+    is_text = kind == str
+    text = np.strings.strip(values[is_text].astype(np.str_))
+    digits = np.strings.lstrip(text, '+-')
+    n_digits = np.strings.str_len(digits)
+    plain = (np.strings.isdecimal(digits)
+             & (np.strings.str_len(text) - n_digits <= 1)
+             & (n_digits <= MAX_INT_DIGITS)
+             & (np.strings.str_len(np.strings.encode(digits, 'utf-8')) == n_digits))
+    parsed = np.where(plain, text, '0').astype(np.int64)
+    parseable = plain.copy()
+    if not plain.all():
+        other = _safe_int(values[is_text][~plain])
+        fits = _type_of(other) == int
+        parsed[~plain] = np.where(fits, other, 0).astype(np.int64)
+        parseable[~plain] = fits
+    column[is_text] = parsed
+    bad[is_text] = ~parseable
+    return column, bad
+
+
+def _plates_valid(plates):
+    """Normalised plates and a mask of the ones matching NUMBER_PLATE_PATTERN, in one regex pass"""
+    normalised = np.strings.upper(np.strings.strip(plates.astype(np.str_)))
+    # One line per plate: a newline inside a plate must not split it
+    lines = np.strings.replace(normalised, '\n', ' ')
+    marked = _PLATE_LINES.sub(_VALID_PLATE, '\n'.join(lines.tolist())).split('\n')
+    return normalised, np.array(marked, dtype=object) == _VALID_PLATE
+
+
+def _task_errors(tasks):
+    """Masks for BAD_TASKS_ERROR, NO_TASKS_ERROR and TOO_MANY_TASKS_ERROR over a task-list column"""
+    is_list = _type_of(tasks) == list
+    lists = tasks[is_list]
+    lengths = np.zeros(len(tasks), dtype=np.int64)
+    lengths[is_list] = _length_of(lists).astype(np.int64)
+
+    # Non-string task names, counted per list over the flattened names
+    names = np.fromiter(chain.from_iterable(lists), dtype=object, count=int(lengths.sum()))
+    owner = np.repeat(np.arange(len(lists)), lengths[is_list])
+    non_strings = np.bincount(owner, weights=_type_of(names) != str, minlength=len(lists))
+    bad = ~is_list
+    bad[is_list] = non_strings > 0
+    return bad, lengths == 0, lengths > MAX_TASKS
+
+
+def _blank_text(values):
+    """Mask of the entries in an object column that are not non-empty strings"""
+    is_text = _type_of(values) == str
+    blank = ~is_text
+    blank[is_text] = _length_of(_strip(values[is_text])) == 0
+    return blank
+
+
+def validate_service_requests(payloads, require_plate=True):
+    """Validate a batch of booking payloads column-wise.
+
+    Each rule is applied to a whole column at once and every row reports the
+    same first error that parse_service_request would give it, including
+    the optional plate under ``require_plate=False``. Returns
+    {'requests': [(row, ServiceRequest), ...], 'errors': [{'row', 'error'}, ...]}.
+    """
+    n_rows = len(payloads)
+    # error_code holds the index into `messages` of each row's first failure
+    messages = []
+    error_code = np.full(n_rows, -1, dtype=np.int64)
+
+    def flag(mask, message):
+        messages.append(message)
+        np.copyto(error_code, len(messages) - 1, where=mask & (error_code < 0))
+
+    rows = np.fromiter(payloads, dtype=object, count=n_rows)
+    not_object = _type_of(rows) != dict
+    flag(not_object, BAD_PAYLOAD_ERROR)
+    rows[not_object] = [{}] * int(not_object.sum())
+
+    columns = {}
+    for field in REQUEST_REQUIRED_FIELDS:
+        columns[field] = _column(rows, field)
+        if field == 'car_number_plate' and not require_plate:
+            continue
+        flag(_type_of(columns[field]) == type(None), f'Missing required field: {field}')
+    for field in REQUEST_TEXT_FIELDS:
+        flag(_blank_text(columns[field]), f'{field} must be a non-empty string')
+
+    numbers = {}
+    for field, minimum, maximum, low_error, high_error in REQUEST_NUMERIC_RULES:
+        numbers[field], unparseable = _int_column(columns[field])
+        flag(unparseable, BAD_NUMBER_ERROR)
+        flag(numbers[field] < minimum, low_error)
+        if maximum is not None:
+            flag(numbers[field] > maximum, high_error)
+
+    plates, valid_plates = _plates_valid(columns['car_number_plate'])
+    given = _type_of(columns['car_number_plate']) != type(None)
+    flag(~valid_plates & (given | require_plate), NUMBER_PLATE_ERROR)
+    plates = np.where(given | require_plate, plates, None)
+
+    tasks = _column(rows, 'selected_tasks', [])
+    for mask, message in zip(_task_errors(tasks), (BAD_TASKS_ERROR, NO_TASKS_ERROR, TOO_MANY_TASKS_ERROR)):
+        flag(mask, message)
+
+    failed = np.flatnonzero(error_code >= 0)
+    errors = [{'row': row, 'error': messages[code]}
+              for row, code in zip(failed.tolist(), error_code[failed].tolist())]
+    valid = np.flatnonzero(error_code < 0)
+    requests = [
+        (row, ServiceRequest(plate, car_model, year, fuel_type, service_type, days, kms, km_since, selected))
+        for row, plate, car_model, year, fuel_type, service_type, days, kms, km_since, selected in zip(
+            valid.tolist(), plates[valid].tolist(), columns['car_model'][valid].tolist(),
+            numbers['manufacture_year'][valid].tolist(), columns['fuel_type'][valid].tolist(),
+            columns['service_type'][valid].tolist(), numbers['last_service_days'][valid].tolist(),
+            numbers['total_kilometers'][valid].tolist(), numbers['km_since_last_service'][valid].tolist(),
+            tasks[valid].tolist())
+    ]
+    return {'requests': requests, 'errors': errors}
+
+
+# Training-dataset schema: the request rules above, applied to dataset columns.
+# Each numeric rule is (column, minimum, maximum, whole_number, below_min_error, above_max_error).
+DATASET_NUMERIC_RULES = (
+    ('Manufacture_Year', MIN_MANUFACTURE_YEAR, MAX_MANUFACTURE_YEAR, True,
+     'Manufacture year must be between 2000 and 2024',
+     'Manufacture year must be between 2000 and 2024'),
+    ('Last_Service_Days_Ago', 0, MAX_LAST_SERVICE_DAYS, True,
+     'Last service days cannot be negative',
+     'Last service date seems too far in the past'),
+    ('Total_Kms', 0, None, False,
+     'Total kilometers cannot be negative', None),
+    ('Km_From_Last_Service', 0, None, False,
+     'KM since last service cannot be negative', None),
+    ('Worker_Availability', 0, None, True,
+     'Worker availability cannot be negative', None),
+    ('No_Of_Tasks', 1, MAX_TASKS, True,
+     'Number of tasks must be greater than 0', TOO_MANY_TASKS_ERROR),
+)
+DATASET_CATEGORIES = {
+    'Car_Model': DATASET_CAR_MODELS,
+    'Fuel_Type': tuple(DATASET_FUEL_TYPES.values()),
+    'Service_Type': tuple(DATASET_SERVICE_TYPES.values()),
+    'Parts_Availability': DATASET_PARTS_AVAILABILITY,
+}
+DATASET_TARGET = 'Service_Time_Hours'
+# Bump when the rules change, so cached training matrices are rebuilt
+DATASET_SCHEMA_VERSION = 1
+
+
+def _canonical_categories(series, labels):
+    """Map a column onto `labels`, ignoring case and surrounding spaces.
+
+    Works on the distinct values only, so the per-row cost is one code
+    lookup. Returns (Categorical over `labels`, missing_mask, unknown_mask).
+    """
+    import pandas as pd
+    column = series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    index = {str(label).lower(): i for i, label in enumerate(labels)}
+    # Code -1 (a missing value) indexes the trailing -1
+    remap = np.array([index.get(str(value).strip().lower(), -1) for value in column.cat.categories] + [-1])
+    codes = column.cat.codes.to_numpy()
+    canonical = remap[codes]
+    missing = codes == -1
+    return pd.Categorical.from_codes(canonical, categories=list(labels)), missing, (canonical == -1) & ~missing
+
+
+def validate_dataset(df):
+    """Validate and clean a training DataFrame (or one chunk of it) column-wise.
+
+    Every rule is a boolean mask over the whole column and is counted on
+    its own, so a row breaking two rules counts under both. Category labels
+    are normalised to the dataset's spelling, numbers are coerced, and rows
+    breaking any rule are dropped. Returns (clean_df, report), where
+    report['violations'] maps each rule to {'message', 'rows'}.
+    """
+    # Imported here so the web app, which only validates requests, doesn't load pandas
+    import pandas as pd
+    columns = list(DATASET_CATEGORIES) + [rule[0] for rule in DATASET_NUMERIC_RULES] + [DATASET_TARGET]
+    absent = [column for column in columns if column not in df.columns]
+    if absent:
+        raise ValueError(f'Dataset is missing columns: {", ".join(absent)}')
+
+    n_rows = len(df)
+    rejected = np.zeros(n_rows, dtype=bool)
+    violations = {}
+    cleaned = {}
+    whole_columns = set()
+
+    def flag(rule, mask, message):
+        violations[rule] = {'message': message, 'rows': int(np.count_nonzero(mask))}
+        rejected[mask] = True
+
+    for column, labels in DATASET_CATEGORIES.items():
+        cleaned[column], missing, unknown = _canonical_categories(df[column], labels)
+        flag(f'{column}.missing', missing, f'Missing required field: {column}')
+        flag(f'{column}.unknown', unknown, f'{column} must be one of: {", ".join(labels)}')
+
+    def numeric(column):
+        values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+        missing = df[column].isna().to_numpy()
+        flag(f'{column}.missing', missing, f'Missing required field: {column}')
+        flag(f'{column}.not_numeric', ~np.isfinite(values) & ~missing, BAD_NUMBER_ERROR)
+        return values
+
+    # NaN compares False, so missing and unparseable values only count once
+    for column, minimum, maximum, whole_number, low_error, high_error in DATASET_NUMERIC_RULES:
+        values = numeric(column)
+        if whole_number:
+            whole_columns.add(column)
+            flag(f'{column}.not_whole', np.isfinite(values) & (values != np.floor(values)),
+                 f'{column} must be a whole number')
+        flag(f'{column}.below_min', values < minimum, low_error)
+        if maximum is not None:
+            flag(f'{column}.above_max', values > maximum, high_error)
+        cleaned[column] = values
+
+    target = numeric(DATASET_TARGET)
+    flag(f'{DATASET_TARGET}.not_positive', target <= 0, 'Service time must be positive')
+    cleaned[DATASET_TARGET] = target
+
+    keep = ~rejected
+    clean = pd.DataFrame(index=df.index[keep])
+    for column in df.columns:
+        if column in DATASET_CATEGORIES:
+            clean[column] = cleaned[column][keep]
+        elif column in cleaned and not pd.api.types.is_numeric_dtype(df[column]):
+            # Parsed from text: whole-number columns go back to integers
+            values = cleaned[column][keep]
+            clean[column] = values.astype(np.int64) if column in whole_columns else values
+        else:
+            clean[column] = df[column].to_numpy()[keep]
+
+    report = {
+        'rows': n_rows,
+        'clean_rows': int(keep.sum()),
+        'dropped_rows': int(rejected.sum()),
+        'violations': violations
+    }
+    return clean, report
+
+
+def merge_dataset_reports(reports):
+    """Sum the reports of several chunks into one"""
+    merged = {'rows': 0, 'clean_rows': 0, 'dropped_rows': 0, 'violations': {}}
+    for report in reports:
+        for key in ('rows', 'clean_rows', 'dropped_rows'):
+            merged[key] += report[key]
+        for rule, violation in report['violations'].items():
+            entry = merged['violations'].setdefault(rule, {'message': violation['message'], 'rows': 0})
+            entry['rows'] += violation['rows']
+    return merged
+
+
+def format_dataset_report(report):
+    """Human-readable summary listing only the rules that rejected rows"""
+    lines = [f"Validated {report['rows']:,} rows: {report['clean_rows']:,} clean, "
+             f"{report['dropped_rows']:,} dropped"]
+    for rule, violation in report['violations'].items():
+        if violation['rows']:
+            lines.append(f"  {rule:<36} {violation['rows']:>10,}  {violation['message']}")
+    return '\n'.join(lines)
@@ -0,0 +1,310 @@
+"""Online accuracy and input-drift monitor.
+
+Accuracy: every completed job with a real duration feeds its error
+(actual - predicted hours) into EWMA estimates of MAE and bias, and into a
+fixed-bucket error histogram for quantiles.
+
+Drift: every booking's features are binned with the edges stored in the
+model's reference histograms (see models/reference_histograms.py). The
+live distribution is compared to the training one with the population
+stability index (PSI).
+
+Both kinds of histogram are windowed. Counts go into a current window, and
+when it holds `window` observations it replaces the previous one. Reports
+cover the last one to two windows, so old traffic ages out, memory is
+fixed by the bucket counts, and each update is O(1): a bisect over at most
+ten edges.
+
+Under gunicorn each worker sees only its own traffic. With `state_dir` set,
+workers periodically write their counts to a shared directory, and a report
+sums every live worker's histograms, the way utils/metrics.py merges
+snapshots. MAE and bias are averaged across workers, weighted by their
+window outcomes. An exited worker's state is dropped: the report covers
+recent traffic, so there is nothing to keep.
+"""
+import glob
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+
+from utils.metrics import pid_alive
+from utils.model_predictor import dataset_row_from_features
+from utils.shared_model import MANIFEST, is_current, shared_model_path
+
+ERROR_BUCKET_HOURS = 0.25
+MAX_ERROR_HOURS = 24.0
+QUANTILES = (0.1, 0.5, 0.9)
+# Usual PSI reading: below 0.1 stable, up to 0.25 moderate shift, above that significant
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+PSI_EPSILON = 1e-4
+OTHER_CATEGORY = '__other__'
+STATE_FILE_PATTERN = 'drift_*.json'
+
+
+class WindowedCounts:
+    """Fixed-size bucket counts over the last one to two windows of observations"""
+
+    __slots__ = ('window', 'current', 'previous', 'filled')
+
+    def __init__(self, buckets, window):
+        self.window = window
+        self.current = [0] * buckets
+        self.previous = [0] * buckets
+        self.filled = 0
+
+    def add(self, bucket):
+        self.current[bucket] += 1
+        self.filled += 1
+        if self.filled >= self.window:
+            self.previous = self.current
+            self.current = [0] * len(self.previous)
+            self.filled = 0
+
+    def counts(self):
+        return [a + b for a, b in zip(self.current, self.previous)]
+
+
+def psi(actual_counts, expected_proportions):
+    """Population stability index of live counts against reference shares"""
+    total = sum(actual_counts)
+    if not total:
+        return None
+    score = 0.0
+    for count, expected in zip(actual_counts, expected_proportions):
+        actual = max(count / total, PSI_EPSILON)
+        expected = max(expected, PSI_EPSILON)
+        score += (actual - expected) * math.log(actual / expected)
+    return score
+
+
+def drift_level(score):
+    if score is None:
+        return 'no_data'
+    if score < PSI_MODERATE:
+        return 'stable'
+    return 'moderate' if score < PSI_SIGNIFICANT else 'significant'
+
+
+def load_reference(model_path):
+    """Reference histograms saved with a trained model, or None"""
+    try:
+        # The shared export's manifest carries them without unpickling the model
+        if is_current(model_path):
+            with open(os.path.join(shared_model_path(model_path), MANIFEST), 'r') as f:
+                return json.load(f)['metadata'].get('reference_histograms')
+        # Only the pickle fallback needs joblib; the server runs without it
+        import joblib
+        return joblib.load(model_path).get('metadata', {}).get('reference_histograms')
+    except Exception:
+        return None
+
+
+def _state_path(state_dir, pid):
+    return os.path.join(state_dir, f'drift_{pid}.json')
+
+
+def remove_drift_state(pid, state_dir):
+    """Forget an exited worker's drift state (gunicorn child_exit hook)"""
+    try:
+        os.remove(_state_path(state_dir, pid))
+    except FileNotFoundError:
+        pass
+
+
+def clear_drift_states(state_dir):
+    """Remove drift state left by an earlier run (gunicorn on_starting hook)"""
+    os.makedirs(state_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(state_dir, STATE_FILE_PATTERN)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _weighted_mean(values_and_weights):
+    pairs = [(value, weight) for value, weight in values_and_weights if value is not None]
+    total = sum(weight for _, weight in pairs)
+    if not pairs:
+        return None
+    if not total:
+        return sum(value for value, _ in pairs) / len(pairs)
+    return sum(value * weight for value, weight in pairs) / total
+
+
+class DriftMonitor:
+    """Rolling prediction accuracy and feature drift against the training data"""
+
+    def __init__(self, reference=None, window=1000, alpha=0.02, state_dir=None, flush_interval=1.0):
+        self.reference = reference
+        self.window = window
+        self.alpha = alpha
+        self.state_dir = state_dir
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+
+        self.outcomes = 0
+        self.mae = None
+        self.bias = None
+        self._half_range = int(MAX_ERROR_HOURS / ERROR_BUCKET_HOURS)
+        self.errors = WindowedCounts(2 * self._half_range + 1, window)
+
+        self.bookings = 0
+        self._numerical = {}
+        self._categorical = {}
+        if reference:
+            for column, spec in reference['numerical'].items():
+                self._numerical[column] = (spec['edges'], WindowedCounts(len(spec['edges']) + 1, window))
+            for column, shares in reference['categorical'].items():
+                labels = list(shares) + [OTHER_CATEGORY]
+                index = {label: i for i, label in enumerate(labels)}
+                self._categorical[column] = (index, WindowedCounts(len(labels), window))
+
+    def observe_outcome(self, predicted_hours, actual_hours):
+        """Record a finished job's predicted and actual duration"""
+        error = actual_hours - predicted_hours
+        bucket = min(max(round(error / ERROR_BUCKET_HOURS), -self._half_range), self._half_range)
+        with self._lock:
+            self.outcomes += 1
+            if self.mae is None:
+                self.mae, self.bias = abs(error), error
+            else:
+                self.mae += self.alpha * (abs(error) - self.mae)
+                self.bias += self.alpha * (error - self.bias)
+            self.errors.add(bucket + self._half_range)
+
+    def observe_features(self, features):
+        """Record one booking's inputs; a no-op without reference histograms"""
+        if not self.reference:
+            return
+        row = dataset_row_from_features(features)
+        with self._lock:
+            self.bookings += 1
+            for column, (edges, counts) in self._numerical.items():
+                counts.add(bisect_right(edges, row[column]))
+            for column, (index, counts) in self._categorical.items():
+                counts.add(index.get(str(row[column]), index[OTHER_CATEGORY]))
+
+    def _error_quantiles(self, counts):
+        total = sum(counts)
+        if not total:
+            return {}
+        quantiles = {}
+        seen = 0
+        targets = iter(QUANTILES)
+        target = next(targets)
+        for bucket, count in enumerate(counts):
+            seen += count
+            while target is not None and seen >= target * total:
+                quantiles[f'p{int(target * 100)}'] = (bucket - self._half_range) * ERROR_BUCKET_HOURS
+                target = next(targets, None)
+        return quantiles
+
+    def state(self):
+        """JSON-serialisable copy of this process's counts and estimates"""
+        with self._lock:
+            return {
+                'outcomes': self.outcomes,
+                'mae': self.mae,
+                'bias': self.bias,
+                'errors': self.errors.counts(),
+                'bookings': self.bookings,
+                'numerical': {column: counts.counts() for column, (_, counts) in self._numerical.items()},
+                'categorical': {column: counts.counts() for column, (_, counts) in self._categorical.items()}
+            }
+
+    def flush(self):
+        """Write this process's state for other workers to merge"""
+        if not self.state_dir:
+            return
+        path = _state_path(self.state_dir, os.getpid())
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state(), f)
+        os.replace(tmp_path, path)
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        """Flush at most once per flush_interval; cheap enough to call per request"""
+        if self.state_dir and time.monotonic() - self._last_flush >= self.flush_interval:
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error flushing drift state: {e}")
+
+    def _states(self):
+        """This process's live state plus every other live worker's last flushed one"""
+        states = [self.state()]
+        if not self.state_dir:
+            return states
+        own_path = _state_path(self.state_dir, os.getpid())
+        for path in glob.glob(os.path.join(self.state_dir, STATE_FILE_PATTERN)):
+            if path == own_path:
+                continue
+            try:
+                pid = int(os.path.basename(path)[len('drift_'):-len('.json')])
+            except ValueError:
+                continue
+            if not pid_alive(pid):
+                remove_drift_state(pid, self.state_dir)
+                continue
+            try:
+                with open(path) as f:
+                    states.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return states
+
+    def report(self):
+        states = self._states()
+
+        def summed(counts_list):
+            return [sum(column) for column in zip(*counts_list)]
+
+        error_counts = summed([state['errors'] for state in states])
+        numerical = {column: summed([state['numerical'][column] for state in states if column in state['numerical']])
+                     for column in self._numerical}
+        categorical = {column: (list(index), summed([state['categorical'][column] for state in states
+                                                     if column in state['categorical']]))
+                       for column, (index, _) in self._categorical.items()}
+        weights = [sum(state['errors']) for state in states]
+        mae = _weighted_mean(zip([state['mae'] for state in states], weights))
+        bias = _weighted_mean(zip([state['bias'] for state in states], weights))
+        accuracy = {
+            'outcomes': sum(state['outcomes'] for state in states),
+            'window_outcomes': sum(error_counts),
+            'mae_hours': round(mae, 3) if mae is not None else None,
+            'bias_hours': round(bias, 3) if bias is not None else None
+        }
+        bookings = sum(state['bookings'] for state in states)
+
+        accuracy['error_quantiles_hours'] = self._error_quantiles(error_counts)
+        features = {}
+        if self.reference:
+            for column, counts in numerical.items():
+                score = psi(counts, self.reference['numerical'][column]['proportions'])
+                features[column] = {'psi': round(score, 4) if score is not None else None,
+                                    'drift': drift_level(score)}
+            for column, (labels, counts) in categorical.items():
+                shares = self.reference['categorical'][column]
+                score = psi(counts, [shares.get(label, 0.0) for label in labels])
+                features[column] = {
+                    'psi': round(score, 4) if score is not None else None,
+                    'drift': drift_level(score),
+                    'unseen_share': round(counts[-1] / sum(counts), 4) if sum(counts) else 0.0
+                }
+        return {
+            'window': self.window,
+            'accuracy': accuracy,
+            'drift': {
+                'reference_rows': self.reference['rows'] if self.reference else None,
+                'bookings': bookings,
+                'features': features
+            }
+        }
@@ -0,0 +1,121 @@
+import json
+import threading
+
+
+class _Subscriber:
+    """Single-slot mailbox holding the latest payload for one client"""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._payload = None
+
+    def offer(self, payload):
+        """Replace any undelivered payload with the newest one"""
+        with self._condition:
+            self._payload = payload
+            self._condition.notify()
+
+    def take(self, timeout):
+        """Wait for the next payload, returning None on timeout"""
+        with self._condition:
+            if self._payload is None:
+                self._condition.wait(timeout)
+            payload, self._payload = self._payload, None
+            return payload
+
+
+class StreamSlots:
+    """Process-wide cap on open event streams.
+
+    Under gthread workers every open stream holds a server thread for as
+    long as the client stays connected, so streams must leave threads free
+    for every other route.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a slot; False when every slot is in use"""
+        with self._lock:
+            if self._open >= self.limit:
+                return False
+            self._open += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._open = max(0, self._open - 1)
+
+    def count(self):
+        with self._lock:
+            return self._open
+
+
+class QueueEventBroadcaster:
+    """Push queue/workload snapshots to Server-Sent Events subscribers.
+
+    Changes reported through ``notify`` are coalesced: the first change in a
+    burst schedules a single flush ``coalesce_window`` seconds later, and the
+    flush only reaches clients if the snapshot actually differs from the last
+    one sent. Slow clients never build a backlog because each subscriber only
+    keeps the most recent payload.
+    """
+
+    def __init__(self, snapshot_fn, coalesce_window=0.25, keepalive_interval=15.0):
+        self.snapshot_fn = snapshot_fn
+        self.coalesce_window = coalesce_window
+        self.keepalive_interval = keepalive_interval
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._pending = False
+        self._last_payload = None
+
+    def notify(self):
+        """Record that the queue changed; bursts collapse into one broadcast"""
+        with self._lock:
+            if self._pending:
+                return
+            self._pending = True
+        timer = threading.Timer(self.coalesce_window, self._flush)
+        timer.daemon = True
+        timer.start()
+
+    def _flush(self):
+        """Snapshot the current state and deliver it if it changed"""
+        with self._lock:
+            self._pending = False
+        payload = json.dumps(self.snapshot_fn(), sort_keys=True)
+        with self._lock:
+            if payload == self._last_payload:
+                return
+            self._last_payload = payload
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.offer(payload)
+
+    def subscriber_count(self):
+        """Number of currently connected clients"""
+        with self._lock:
+            return len(self._subscribers)
+
+    def stream(self):
+        """Generator yielding SSE frames for one client connection"""
+        subscriber = _Subscriber()
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            # Send the current state straight away so the screen isn't blank
+            initial = json.dumps(self.snapshot_fn(), sort_keys=True)
+            yield f"event: queue\ndata: {initial}\n\n"
+            while True:
+                payload = subscriber.take(self.keepalive_interval)
+                if payload is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: queue\ndata: {payload}\n\n"
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
@@ -1,12 +1,131 @@
-import random
-import string
-from datetime import datetime
+import base64
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# Service ID layout (80 bits, encoded as 16 base32 characters):
+#   44 bits  milliseconds since SERVICE_ID_EPOCH_MS (good for ~550 years)
+#   22 bits  worker ID - the process ID by default (Linux pid_max <= 2**22)
+#   14 bits  per-process sequence within the same millisecond
+SERVICE_ID_PREFIX = 'VOL'
+SERVICE_ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+TIMESTAMP_BITS = 44
+WORKER_BITS = 22
+SEQUENCE_BITS = 14
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# base64's RFC 4648 alphabet doesn't sort in ASCII order, so map it onto an
+# ordered (Crockford) alphabet; the IDs then sort lexicographically by time.
+_ORDERED_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_B32_TO_ORDERED = bytes.maketrans(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567', _ORDERED_ALPHABET.encode('ascii'))
+_ORDERED_TO_B32 = bytes.maketrans(_ORDERED_ALPHABET.encode('ascii'), b'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567')
+
+# The first 13 characters cover 65 bits (timestamp + all but the lowest
+# worker bit) and are cached per millisecond. The last 3 characters carry the
+# lowest worker bit plus the 14-bit sequence and come from lookup tables.
+_PREFIX_CHARS = 13
+_LOW_PAIRS = [_ORDERED_ALPHABET[i >> 5] + _ORDERED_ALPHABET[i & 31] for i in range(1024)]
+
+def _default_worker_id():
+    """Worker ID from SERVICE_ID_WORKER, falling back to the process ID"""
+    configured = os.environ.get('SERVICE_ID_WORKER')
+    worker_id = int(configured) if configured else os.getpid()
+    return worker_id & MAX_WORKER_ID
+
+
+class ServiceIdGenerator:
+    """Snowflake-style, time-sortable service ID generator.
+
+    IDs are unique across processes without coordination because each
+    process stamps its own worker ID; within a process a sequence counter
+    separates IDs created in the same millisecond. When several hosts share
+    a store, give each one a distinct SERVICE_ID_WORKER range.
+    """
+
+    def __init__(self, worker_id=None):
+        self._lock = threading.Lock()
+        self._fixed_worker_id = worker_id
+        self.worker_id = worker_id if worker_id is not None else _default_worker_id()
+        self._last_ms = 0
+        self._sequence = 0
+        self._prefix_ms = -1
+        self._prefix = ''
+
+    def reset_after_fork(self):
+        """Pick up the child's process ID so forked workers never collide"""
+        self._lock = threading.Lock()
+        if self._fixed_worker_id is None:
+            self.worker_id = _default_worker_id()
+        self._last_ms = 0
+        self._sequence = 0
+        self._prefix_ms = -1
+
+    def _reserve(self, count):
+        """Reserve `count` consecutive sequence numbers; returns (prefix, first_seq)"""
+        with self._lock:
+            now_ms = time.time_ns() // 1000000 - SERVICE_ID_EPOCH_MS
+            # Never move backwards if the wall clock is adjusted
+            if now_ms <= self._last_ms:
+                now_ms = self._last_ms
+                if self._sequence + count - 1 > MAX_SEQUENCE:
+                    # Sequence exhausted for this millisecond: borrow the next one
+                    now_ms += 1
+                    self._sequence = 0
+            else:
+                self._sequence = 0
+            first = self._sequence
+            self._sequence += count
+            self._last_ms = now_ms
+            if now_ms != self._prefix_ms:
+                value = ((now_ms << WORKER_BITS) | self.worker_id) << SEQUENCE_BITS
+                encoded = base64.b32encode(value.to_bytes(10, 'big')).translate(_B32_TO_ORDERED)
+                self._prefix = SERVICE_ID_PREFIX + encoded[:_PREFIX_CHARS].decode('ascii')
+                self._prefix_ms = now_ms
+            return self._prefix, first
+
+    def next_id(self):
+        """Generate one service ID"""
+        prefix, sequence = self._reserve(1)
+        high = ((self.worker_id & 1) << 4) | (sequence >> 10)
+        return prefix + _ORDERED_ALPHABET[high] + _LOW_PAIRS[sequence & 1023]
+
+    def next_ids(self, count):
+        """Generate `count` IDs with a single lock acquisition per millisecond"""
+        ids = []
+        worker_bit = (self.worker_id & 1) << 4
+        while count > 0:
+            chunk = min(count, MAX_SEQUENCE + 1)
+            prefix, first = self._reserve(chunk)
+            for block in range(first >> 10, ((first + chunk - 1) >> 10) + 1):
+                head = prefix + _ORDERED_ALPHABET[worker_bit | block]
+                start = max(first, block << 10) & 1023
+                stop = ((min(first + chunk, (block + 1) << 10) - 1) & 1023) + 1
+                ids.extend([head + pair for pair in _LOW_PAIRS[start:stop]])
+            count -= chunk
+        return ids
+
+
+def parse_service_id(service_id):
+    """Decode a service ID into its creation time, worker ID and sequence"""
+    body = service_id[len(SERVICE_ID_PREFIX):].encode('ascii')
+    value = int.from_bytes(base64.b32decode(body.translate(_ORDERED_TO_B32)), 'big')
+    sequence = value & MAX_SEQUENCE
+    worker_id = (value >> SEQUENCE_BITS) & MAX_WORKER_ID
+    now_ms = value >> (SEQUENCE_BITS + WORKER_BITS)
+    created_at = datetime.fromtimestamp((now_ms + SERVICE_ID_EPOCH_MS) / 1000, tz=timezone.utc)
+    return {'created_at': created_at, 'worker_id': worker_id, 'sequence': sequence}
+
+
+# Global generator instance
+_id_generator = ServiceIdGenerator()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_id_generator.reset_after_fork)
 
 def generate_service_id():
-    """Generate unique service ID"""
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    random_str = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-    return f"VOL{timestamp}{random_str}"
+    """Generate unique, time-sortable service ID"""
+    return _id_generator.next_id()
 
 def format_time(hours):
     """Format time in hours to readable format"""
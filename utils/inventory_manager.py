@@ -1,12 +1,95 @@
 import json
 import os
 import random
+import time
+
+import numpy as np
+
+from utils.inventory_matrix import InventoryMatrix
+from utils.consumption_tracker import ConsumptionTracker
+
+# Parts consumed by each service type
+SERVICE_REQUIREMENTS = {
+    "general": {
+        "oil_filter": 1,
+        "air_filter": 1,
+        "engine_oil": 1
+    },
+    "basic": {
+        "oil_filter": 1,
+        "air_filter": 1,
+        "engine_oil": 1
+    },
+    "standard": {
+        "oil_filter": 1,
+        "air_filter": 1,
+        "fuel_filter": 1,
+        "engine_oil": 1
+    },
+    "premium": {
+        "oil_filter": 1,
+        "air_filter": 1,
+        "fuel_filter": 1,
+        "spark_plugs": 4,
+        "engine_oil": 1
+    },
+    "major": {
+        "oil_filter": 1,
+        "air_filter": 1,
+        "fuel_filter": 1,
+        "spark_plugs": 4,
+        "brake_pads": 1,
+        "engine_oil": 1
+    }
+}
+
+# Parts consumed by each selectable task
+TASK_REQUIREMENTS = {
+    'oil_change': {'oil_filter': 1, 'engine_oil': 1},
+    'air_filter': {'air_filter': 1},
+    'spark_plugs': {'spark_plugs': 4},
+    'fuel_filter': {'fuel_filter': 1},
+    'brake_pads': {'brake_pads': 1},
+    'brake_fluid': {'brake_fluid': 1},
+    'brake_discs': {'brake_discs': 1},
+    'wheel_alignment': {},  # No parts required
+    'tire_rotation': {},    # No parts required
+    'wheel_balancing': {},  # No parts required
+    'tire_replacement': {'tires': 1},
+    'ac_service': {'ac_gas': 1},
+    'ac_filter': {'ac_filter': 1},
+    'coolant_flush': {'coolant': 1},
+    'battery_replacement': {'battery': 1},
+    'bulb_replacement': {},  # Bulbs are typically in stock
+    'electrical_check': {},  # No parts required
+    'car_wash': {},         # No parts required
+    'diagnostic_scan': {},  # No parts required
+    'suspension_check': {}  # No parts required
+}
 
 class InventoryManager:
     def __init__(self, inventory_file='inventory.json'):
         self.inventory_file = inventory_file
-        self.inventory = self._load_inventory()
+        # Stock is held as a models x parts matrix; JSON is only the file format
+        self.matrix = InventoryMatrix.from_dict(self._load_inventory())
+        # Running usage rates per (model, part), persisted next to the inventory
+        self.usage_file = os.path.splitext(inventory_file)[0] + '.usage.json'
+        self.consumption = ConsumptionTracker()
+        try:
+            self.consumption.load(self.usage_file, self.matrix.model_index, self.matrix.part_index)
+        except Exception as e:
+            print(f"Error loading usage history: {e}")
+    
+    @property
+    def inventory(self):
+        """Nested-dict view of the stock (export format)"""
+        return self.matrix.to_dict()
     
+    def _save_inventory(self):
+        """Write the current stock back to the JSON file"""
+        with open(self.inventory_file, 'w') as f:
+            json.dump(self.matrix.to_dict(), f, indent=2)
+
     def _load_inventory(self):
         """Load inventory data from JSON file"""
         try:
@@ -95,101 +178,49 @@ class InventoryManager:
         
         return default_inventory
     
-    def check_parts_availability(self, car_model, service_type):
-        """Check parts availability for specific car model and service type"""
-        print(f"Checking parts for model: {car_model}, service: {service_type}")
-        
-        # Normalize car model name (handle case variations)
-        car_model = car_model.upper()
-        available_models = [model.upper() for model in self.inventory.keys()]
-        
-        if car_model not in available_models:
-            # Try to find matching model
-            for model in self.inventory.keys():
-                if car_model in model.upper() or model.upper() in car_model:
-                    car_model = model
-                    break
-            else:
-                print(f"Model {car_model} not found in inventory. Available models: {list(self.inventory.keys())}")
-                return "Model not found"
-        
-        # Get the correct case model name
-        actual_model = None
-        for model in self.inventory.keys():
-            if model.upper() == car_model:
-                actual_model = model
-                break
-        
-        if not actual_model:
-            print(f"Could not find actual model for: {car_model}")
-            return "Model not found"
-        
-        model_inventory = self.inventory[actual_model]
-        print(f"Found inventory for model: {actual_model}")
-        
-        # Define required parts for different service types with quantities
-        service_requirements = {
-            "general": {
-                "oil_filter": 1,
-                "air_filter": 1,
-                "engine_oil": 1
-            },
-            "basic": {
-                "oil_filter": 1,
-                "air_filter": 1,
-                "engine_oil": 1
-            },
-            "standard": {
-                "oil_filter": 1,
-                "air_filter": 1,
-                "fuel_filter": 1,
-                "engine_oil": 1
-            },
-            "premium": {
-                "oil_filter": 1,
-                "air_filter": 1,
-                "fuel_filter": 1,
-                "spark_plugs": 4,
-                "engine_oil": 1
-            },
-            "major": {
-                "oil_filter": 1,
-                "air_filter": 1,
-                "fuel_filter": 1,
-                "spark_plugs": 4,
-                "brake_pads": 1,
-                "engine_oil": 1
-            }
-        }
-        
-        required_parts = service_requirements.get(service_type, {})
-        print(f"Required parts for {service_type}: {required_parts}")
-        
-        # Check if all required parts are available
+    def _parts_status(self, model_index, required_parts):
+        """Split required parts into missing and low-stock lists for one model"""
+        matrix = self.matrix
         missing_parts = []
         low_stock_parts = []
         available_parts = []
-        
-        for part, required_qty in required_parts.items():
-            if part not in model_inventory:
+        if not required_parts:
+            return missing_parts, low_stock_parts, available_parts
+        
+        names = list(required_parts.keys())
+        columns = [matrix.part_index.get(part, -1) for part in names]
+        known = [j for j in columns if j >= 0]
+        quantity = matrix.quantity[model_index, known]
+        threshold = matrix.threshold[model_index, known]
+        present = matrix.present[model_index, known]
+        
+        k = 0
+        for part, j in zip(names, columns):
+            if j < 0:
                 missing_parts.append(part)
-                print(f"Part {part} not found in inventory for model {actual_model}")
                 continue
-                
-            current_qty = model_inventory[part]["quantity"]
-            min_threshold = model_inventory[part]["min_threshold"]
-            
-            print(f"Part {part}: current={current_qty}, required={required_qty}, min_threshold={min_threshold}")
-            
-            if current_qty < required_qty:
+            if not present[k] or quantity[k] < required_parts[part]:
                 missing_parts.append(part)
-                print(f"Part {part} out of stock (current: {current_qty}, required: {required_qty})")
-            elif current_qty <= min_threshold:
+            elif quantity[k] <= threshold[k]:
                 low_stock_parts.append(part)
-                print(f"Part {part} low stock (current: {current_qty}, threshold: {min_threshold})")
             else:
                 available_parts.append(part)
-                print(f"Part {part} available (current: {current_qty})")
+            k += 1
+        return missing_parts, low_stock_parts, available_parts
+    
+    def check_parts_availability(self, car_model, service_type):
+        """Check parts availability for specific car model and service type"""
+        print(f"Checking parts for model: {car_model}, service: {service_type}")
+        
+        model_index = self.matrix.resolve_model(car_model)
+        if model_index is None:
+            print(f"Model {car_model} not found in inventory. Available models: {self.matrix.models}")
+            return "Model not found"
+        
+        required_parts = SERVICE_REQUIREMENTS.get(service_type, {})
+        print(f"Required parts for {service_type}: {required_parts}")
+        
+        missing_parts, low_stock_parts, available_parts = self._parts_status(model_index, required_parts)
         
         print(f"Missing parts: {missing_parts}")
         print(f"Low stock parts: {low_stock_parts}")
@@ -208,80 +239,27 @@ class InventoryManager:
     def check_parts_availability_for_tasks(self, car_model, service_type, selected_tasks):
         """Check parts availability based on selected tasks"""
         print(f"Checking parts for tasks: {selected_tasks}")
-        
-        # Normalize car model name
-        car_model = car_model.upper()
-        available_models = [model.upper() for model in self.inventory.keys()]
-        
-        if car_model not in available_models:
-            for model in self.inventory.keys():
-                if car_model in model.upper() or model.upper() in car_model:
-                    car_model = model
-                    break
-            else:
-                return "Model not found"
-        
-        # Get the correct case model name
-        actual_model = None
-        for model in self.inventory.keys():
-            if model.upper() == car_model:
-                actual_model = model
-                break
-        
-        if not actual_model:
-            return "Model not found"
-        
-        model_inventory = self.inventory[actual_model]
-        
-        # Map tasks to required parts
-        task_requirements = {
-            'oil_change': {'oil_filter': 1, 'engine_oil': 1},
-            'air_filter': {'air_filter': 1},
-            'spark_plugs': {'spark_plugs': 4},
-            'fuel_filter': {'fuel_filter': 1},
-            'brake_pads': {'brake_pads': 1},
-            'brake_fluid': {'brake_fluid': 1},
-            'brake_discs': {'brake_discs': 1},
-            'wheel_alignment': {},  # No parts required
-            'tire_rotation': {},    # No parts required
-            'wheel_balancing': {},  # No parts required
-            'tire_replacement': {'tires': 1},
-            'ac_service': {'ac_gas': 1},
-            'ac_filter': {'ac_filter': 1},
-            'coolant_flush': {'coolant': 1},
-            'battery_replacement': {'battery': 1},
-            'bulb_replacement': {},  # Bulbs are typically in stock
-            'electrical_check': {},  # No parts required
-            'car_wash': {},         # No parts required
-            'diagnostic_scan': {},  # No parts required
-            'suspension_check': {}  # No parts required
-        }
-        
-        # Collect all required parts from selected tasks
+        return self.parts_status_for_tasks(car_model, selected_tasks)
+    
+    def parts_for_tasks(self, selected_tasks):
+        """Total quantity of each part the selected tasks need"""
         required_parts = {}
         for task in selected_tasks:
-            if task in task_requirements:
-                for part, quantity in task_requirements[task].items():
+            if task in TASK_REQUIREMENTS:
+                for part, quantity in TASK_REQUIREMENTS[task].items():
                     required_parts[part] = required_parts.get(part, 0) + quantity
+        return required_parts
+    
+    def parts_status_for_tasks(self, car_model, selected_tasks):
+        """Parts availability summary for selected tasks, without logging (used by quotes)"""
+        model_index = self.matrix.resolve_model(car_model)
+        if model_index is None:
+            return "Model not found"
         
-        print(f"Required parts for tasks: {required_parts}")
-        
-        # Check parts availability
-        missing_parts = []
-        low_stock_parts = []
+        # Collect all required parts from selected tasks
+        required_parts = self.parts_for_tasks(selected_tasks)
         
-        for part, required_qty in required_parts.items():
-            if part not in model_inventory:
-                missing_parts.append(part)
-                continue
-                
-            current_qty = model_inventory[part]["quantity"]
-            min_threshold = model_inventory[part]["min_threshold"]
-            
-            if current_qty < required_qty:
-                missing_parts.append(part)
-            elif current_qty <= min_threshold:
-                low_stock_parts.append(part)
+        missing_parts, low_stock_parts, _ = self._parts_status(model_index, required_parts)
         
         if missing_parts:
             return f"Parts out of stock: {', '.join(missing_parts)}"
@@ -290,29 +268,104 @@ class InventoryManager:
         else:
             return "All parts available"
     
+    def consume_parts_for_tasks(self, car_model, selected_tasks):
+        """Take the parts a finished job used out of stock; returns what was consumed"""
+        model_index = self.matrix.resolve_model(car_model)
+        if model_index is None:
+            return {}
+        parts_used = self.parts_for_tasks(selected_tasks)
+        if parts_used and self.update_inventory(self.matrix.models[model_index], parts_used):
+            return parts_used
+        return {}
+    
+    def get_low_stock_parts(self, car_model=None):
+        """All stocked parts at or below their reorder threshold"""
+        matrix = self.matrix
+        mask = matrix.low_stock_mask()
+        if car_model is not None:
+            model_index = matrix.resolve_model(car_model)
+            if model_index is None:
+                return []
+            keep = np.zeros(len(matrix.models), dtype=bool)
+            keep[model_index] = True
+            mask &= keep[:, None]
+        rows, cols = np.nonzero(mask)
+        return [
+            {
+                'car_model': matrix.models[i],
+                'part': matrix.parts[j],
+                'quantity': int(matrix.quantity[i, j]),
+                'min_threshold': int(matrix.threshold[i, j])
+            }
+            for i, j in zip(rows, cols)
+        ]
+    
+    def get_service_capability(self, service_type):
+        """Which models have every part a service type needs, with shortfalls"""
+        required_parts = SERVICE_REQUIREMENTS[service_type]
+        matrix = self.matrix
+        capable = matrix.capable_models(required_parts)
+        shortfall = matrix.shortfall(required_parts)
+        _, unknown = matrix.requirement_vector(required_parts)
+        return {
+            model: {
+                'capable': bool(capable[i]),
+                'missing_parts': [matrix.parts[j] for j in np.flatnonzero(shortfall[i])] + unknown
+            }
+            for i, model in enumerate(matrix.models)
+        }
+    
+    def get_stock_projections(self, car_model=None, lead_time_days=7.0, cover_days=14.0):
+        """Usage rate, days until stock-out and suggested reorder per part"""
+        matrix = self.matrix
+        rates, days_left, reorder = self.consumption.project(
+            matrix.quantity, matrix.threshold, lead_time_days, cover_days
+        )
+        if car_model is not None:
+            model_index = matrix.resolve_model(car_model)
+            rows = [] if model_index is None else [model_index]
+        else:
+            rows = range(len(matrix.models))
+        projections = []
+        for i in rows:
+            for j in np.flatnonzero(matrix.present[i]):
+                projections.append({
+                    'car_model': matrix.models[i],
+                    'part': matrix.parts[j],
+                    'quantity': int(matrix.quantity[i, j]),
+                    'daily_usage': round(float(rates[i, j]), 3),
+                    'days_to_stockout': None if np.isinf(days_left[i, j]) else round(float(days_left[i, j]), 1),
+                    'suggested_reorder': int(reorder[i, j])
+                })
+        return projections
+
     def get_inventory_status(self):
         """Get complete inventory status"""
-        return self.inventory
+        return self.matrix.to_dict()
     
     def get_available_models(self):
         """Get list of available car models"""
-        return list(self.inventory.keys())
+        return list(self.matrix.models)
     
     def update_inventory(self, car_model, parts_used):
         """Update inventory after service"""
-        if car_model not in self.inventory:
+        matrix = self.matrix
+        model_index = matrix.model_index.get(car_model)
+        if model_index is None:
             return False
         
         try:
+            now = time.time()
+            shape = matrix.quantity.shape
             for part, quantity in parts_used.items():
-                if part in self.inventory[car_model]:
-                    self.inventory[car_model][part]["quantity"] = max(
-                        0, self.inventory[car_model][part]["quantity"] - quantity
-                    )
+                j = matrix.part_index.get(part)
+                if j is not None and matrix.present[model_index, j]:
+                    matrix.quantity[model_index, j] = max(0, int(matrix.quantity[model_index, j]) - quantity)
+                    self.consumption.record(shape, model_index, j, quantity, now)
             
             # Save updated inventory
-            with open(self.inventory_file, 'w') as f:
-                json.dump(self.inventory, f, indent=2)
+            self._save_inventory()
+            self.consumption.save(self.usage_file, matrix.models, matrix.parts)
             
             return True
         except Exception as e:
@@ -322,55 +375,48 @@ class InventoryManager:
     def add_new_model(self, model_name, parts_config):
         """Add a new car model to inventory"""
         try:
-            self.inventory[model_name] = parts_config
-            with open(self.inventory_file, 'w') as f:
-                json.dump(self.inventory, f, indent=2)
+            self.matrix.add_model(model_name, parts_config)
+            self._save_inventory()
             return True
         except Exception as e:
             print(f"Error adding new model: {e}")
             return False
+    
+    def update_part_quantity(self, car_model, part_name, new_quantity):
+        """Update quantity for a specific part"""
+        try:
+            matrix = self.matrix
+            model_index = matrix.model_index.get(car_model)
+            if model_index is None:
+                return False
+            
+            j = matrix.part_index.get(part_name)
+            if j is None or not matrix.present[model_index, j]:
+                return False
+            
+            matrix.quantity[model_index, j] = int(new_quantity)
+            
+            # Save to file
+            self._save_inventory()
+            
+            print(f"Updated {part_name} for {car_model} to {new_quantity}")
+            return True
         
-def update_part_quantity(self, car_model, part_name, new_quantity):
-    """Update quantity for a specific part"""
-    try:
-        if car_model not in self.inventory:
+        except Exception as e:
+            print(f"Error updating inventory: {e}")
             return False
+    
+    def add_part(self, car_model, part_name, quantity, min_threshold=5):
+        """Add new part to inventory"""
+        try:
+            self.matrix.set_part(car_model, part_name, int(quantity), int(min_threshold))
+            
+            # Save to file
+            self._save_inventory()
+            
+            print(f"Added {part_name} to {car_model} inventory")
+            return True
         
-        if part_name not in self.inventory[car_model]:
+        except Exception as e:
+            print(f"Error adding part: {e}")
             return False
-        
-        self.inventory[car_model][part_name]["quantity"] = new_quantity
-        
-        # Save to file
-        with open(self.inventory_file, 'w') as f:
-            json.dump(self.inventory, f, indent=2)
-        
-        print(f"Updated {part_name} for {car_model} to {new_quantity}")
-        return True
-        
-    except Exception as e:
-        print(f"Error updating inventory: {e}")
-        return False
-
-def add_part(self, car_model, part_name, quantity, min_threshold=5):
-    """Add new part to inventory"""
-    try:
-        if car_model not in self.inventory:
-            # Create new car model entry
-            self.inventory[car_model] = {}
-        
-        self.inventory[car_model][part_name] = {
-            "quantity": quantity,
-            "min_threshold": min_threshold
-        }
-        
-        # Save to file
-        with open(self.inventory_file, 'w') as f:
-            json.dump(self.inventory, f, indent=2)
-        
-        print(f"Added {part_name} to {car_model} inventory")
-        return True
-        
-    except Exception as e:
-        print(f"Error adding part: {e}")
-        return False        
\ No newline at end of file
@@ -0,0 +1,139 @@
+import numpy as np
+
+
+class InventoryMatrix:
+    """Compact models x parts stock table.
+
+    Quantities and reorder thresholds live in two int32 arrays indexed by
+    ``model_index`` / ``part_index``; ``present`` marks which parts a model
+    actually stocks. The nested JSON dict is only an import/export format.
+    """
+
+    def __init__(self, models=(), parts=(), quantity=None, threshold=None, present=None):
+        self.models = list(models)
+        self.parts = list(parts)
+        self.model_index = {name: i for i, name in enumerate(self.models)}
+        self.part_index = {name: j for j, name in enumerate(self.parts)}
+        shape = (len(self.models), len(self.parts))
+        self.quantity = quantity if quantity is not None else np.zeros(shape, dtype=np.int32)
+        self.threshold = threshold if threshold is not None else np.zeros(shape, dtype=np.int32)
+        self.present = present if present is not None else np.zeros(shape, dtype=bool)
+        self._upper_index = {name.upper(): i for i, name in enumerate(self.models)}
+
+    @classmethod
+    def from_dict(cls, inventory):
+        """Build from {model: {part: {"quantity", "min_threshold"}}}"""
+        models = list(inventory.keys())
+        parts = []
+        seen = set()
+        for model_parts in inventory.values():
+            for part in model_parts:
+                if part not in seen:
+                    seen.add(part)
+                    parts.append(part)
+        matrix = cls(models, parts)
+        for i, model in enumerate(models):
+            for part, stock in inventory[model].items():
+                j = matrix.part_index[part]
+                matrix.quantity[i, j] = stock['quantity']
+                matrix.threshold[i, j] = stock['min_threshold']
+                matrix.present[i, j] = True
+        return matrix
+
+    def to_dict(self):
+        """Export back to the nested JSON layout"""
+        inventory = {}
+        for i, model in enumerate(self.models):
+            inventory[model] = {
+                part: {
+                    'quantity': int(self.quantity[i, j]),
+                    'min_threshold': int(self.threshold[i, j])
+                }
+                for j, part in enumerate(self.parts) if self.present[i, j]
+            }
+        return inventory
+
+    def resolve_model(self, car_model):
+        """Row index for a model name: exact, then case-insensitive, then substring"""
+        index = self.model_index.get(car_model)
+        if index is not None:
+            return index
+        upper = car_model.upper()
+        index = self._upper_index.get(upper)
+        if index is not None:
+            return index
+        for name, i in self._upper_index.items():
+            if upper in name or name in upper:
+                return i
+        return None
+
+    def requirement_vector(self, required_parts):
+        """Dense per-part requirement vector and the names of unknown parts"""
+        vector = np.zeros(len(self.parts), dtype=np.int32)
+        unknown = []
+        for part, qty in required_parts.items():
+            j = self.part_index.get(part)
+            if j is None:
+                unknown.append(part)
+            else:
+                vector[j] += qty
+        return vector, unknown
+
+    def capable_models(self, required_parts):
+        """Boolean per model: every required part is stocked in sufficient quantity"""
+        required, unknown = self.requirement_vector(required_parts)
+        if unknown:
+            return np.zeros(len(self.models), dtype=bool)
+        needed = required > 0
+        enough = self.present & (self.quantity >= required)
+        return np.all(enough | ~needed, axis=1)
+
+    def shortfall(self, required_parts):
+        """Boolean models x parts: required part missing or below requirement"""
+        required, _ = self.requirement_vector(required_parts)
+        needed = required > 0
+        return needed & (~self.present | (self.quantity < required))
+
+    def low_stock_mask(self):
+        """Boolean models x parts: stocked parts at or below their threshold"""
+        return self.present & (self.quantity <= self.threshold)
+
+    def _ensure_model(self, model):
+        i = self.model_index.get(model)
+        if i is None:
+            i = len(self.models)
+            self.models.append(model)
+            self.model_index[model] = i
+            self._upper_index[model.upper()] = i
+            extra = np.zeros((1, len(self.parts)))
+            self.quantity = np.vstack([self.quantity, extra.astype(np.int32)])
+            self.threshold = np.vstack([self.threshold, extra.astype(np.int32)])
+            self.present = np.vstack([self.present, extra.astype(bool)])
+        return i
+
+    def _ensure_part(self, part):
+        j = self.part_index.get(part)
+        if j is None:
+            j = len(self.parts)
+            self.parts.append(part)
+            self.part_index[part] = j
+            extra = np.zeros((len(self.models), 1))
+            self.quantity = np.hstack([self.quantity, extra.astype(np.int32)])
+            self.threshold = np.hstack([self.threshold, extra.astype(np.int32)])
+            self.present = np.hstack([self.present, extra.astype(bool)])
+        return j
+
+    def set_part(self, model, part, quantity, min_threshold):
+        """Create or overwrite one model/part cell, growing the arrays if needed"""
+        i = self._ensure_model(model)
+        j = self._ensure_part(part)
+        self.quantity[i, j] = quantity
+        self.threshold[i, j] = min_threshold
+        self.present[i, j] = True
+
+    def add_model(self, model, parts_config):
+        """Add or replace a whole model row"""
+        i = self._ensure_model(model)
+        self.present[i, :] = False
+        for part, stock in parts_config.items():
+            self.set_part(model, part, stock['quantity'], stock['min_threshold'])
@@ -0,0 +1,351 @@
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from array import array
+from bisect import bisect_left
+
+# Upper bounds (seconds) shared by every latency histogram. Fixed buckets let
+# per-process histograms be merged by adding their count arrays.
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+# Totals of workers that have exited, kept so merged counters never go down
+ARCHIVE_FILE = 'archived_metrics.json'
+ARCHIVE_LOCK = 'archived_metrics.lock'
+
+
+def pid_alive(pid):
+    """True if a process with this pid still exists"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _combine(snapshots):
+    """Sum counters and histograms across snapshots; gauges take the maximum"""
+    counters, gauges, histograms = {}, {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot.get('gauges', []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            gauges[key] = max(gauges.get(key, value), value)
+        for name, labels, counts, total in snapshot['histograms']:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram()
+            histogram.merge(counts, total)
+    return counters, gauges, histograms
+
+
+def _as_snapshot(counters, gauges, histograms):
+    """JSON-serialisable form of combined metrics (the snapshot file format)"""
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'gauges': [[name, list(labels), value] for (name, labels), value in gauges.items()],
+        'histograms': [
+            [name, list(labels), list(h.counts), h.total]
+            for (name, labels), h in histograms.items()
+        ]
+    }
+
+
+def _write_json(path, data):
+    tmp_path = f'{path}.tmp-{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def load_archive(multiproc_dir):
+    """Counters and histograms of exited workers, plus the snapshot IDs already folded in"""
+    try:
+        with open(os.path.join(multiproc_dir, ARCHIVE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'counters': [], 'gauges': [], 'histograms': [], 'merged': []}
+
+
+def mark_process_dead(pid, multiproc_dir):
+    """Fold an exited worker's snapshot into the archive (gunicorn child_exit hook).
+
+    Counters and histograms must never go down, or Prometheus reads a
+    counter reset, so they are kept in the archive, which stays in every
+    merged total. Gauges describe a live process and are dropped. The
+    snapshot's ID is recorded so a snapshot is folded in only once, and
+    the snapshot is removed only after the archive holding it is written.
+    """
+    path = os.path.join(multiproc_dir, f'metrics_{pid}.json')
+    with open(os.path.join(multiproc_dir, ARCHIVE_LOCK), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(path) as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            snapshot = None
+        if snapshot is not None:
+            archive = load_archive(multiproc_dir)
+            if snapshot.get('id') not in archive['merged']:
+                counters, _, histograms = _combine([archive, snapshot])
+                merged = archive['merged'] + [snapshot.get('id')]
+                archive = _as_snapshot(counters, {}, histograms)
+                archive['merged'] = merged
+                _write_json(os.path.join(multiproc_dir, ARCHIVE_FILE), archive)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def clear_multiproc_dir(multiproc_dir):
+    """Remove every snapshot and the archive left by an earlier run (gunicorn on_starting hook)"""
+    os.makedirs(multiproc_dir, exist_ok=True)
+    paths = glob.glob(os.path.join(multiproc_dir, 'metrics_*.json*'))
+    paths += glob.glob(os.path.join(multiproc_dir, ARCHIVE_FILE + '*'))
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class Histogram:
+    """Fixed-bucket histogram backed by a flat count array"""
+    __slots__ = ('bounds', 'counts', 'total')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = array('q', [0] * (len(bounds) + 1))  # last slot is +Inf
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def merge(self, counts, total):
+        for i, count in enumerate(counts):
+            self.counts[i] += count
+        self.total += total
+
+
+class StageTimer:
+    """Context manager timing one stage of a request"""
+    __slots__ = ('registry', 'key', 'start')
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe_key(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry:
+    """Per-process counters and latency histograms with Prometheus export.
+
+    Each thread records into its own shard, so the hot path takes no lock;
+    shards are summed when a snapshot is taken. Under gunicorn each worker
+    keeps its own registry. When ``multiproc_dir`` is set, workers
+    periodically write a snapshot there and ``/metrics`` sums the snapshots
+    of every worker, so counters and histogram buckets add up no matter
+    which worker serves the scrape. When a worker exits, its counters
+    and histograms are folded into an archive that stays in the sum (see
+    mark_process_dead), so totals never go down; its gauges are dropped. Gauges describe one process (e.g. its
+    warm-up time); they are set rarely, live outside the shards, and merge
+    across workers by taking the maximum.
+    """
+
+    def __init__(self, multiproc_dir=None, flush_interval=1.0):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._keys = {}
+        self._gauges = {}
+        self._last_flush = 0.0
+        self._instance = uuid.uuid4().hex
+        if multiproc_dir:
+            os.makedirs(multiproc_dir, exist_ok=True)
+            atexit.register(self.flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        """A forked worker starts from zero so the parent's counts aren't summed twice"""
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._last_flush = 0.0
+        self._instance = uuid.uuid4().hex
+
+    def _shard(self):
+        """This thread's (counters, histograms) pair"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = ({}, {})
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def key(self, name, *label_pairs):
+        """Interned metric key for a name and (label, value) pairs"""
+        cache_key = (name, label_pairs)
+        key = self._keys.get(cache_key)
+        if key is None:
+            key = self._keys[cache_key] = (name, tuple(sorted((k, str(v)) for k, v in label_pairs)))
+        return key
+
+    def inc(self, name, amount=1, **labels):
+        self.inc_key(self.key(name, *labels.items()), amount)
+
+    def inc_key(self, key, amount=1):
+        counters = self._shard()[0]
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        self.observe_key(self.key(name, *labels.items()), value)
+
+    def observe_key(self, key, value):
+        histograms = self._shard()[1]
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        histogram.counts[bisect_left(histogram.bounds, value)] += 1
+        histogram.total += value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[self.key(name, *labels.items())] = value
+
+    def time_stage(self, route, stage):
+        """Time a block: `with metrics.time_stage('/predict', 'validation'):`"""
+        return StageTimer(self, self.key('request_stage_duration_seconds', ('route', route), ('stage', stage)))
+
+    def snapshot(self):
+        """JSON-serialisable copy of this process's metrics"""
+        with self._lock:
+            shards = list(self._shards)
+            gauges = dict(self._gauges)
+        counters, histograms = {}, {}
+        for shard_counters, shard_histograms in shards:
+            for key, value in list(shard_counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, histogram in list(shard_histograms.items()):
+                merged = histograms.get(key)
+                if merged is None:
+                    merged = histograms[key] = Histogram()
+                merged.merge(histogram.counts, histogram.total)
+        snapshot = _as_snapshot(counters, gauges, histograms)
+        # Unique per process, so a reused pid is never mistaken for an archived one
+        snapshot['id'] = f'{os.getpid()}-{self._instance}'
+        return snapshot
+
+    def _snapshot_path(self, pid=None):
+        return os.path.join(self.multiproc_dir, f'metrics_{pid or os.getpid()}.json')
+
+    def flush(self):
+        """Write this process's snapshot for other workers to merge"""
+        if not self.multiproc_dir:
+            return
+        path = self._snapshot_path()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        """Flush at most once per flush_interval; cheap enough to call per request"""
+        if self.multiproc_dir and time.monotonic() - self._last_flush >= self.flush_interval:
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error flushing metrics: {e}")
+
+    def _merged(self):
+        """Combine this process's live metrics with other workers' snapshots and the archive"""
+        snapshots = [self.snapshot()]
+        if self.multiproc_dir:
+            own_path = self._snapshot_path()
+            for path in glob.glob(os.path.join(self.multiproc_dir, 'metrics_*.json')):
+                if path == own_path:
+                    continue
+                try:
+                    pid = int(os.path.basename(path)[len('metrics_'):-len('.json')])
+                except ValueError:
+                    continue
+                if not pid_alive(pid):
+                    mark_process_dead(pid, self.multiproc_dir)
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+            # Read after the snapshots: a snapshot that disappeared meanwhile
+            # is already in this archive, and one folded in meanwhile is skipped
+            archive = load_archive(self.multiproc_dir)
+            merged = set(archive['merged'])
+            snapshots = [s for s in snapshots if s.get('id') not in merged] + [archive]
+        return _combine(snapshots)
+
+    def render_prometheus(self):
+        """Render merged metrics in the Prometheus text exposition format"""
+        counters, gauges, histograms = self._merged()
+        lines = []
+
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+        for name in sorted({key[0] for key in counters}):
+            lines.append(f'# TYPE {name} counter')
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{label_text(labels)} {value}')
+
+        for name in sorted({key[0] for key in gauges}):
+            lines.append(f'# TYPE {name} gauge')
+            for (metric, labels), value in sorted(gauges.items()):
+                if metric == name:
+                    lines.append(f'{name}{label_text(labels)} {value}')
+
+        for name in sorted({key[0] for key in histograms}):
+            lines.append(f'# TYPE {name} histogram')
+            for (metric, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram.bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{label_text(labels, [("le", bound)])} {cumulative}')
+                cumulative += histogram.counts[-1]
+                lines.append(f'{name}_bucket{label_text(labels, [("le", "+Inf")])} {cumulative}')
+                lines.append(f'{name}_sum{label_text(labels)} {histogram.total}')
+                lines.append(f'{name}_count{label_text(labels)} {cumulative}')
+
+        return '\n'.join(lines) + '\n'
@@ -1,46 +1,127 @@
 import numpy as np
 import random
 
+# Base time (hours) for each service type
+SERVICE_TYPE_TIMES = {
+    'general': 2.5,
+    'basic': 1.8,
+    'standard': 3.2,
+    'premium': 4.8,
+    'major': 6.5
+}
+DEFAULT_SERVICE_TIME = 3.0
+
+# Time (hours) for each selectable task
+TASK_TIMES = {
+    'oil_change': 0.5,
+    'air_filter': 0.3,
+    'spark_plugs': 1.0,
+    'fuel_filter': 0.4,
+    'brake_pads': 1.5,
+    'brake_fluid': 0.5,
+    'brake_discs': 2.0,
+    'wheel_alignment': 1.0,
+    'tire_rotation': 0.5,
+    'wheel_balancing': 0.8,
+    'tire_replacement': 1.2,
+    'ac_service': 1.5,
+    'ac_filter': 0.3,
+    'coolant_flush': 1.0,
+    'battery_replacement': 0.5,
+    'bulb_replacement': 0.4,
+    'electrical_check': 0.8,
+    'car_wash': 0.5,
+    'diagnostic_scan': 0.6,
+    'suspension_check': 1.2
+}
+
+CURRENT_YEAR = 2024
+
+# Labels used by the training dataset for the form's values
+DATASET_SERVICE_TYPES = {
+    'general': 'General Service',
+    'basic': 'Basic Service',
+    'standard': 'Standard Service',
+    'premium': 'Premium Service',
+    'major': 'Major Service'
+}
+DATASET_FUEL_TYPES = {
+    'petrol': 'Petrol',
+    'diesel': 'Diesel',
+    'hybrid': 'Hybrid',
+    'electric': 'Electric'
+}
+DATASET_CAR_MODELS = ('XC90', 'XC60', 'XC40', 'S90', 'V90', 'S60')
+DATASET_PARTS_AVAILABILITY = ('High', 'Medium', 'Low')
+
+_SERVICE_TYPE_KEYS = {label: key for key, label in DATASET_SERVICE_TYPES.items()}
+
+def features_from_dataset_row(row):
+    """Map a training-dataset row (Service_Type, Total_Kms, ...) to predict() features"""
+    service_type = row['Service_Type']
+    return {
+        'service_type': _SERVICE_TYPE_KEYS.get(service_type, str(service_type).split(' ')[0].lower()),
+        'manufacture_year': int(row['Manufacture_Year']),
+        'total_kilometers': float(row['Total_Kms']),
+        'last_service_days': int(row['Last_Service_Days_Ago']),
+        'number_of_tasks': int(row['No_Of_Tasks']),
+        'worker_availability': int(row['Worker_Availability']),
+        'selected_tasks': []
+    }
+
+def dataset_row_from_features(features, parts_availability='High'):
+    """Map predict() features to the raw row the trained model expects.
+    
+    The booking form has no parts-availability input, so that column
+    defaults to the dataset's most common value.
+    """
+    service_type = features['service_type']
+    fuel_type = features.get('fuel_type', 'petrol')
+    return {
+        'Car_Model': features.get('car_model'),
+        'Manufacture_Year': int(features['manufacture_year']),
+        'Fuel_Type': DATASET_FUEL_TYPES.get(fuel_type, str(fuel_type).title()),
+        'Service_Type': DATASET_SERVICE_TYPES.get(service_type, f'{str(service_type).title()} Service'),
+        'Last_Service_Days_Ago': int(features['last_service_days']),
+        'Total_Kms': float(features['total_kilometers']),
+        'Km_From_Last_Service': float(features.get('km_since_last_service', 0)),
+        'Parts_Availability': parts_availability,
+        'Worker_Availability': int(features['worker_availability']),
+        'No_Of_Tasks': int(features['number_of_tasks'])
+    }
+
+def adjustment_factors(manufacture_year, total_kilometers, last_service_days,
+                       number_of_tasks, worker_availability):
+    """Vectorised product of the age, km, maintenance, task and worker factors.
+    
+    Mirrors ServiceTimePredictor.predict for NumPy arrays, so a whole column
+    of bookings can be scored as max(base, task_time) * factors.
+    """
+    car_age = CURRENT_YEAR - np.asarray(manufacture_year)
+    year_factor = np.minimum(1 + car_age * 0.08, 2.0)
+    km_factor = np.minimum(1 + (np.asarray(total_kilometers) / 100000) * 0.3, 1.8)
+    days = np.asarray(last_service_days)
+    maintenance_factor = np.where(days > 365, 1.4, np.where(days > 180, 1.2, 1.0))
+    task_factor = 1 + np.asarray(number_of_tasks) * 0.15
+    workers = np.asarray(worker_availability)
+    worker_factor = np.select(
+        [workers <= 1, workers <= 3, workers <= 5], [1.4, 1.2, 1.0], default=0.9
+    )
+    return year_factor * km_factor * maintenance_factor * task_factor * worker_factor
+
 class ServiceTimePredictor:
     def __init__(self):
         pass
     
-    def predict(self, features):
-        """Predict service time based on features with task-based adjustments"""
+    def estimate(self, features):
+        """Deterministic service time (hours) from features with task-based adjustments"""
         # Base time for different service types
-        service_type_times = {
-            'general': 2.5,
-            'basic': 1.8,
-            'standard': 3.2,
-            'premium': 4.8,
-            'major': 6.5
-        }
+        service_type_times = SERVICE_TYPE_TIMES
         
-        base_time = service_type_times.get(features['service_type'], 3.0)
+        base_time = service_type_times.get(features['service_type'], DEFAULT_SERVICE_TIME)
         
         # Task-based time adjustments
-        task_times = {
-            'oil_change': 0.5,
-            'air_filter': 0.3,
-            'spark_plugs': 1.0,
-            'fuel_filter': 0.4,
-            'brake_pads': 1.5,
-            'brake_fluid': 0.5,
-            'brake_discs': 2.0,
-            'wheel_alignment': 1.0,
-            'tire_rotation': 0.5,
-            'wheel_balancing': 0.8,
-            'tire_replacement': 1.2,
-            'ac_service': 1.5,
-            'ac_filter': 0.3,
-            'coolant_flush': 1.0,
-            'battery_replacement': 0.5,
-            'bulb_replacement': 0.4,
-            'electrical_check': 0.8,
-            'car_wash': 0.5,
-            'diagnostic_scan': 0.6,
-            'suspension_check': 1.2
-        }
+        task_times = TASK_TIMES
         
         # Calculate task-based time
         selected_tasks = features.get('selected_tasks', [])
@@ -51,8 +132,7 @@ class ServiceTimePredictor:
             base_time = task_based_time
         
         # Adjust based on car age (older cars take longer)
-        current_year = 2024
-        car_age = current_year - features['manufacture_year']
+        car_age = CURRENT_YEAR - features['manufacture_year']
         year_factor = 1 + (car_age * 0.08)
         base_time *= min(year_factor, 2.0)
         
@@ -85,15 +165,111 @@ class ServiceTimePredictor:
         
         base_time *= worker_factor
         
+        return base_time
+    
+    def predict(self, features):
+        """Predict service time based on features with task-based adjustments"""
+        base_time = self.estimate(features)
+        
         # Add some realistic random variation
         variation = random.uniform(-0.2, 0.2)
         predicted_time = max(1.0, base_time + variation)
         
         return round(predicted_time, 1)
+    
+    def quote(self, features):
+        """Repeatable estimate for live quotes: same inputs, same answer"""
+        return round(max(1.0, self.estimate(features)), 1)
+
+# Cars this old or older all get the capped year factor of 2.0
+MAX_TABLE_AGE = 13
+MAX_TABLE_TASKS = 20
+
+def maintenance_band(last_service_days):
+    """0: within 180 days, 1: within a year, 2: longer"""
+    return 2 if last_service_days > 365 else 1 if last_service_days > 180 else 0
+
+def worker_band(worker_availability):
+    """0: one or none free, 1: up to 3, 2: up to 5, 3: more"""
+    if worker_availability <= 1:
+        return 0
+    if worker_availability <= 3:
+        return 1
+    return 2 if worker_availability <= 5 else 3
+
+class LookupServiceTimePredictor(ServiceTimePredictor):
+    """ServiceTimePredictor with the stepwise factors read from precomputed tables.
+    
+    The year, maintenance, task-count and worker factors depend only on
+    small integer bands, so each is tabulated once per band. An estimate
+    looks the factors up instead of branching, but multiplies them in
+    ServiceTimePredictor's order (base, year, km, maintenance, tasks,
+    workers): float products depend on the order, and a different one
+    flips quotes that sit on a 0.1 h rounding tie. Results are therefore
+    bit-identical. The km factor is continuous and stays arithmetic.
+    Inputs outside the tables (future years, more than MAX_TABLE_TASKS
+    tasks) use the arithmetic path.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        # Same expressions as ServiceTimePredictor.estimate, so the same floats
+        self._year = [min(1 + (age * 0.08), 2.0) for age in range(MAX_TABLE_AGE + 1)]
+        self._maintenance = [1.0, 1.2, 1.4]
+        self._tasks = [1 + (tasks * 0.15) for tasks in range(MAX_TABLE_TASKS + 1)]
+        self._workers = [1.4, 1.2, 1.0, 0.9]
+        # NumPy copies for the batch gather
+        self._year_array, self._maintenance_array, self._tasks_array, self._workers_array = (
+            np.array(table) for table in (self._year, self._maintenance, self._tasks, self._workers))
+    
+    def estimate(self, features):
+        age = CURRENT_YEAR - features['manufacture_year']
+        number_of_tasks = features['number_of_tasks']
+        if age < 0 or not 0 <= number_of_tasks <= MAX_TABLE_TASKS:
+            return super().estimate(features)
+        
+        base_time = SERVICE_TYPE_TIMES.get(features['service_type'], DEFAULT_SERVICE_TIME)
+        selected_tasks = features.get('selected_tasks')
+        if selected_tasks:
+            task_based_time = sum([TASK_TIMES.get(task, 0) for task in selected_tasks])
+            if task_based_time > base_time:
+                base_time = task_based_time
+        
+        # Bands inlined: this is the hot path
+        days = features['last_service_days']
+        workers = features['worker_availability']
+        km_factor = 1 + (features['total_kilometers'] / 100000) * 0.3
+        return (base_time * self._year[age if age < MAX_TABLE_AGE else MAX_TABLE_AGE]
+                * (km_factor if km_factor < 1.8 else 1.8)
+                * self._maintenance[2 if days > 365 else 1 if days > 180 else 0]
+                * self._tasks[int(number_of_tasks)]
+                * self._workers[0 if workers <= 1 else 1 if workers <= 3 else 2 if workers <= 5 else 3])
+    
+    def estimate_batch(self, base_time, manufacture_year, total_kilometers,
+                       last_service_days, number_of_tasks, worker_availability):
+        """Vectorised estimate; base_time is already max(service base, task time) per row.
+        
+        Like adjustment_factors, expects inputs inside the tables' range.
+        Multiplies in the same order as estimate, so rows match it exactly.
+        """
+        age = np.clip(CURRENT_YEAR - np.asarray(manufacture_year), 0, MAX_TABLE_AGE)
+        days = np.asarray(last_service_days)
+        maintenance = (days > 180).astype(np.intp) + (days > 365)
+        workers = np.asarray(worker_availability)
+        worker_index = (workers > 1).astype(np.intp) + (workers > 3) + (workers > 5)
+        km_factor = np.minimum(1 + (np.asarray(total_kilometers) / 100000) * 0.3, 1.8)
+        return (np.asarray(base_time, dtype=np.float64) * self._year_array[age] * km_factor
+                * self._maintenance_array[maintenance]
+                * self._tasks_array[np.asarray(number_of_tasks)]
+                * self._workers_array[worker_index])
 
 # Global predictor instance
 _predictor = ServiceTimePredictor()
 
 def predict_service_time(features):
     """Public function to predict service time"""
-    return _predictor.predict(features)
\ No newline at end of file
+    return _predictor.predict(features)
+
+def quote_service_time(features):
+    """Public function for a jitter-free estimate"""
+    return _predictor.quote(features)
\ No newline at end of file
@@ -1,24 +1,208 @@
 import random
+import threading
+import time
+from collections import deque
 from datetime import datetime
 
+DEFAULT_JOB_HOURS = 3.0
+
+# Job lifecycle: waiting -> in_service -> done, or expired if it goes stale.
+# A job still in service at its predicted finish turns overdue: its bay is
+# handed to the next job, but it stays live until really completed. Overdue
+# jobs hold no bay, so they don't count towards queue length or workload.
+WAITING = 'waiting'
+IN_SERVICE = 'in_service'
+OVERDUE = 'overdue'
+DONE = 'done'
+EXPIRED = 'expired'
+
+# Layout of the compact tuples kept in ServiceCenter.history
+HISTORY_FIELDS = ('service_id', 'status', 'predicted_time', 'enqueued_at', 'started_at', 'finished_at')
+
+class TimerWheel:
+    """Hashed timer wheel for job deadlines.
+    
+    Scheduling appends to one slot, O(1). Advancing visits only the ticks
+    that have elapsed, never the whole set of timers. Entries remember
+    their absolute tick, so one more than a rotation away just waits for a
+    later pass over its slot. After an idle gap longer than a rotation the
+    wheel jumps straight to the earliest pending tick.
+    """
+    
+    def __init__(self, tick_seconds=30.0, slots=2048, now=0.0):
+        self.tick_seconds = tick_seconds
+        self.slots = [[] for _ in range(slots)]
+        self.current_tick = int(now // tick_seconds)
+        self.pending = 0
+    
+    def schedule(self, deadline, kind, key):
+        # Deadlines already in the past land on the current tick
+        tick = max(int(deadline // self.tick_seconds), self.current_tick)
+        self.slots[tick % len(self.slots)].append((tick, deadline, kind, key))
+        self.pending += 1
+    
+    def advance(self, now, fire):
+        """Call fire(deadline, kind, key) for every entry due by `now`, in deadline order.
+        
+        `fire` may schedule new entries; any that are already due fire in
+        the same call.
+        """
+        target = int(now // self.tick_seconds)
+        n_slots = len(self.slots)
+        while self.pending:
+            tick = self.current_tick
+            slot = self.slots[tick % n_slots]
+            due = [entry for entry in slot if entry[0] == tick and entry[1] <= now]
+            if due:
+                slot[:] = [entry for entry in slot if not (entry[0] == tick and entry[1] <= now)]
+                self.pending -= len(due)
+                for _, deadline, kind, key in sorted(due, key=lambda entry: entry[1]):
+                    fire(deadline, kind, key)
+                continue
+            if tick >= target:
+                return
+            if target - tick > n_slots:
+                earliest = min(entry[0] for s in self.slots for entry in s)
+                self.current_tick = min(max(earliest, tick + 1), target)
+            else:
+                self.current_tick = tick + 1
+        self.current_tick = max(self.current_tick, target)
+
 class ServiceCenter:
-    def __init__(self, total_workers=8):
+    def __init__(self, total_workers=8, history_size=500, job_ttl_hours=24.0, clock=time.time):
         self.total_workers = total_workers
-        self.queue = []
+        self.queue = {}  # service_id -> job, in arrival order; live jobs only
         self.current_workload = random.randint(2, 6)  # Simulate current active services
+        self.listeners = []
+        self.transition_listeners = []
+        self._lock = threading.Lock()
+        self.clock = clock
+        self.job_ttl = job_ttl_hours * 3600
+        # Finished jobs as compact tuples (see HISTORY_FIELDS); oldest drop off
+        self.history = deque(maxlen=history_size)
+        self._waiting = deque()  # service_ids in arrival order; stale entries are skipped
+        self._in_service = 0
+        self._overdue = 0
+        self._wheel = TimerWheel(now=clock())
+    
+    def add_listener(self, callback):
+        """Register a callback invoked whenever the queue changes"""
+        self.listeners.append(callback)
+    
+    def add_transition_listener(self, callback):
+        """Register callback(service_id, status, at) for every lifecycle change"""
+        self.transition_listeners.append(callback)
+    
+    def _notify_listeners(self):
+        """Tell listeners the queue changed"""
+        for callback in self.listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Queue listener failed: {e}")
+    
+    def _emit(self, transitions, changed=False):
+        """Report transitions collected under the lock, once it is released"""
+        if not transitions and not changed:
+            return
+        for service_id, status, at in transitions:
+            for callback in self.transition_listeners:
+                try:
+                    callback(service_id, status, at)
+                except Exception as e:
+                    print(f"Transition listener failed: {e}")
+        self._notify_listeners()
     
-    def add_to_queue(self, service_id):
+    def service_bays(self):
+        """Bays free for queued jobs once the simulated walk-in workload is served"""
+        return max(1, self.total_workers - self.current_workload)
+    
+    def _start_waiting(self, at, transitions):
+        """Move waiting jobs into free bays, oldest first"""
+        bays = self.service_bays()
+        while self._in_service < bays and self._waiting:
+            job = self.queue.get(self._waiting.popleft())
+            if job is None or job['status'] != WAITING:
+                continue
+            self._start(job, at, transitions)
+    
+    def _start(self, job, at, transitions):
+        hours = job['predicted_time'] if job['predicted_time'] is not None else DEFAULT_JOB_HOURS
+        job['status'] = IN_SERVICE
+        job['started_at'] = at
+        job['finish_at'] = at + hours * 3600
+        self._in_service += 1
+        self._wheel.schedule(job['finish_at'], 'finish', job['service_id'])
+        transitions.append((job['service_id'], IN_SERVICE, at))
+    
+    def _mark_overdue(self, job, at, transitions):
+        """Free the bay of a job that ran past its predicted finish, keeping the job live"""
+        job['status'] = OVERDUE
+        self._in_service -= 1
+        self._overdue += 1
+        transitions.append((job['service_id'], OVERDUE, at))
+        self._start_waiting(at, transitions)
+    
+    def _finish(self, service_id, status, at, transitions):
+        """Drop a job from the live queue into the history ring buffer"""
+        job = self.queue.pop(service_id, None)
+        if job is None:
+            return None
+        if job['status'] == IN_SERVICE:
+            self._in_service -= 1
+        elif job['status'] == OVERDUE:
+            self._overdue -= 1
+        record = (service_id, status, job['predicted_time'], job['enqueued_at'], job['started_at'], at)
+        self.history.append(record)
+        transitions.append((service_id, status, at))
+        self._start_waiting(at, transitions)
+        return dict(zip(HISTORY_FIELDS, record))
+    
+    def _advance(self, now):
+        """Apply every start, finish and expiry due by `now`; caller holds the lock"""
+        transitions = []
+        
+        def fire(deadline, kind, service_id):
+            job = self.queue.get(service_id)
+            if job is None:
+                return  # already completed or expired
+            if kind == 'finish' and job['status'] == IN_SERVICE and job['finish_at'] == deadline:
+                self._mark_overdue(job, deadline, transitions)
+            elif kind == 'expire':
+                self._finish(service_id, EXPIRED, deadline, transitions)
+        
+        self._wheel.advance(now, fire)
+        return transitions
+    
+    def add_to_queue(self, service_id, predicted_time=None):
         """Add service to queue and return position"""
-        self.queue.append({
-            'service_id': service_id,
-            'timestamp': datetime.now(),
-            'status': 'waiting'
-        })
-        return len(self.queue)
+        with self._lock:
+            now = self.clock()
+            transitions = self._advance(now)
+            self.queue[service_id] = {
+                'service_id': service_id,
+                'timestamp': datetime.now(),
+                'status': WAITING,
+                'predicted_time': predicted_time,
+                'enqueued_at': now,
+                'started_at': None,
+                'finish_at': None
+            }
+            self._waiting.append(service_id)
+            self._wheel.schedule(now + self.job_ttl, 'expire', service_id)
+            self._start_waiting(now, transitions)
+            position = len(self.queue) - self._overdue
+        self._emit(transitions, changed=True)
+        return position
     
     def get_queue_info(self):
         """Get current queue information and worker availability"""
-        queue_length = len(self.queue)
+        with self._lock:
+            transitions = self._advance(self.clock())
+            queue_length = len(self.queue) - self._overdue
+            in_service = self._in_service
+            overdue = self._overdue
+        self._emit(transitions)
         
         # Calculate worker availability based on queue and current workload
         available_workers = max(0, self.total_workers - self.current_workload)
@@ -36,10 +220,50 @@ class ServiceCenter:
             'total_workers': self.total_workers,
             'current_workload': self.current_workload,
             'queue_length': queue_length,
+            'waiting': queue_length - in_service,
+            'in_service': in_service,
+            'overdue': overdue,
             'worker_availability': available_workers,
             'workload_percentage': round(workload_percentage, 1)
         }
     
+    def get_jobs(self):
+        """Copies of the live jobs in arrival order"""
+        with self._lock:
+            transitions = self._advance(self.clock())
+            jobs = [dict(job) for job in self.queue.values()]
+        self._emit(transitions)
+        return jobs
+    
+    def get_job(self, service_id):
+        """Copy of one live job, or None once it has left the queue"""
+        with self._lock:
+            job = self.queue.get(service_id)
+            return dict(job) if job is not None else None
+
+    def start_service(self, service_id):
+        """Put a waiting job in a bay now, whatever the simulation expected"""
+        with self._lock:
+            now = self.clock()
+            transitions = self._advance(now)
+            job = self.queue.get(service_id)
+            started = job is not None and job['status'] == WAITING
+            if started:
+                self._start(job, now, transitions)
+        self._emit(transitions)
+        return started
+    
     def complete_service(self, service_id):
-        """Remove service from queue when completed"""
-        self.queue = [job for job in self.queue if job['service_id'] != service_id]
\ No newline at end of file
+        """Remove service from queue when completed; returns its history record or None"""
+        with self._lock:
+            now = self.clock()
+            transitions = self._advance(now)
+            record = self._finish(service_id, DONE, now, transitions)
+        self._emit(transitions)
+        return record
+    
+    def recent_history(self, limit=50):
+        """Most recently finished or expired jobs, newest first"""
+        with self._lock:
+            records = list(self.history)[-limit:] if limit > 0 else []
+        return [dict(zip(HISTORY_FIELDS, record)) for record in reversed(records)]
\ No newline at end of file
@@ -0,0 +1,280 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Service IDs are time-sortable, so a WITHOUT ROWID table keyed on them keeps
+# new rows appended at the end of the clustered B-tree.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS service_jobs (
+    service_id TEXT PRIMARY KEY,
+    center_id TEXT NOT NULL DEFAULT 'default',
+    car_number_plate TEXT NOT NULL,
+    car_model TEXT,
+    service_type TEXT,
+    features TEXT NOT NULL,
+    predicted_time REAL,
+    parts_status TEXT,
+    queue_position INTEGER,
+    status TEXT NOT NULL DEFAULT 'waiting',
+    created_at REAL NOT NULL,
+    completed_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_service_jobs_plate_created
+    ON service_jobs (car_number_plate, created_at);
+CREATE INDEX IF NOT EXISTS idx_service_jobs_status_created
+    ON service_jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_service_jobs_created
+    ON service_jobs (created_at);
+CREATE TABLE IF NOT EXISTS appointments (
+    appointment_id TEXT PRIMARY KEY,
+    center_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    bay INTEGER NOT NULL,
+    start_minute INTEGER NOT NULL,
+    end_minute INTEGER NOT NULL,
+    car_number_plate TEXT,
+    features TEXT,
+    predicted_time REAL,
+    status TEXT NOT NULL DEFAULT 'booked',
+    created_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_appointments_center_day_bay
+    ON appointments (center_id, day, bay, start_minute);
+"""
+
+
+class ConnectionPool:
+    """Small per-process pool of SQLite connections.
+
+    Connections are never shared across a fork: if the pool notices it is
+    running in a new process it drops the inherited connections and opens
+    fresh ones.
+    """
+
+    def __init__(self, db_path, size=4):
+        self.db_path = db_path
+        self.size = size
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        return conn
+
+    def _ensure_pool(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pool = queue.LifoQueue(maxsize=self.size)
+                for _ in range(self.size):
+                    self._pool.put(self._open())
+                self._pid = os.getpid()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, committing on success and rolling back on error"""
+        self._ensure_pool()
+        conn = self._pool.get()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._pool.put(conn)
+
+
+class ServiceStore:
+    """Persistent record of every service prediction and its outcome"""
+
+    def __init__(self, db_path='data/service_jobs.db', pool_size=4):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.pool = ConnectionPool(db_path, size=pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(service_jobs)')}
+            if 'center_id' not in columns:
+                conn.execute("ALTER TABLE service_jobs ADD COLUMN center_id TEXT NOT NULL DEFAULT 'default'")
+
+    def record_service(self, service_id, car_number_plate, features, predicted_time, parts_status,
+                       queue_position, status='waiting', created_at=None, center_id='default'):
+        """Insert a new service job"""
+        with self.pool.connection() as conn:
+            conn.execute(
+                'INSERT INTO service_jobs (service_id, center_id, car_number_plate, car_model, service_type, '
+                'features, predicted_time, parts_status, queue_position, status, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    service_id,
+                    center_id,
+                    car_number_plate,
+                    features.get('car_model'),
+                    features.get('service_type'),
+                    json.dumps(features),
+                    predicted_time,
+                    parts_status,
+                    queue_position,
+                    status,
+                    created_at if created_at is not None else time.time()
+                )
+            )
+
+    def update_status(self, service_id, status, completed_at=None):
+        """Change a job's status; returns False if the job doesn't exist"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                'UPDATE service_jobs SET status = ?, completed_at = COALESCE(?, completed_at) '
+                'WHERE service_id = ?',
+                (status, completed_at, service_id)
+            )
+            return cursor.rowcount > 0
+
+    def complete_service(self, service_id, completed_at=None):
+        """Mark a job as done"""
+        return self.update_status(
+            service_id, 'done', completed_at if completed_at is not None else time.time()
+        )
+
+    def get_service(self, service_id):
+        """Look up one job by service ID"""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                'SELECT * FROM service_jobs WHERE service_id = ?', (service_id,)
+            ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def get_vehicle_history(self, car_number_plate, limit=20, before=None):
+        """Most recent jobs for a vehicle, newest first.
+
+        Pages with a keyset cursor (`before` = created_at epoch seconds of
+        the last row seen) so deep history stays an index range scan.
+        """
+        plate = car_number_plate.strip().upper()
+        with self.pool.connection() as conn:
+            if before is None:
+                rows = conn.execute(
+                    'SELECT * FROM service_jobs WHERE car_number_plate = ? '
+                    'ORDER BY created_at DESC LIMIT ?',
+                    (plate, limit)
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    'SELECT * FROM service_jobs WHERE car_number_plate = ? AND created_at < ? '
+                    'ORDER BY created_at DESC LIMIT ?',
+                    (plate, before, limit)
+                ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def book_appointment(self, appointment, center_id='default'):
+        """Insert an appointment unless it overlaps a booked one on the same bay.
+
+        The overlap check and the insert share one write transaction, so
+        two workers can never both take the same slot. Returns False on
+        overlap.
+        """
+        with self.pool.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            clash = conn.execute(
+                "SELECT 1 FROM appointments WHERE center_id = ? AND day = ? AND bay = ? "
+                "AND status = 'booked' AND start_minute < ? AND end_minute > ? LIMIT 1",
+                (center_id, appointment['day'], appointment['bay'], appointment['end'], appointment['start'])
+            ).fetchone()
+            if clash:
+                return False
+            conn.execute(
+                'INSERT INTO appointments (appointment_id, center_id, day, bay, start_minute, end_minute, '
+                'car_number_plate, features, predicted_time, status, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    appointment['appointment_id'],
+                    center_id,
+                    appointment['day'],
+                    appointment['bay'],
+                    appointment['start'],
+                    appointment['end'],
+                    appointment.get('car_number_plate'),
+                    json.dumps(appointment.get('features')),
+                    appointment.get('predicted_time'),
+                    'booked',
+                    time.time()
+                )
+            )
+        return True
+
+    def cancel_appointment(self, appointment_id):
+        """Mark a booked appointment cancelled; returns False if there was none"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "UPDATE appointments SET status = 'cancelled' WHERE appointment_id = ? AND status = 'booked'",
+                (appointment_id,)
+            )
+            return cursor.rowcount > 0
+
+    def get_appointments(self, center_id, from_day):
+        """Booked appointments for a center on or after an ISO date, in the engine's dict form"""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT * FROM appointments WHERE center_id = ? AND day >= ? AND status = 'booked'",
+                (center_id, from_day)
+            ).fetchall()
+        return [self._appointment_to_dict(row) for row in rows]
+
+    def get_appointments_on(self, center_id, day):
+        """Booked appointments for a center on one ISO date"""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT * FROM appointments WHERE center_id = ? AND day = ? AND status = 'booked'",
+                (center_id, day)
+            ).fetchall()
+        return [self._appointment_to_dict(row) for row in rows]
+
+    def get_appointment(self, appointment_id):
+        """One booked appointment with its center_id, or None if unknown or cancelled"""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM appointments WHERE appointment_id = ? AND status = 'booked'",
+                (appointment_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        appointment = self._appointment_to_dict(row)
+        appointment['center_id'] = row['center_id']
+        return appointment
+
+    @staticmethod
+    def _appointment_to_dict(row):
+        return {
+            'appointment_id': row['appointment_id'],
+            'day': row['day'],
+            'bay': row['bay'],
+            'start': row['start_minute'],
+            'end': row['end_minute'],
+            'car_number_plate': row['car_number_plate'],
+            'features': json.loads(row['features']) if row['features'] else None,
+            'predicted_time': row['predicted_time']
+        }
+
+    @staticmethod
+    def _row_to_dict(row):
+        job = dict(row)
+        job['features'] = json.loads(job['features'])
+        job['created_at'] = datetime.fromtimestamp(job['created_at']).isoformat()
+        if job['completed_at'] is not None:
+            job['completed_at'] = datetime.fromtimestamp(job['completed_at']).isoformat()
+        return job
@@ -0,0 +1,125 @@
+"""Memory-mapped, read-only model weights shared by every server worker.
+
+`python -m models.export_shared_model` flattens the trained booster, the
+label encoders and the scaler into a directory of `.npy` arrays plus a
+small `manifest.json`. Each worker maps the arrays with `mmap_mode='r'`.
+The pages then live once in the OS page cache, and every process maps
+the same physical memory instead of unpickling its own copy. Serving
+from the export needs only NumPy: xgboost, scikit-learn and pandas are
+never imported into the workers.
+
+All trees are packed into shared node arrays. A leaf's children point
+back at itself, so every row can take exactly `depth` steps down every
+tree at once with no per-node branching: one gather and one compare per
+level for the whole (rows x trees) frontier.
+"""
+import json
+import os
+
+import numpy as np
+
+SHARED_MODEL_VERSION = 1
+SHARED_SUFFIX = '.shared'
+ARRAY_NAMES = ('left', 'right', 'feature', 'threshold', 'default_left', 'leaf_value', 'roots',
+               'scaler_mean', 'scaler_scale')
+MANIFEST = 'manifest.json'
+# Rows per traversal block; bounds the (rows x trees) frontier arrays
+BLOCK_ROWS = 4096
+
+
+def shared_model_path(model_path):
+    """Export directory that belongs to a model file"""
+    return os.path.splitext(model_path)[0] + SHARED_SUFFIX
+
+
+def is_current(model_path, export_dir=None):
+    """True if an export exists and was made from the model file as it is now"""
+    export_dir = export_dir or shared_model_path(model_path)
+    try:
+        with open(os.path.join(export_dir, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+        stat = os.stat(model_path)
+    except (OSError, ValueError):
+        return False
+    return (manifest.get('version') == SHARED_MODEL_VERSION
+            and manifest.get('source') == [stat.st_size, stat.st_mtime_ns])
+
+
+class SharedModelPredictor:
+    """Tree-ensemble inference over memory-mapped arrays.
+
+    Mirrors VolvoServicePredictor.predict_service_time and predict_batch:
+    labels are encoded with the training classes (unseen ones as code 0),
+    numerical columns are standardised, and the forest's output is
+    clamped at zero.
+    """
+
+    def __init__(self, export_dir):
+        with open(os.path.join(export_dir, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != SHARED_MODEL_VERSION:
+            raise ValueError(f"Unsupported shared model version {manifest.get('version')} in {export_dir}")
+        self.export_dir = export_dir
+        self.arrays = {name: np.load(os.path.join(export_dir, f'{name}.npy'), mmap_mode='r')
+                       for name in ARRAY_NAMES}
+        self.feature_columns = manifest['feature_columns']
+        self.numerical_indices = np.array(manifest['numerical_indices'])
+        self.codes = {column: {label: code for code, label in enumerate(classes)}
+                      for column, classes in manifest['classes'].items()}
+        self.base_score = np.float32(manifest['base_score'])
+        self.depth = manifest['depth']
+        self.metadata = manifest.get('metadata', {})
+
+    def _scale(self, X):
+        """StandardScaler.transform of the numerical columns, in place, in float32 like sklearn"""
+        X[:, self.numerical_indices] = (
+            (X[:, self.numerical_indices] - self.arrays['scaler_mean']) / self.arrays['scaler_scale'])
+        return X
+
+    def _forest(self, X):
+        """Raw ensemble output for an encoded, scaled float32 matrix"""
+        a = self.arrays
+        out = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), BLOCK_ROWS):
+            block = X[start:start + BLOCK_ROWS]
+            rows = np.arange(len(block))[:, None]
+            node = np.broadcast_to(a['roots'], (len(block), len(a['roots'])))
+            for _ in range(self.depth):
+                value = block[rows, a['feature'][node]]
+                # XGBoost sends x < threshold left, and missing values the default way
+                go_left = np.where(np.isnan(value), a['default_left'][node], value < a['threshold'][node])
+                node = np.where(go_left, a['left'][node], a['right'][node])
+            out[start:start + len(block)] = a['leaf_value'][node].sum(axis=1, dtype=np.float32)
+        return out + self.base_score
+
+    def predict_service_time(self, input_features):
+        """Predict service time for one dataset-style row"""
+        X = np.empty((1, len(self.feature_columns)), dtype=np.float32)
+        for i, column in enumerate(self.feature_columns):
+            codes = self.codes.get(column)
+            if codes is None:
+                X[0, i] = input_features[column]
+            elif input_features[column] in codes:
+                X[0, i] = codes[input_features[column]]
+            else:
+                print(f"Warning: Unknown category '{input_features[column]}' for {column}")
+                X[0, i] = 0
+        return max(0, float(self._forest(self._scale(X))[0]))
+
+    def encode_batch(self, df):
+        """Encoded and scaled float32 feature matrix for a DataFrame of raw rows"""
+        X = np.empty((len(df), len(self.feature_columns)), dtype=np.float32)
+        for i, column in enumerate(self.feature_columns):
+            codes = self.codes.get(column)
+            if codes is None:
+                X[:, i] = df[column].to_numpy(dtype=np.float32)
+            else:
+                X[:, i] = df[column].map(codes).fillna(0).to_numpy(dtype=np.float32)
+        return self._scale(X)
+
+    def predict_batch(self, df):
+        """Vectorised predict_service_time for every row of a DataFrame"""
+        return np.maximum(self._forest(self.encode_batch(df)), 0)
+
+    def mapped_bytes(self):
+        return int(sum(array.nbytes for array in self.arrays.values()))
@@ -0,0 +1,182 @@
+"""Service-time prediction with the trained model first and the heuristic as a safety net.
+
+TieredPredictor sends each call to the primary (ML) model on a small thread
+pool and waits at most `budget_ms` for the answer. If the model is slow,
+raises, has no free thread, or the circuit breaker is open, the call is
+answered by ServiceTimePredictor instead. Every result names the tier that
+produced it, so responses and metrics show how often the fallback serves.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from utils.model_predictor import ServiceTimePredictor, dataset_row_from_features
+from utils.shared_model import SharedModelPredictor, is_current, shared_model_path
+
+MODEL_TIER = 'model'
+HEURISTIC_TIER = 'heuristic'
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency until a cool-down has passed.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    allow() returns False. Once `reset_seconds` have passed it goes half
+    open and lets one trial call through. A success closes it again; a
+    failure re-opens it for another cool-down.
+    """
+
+    def __init__(self, failure_threshold=5, reset_seconds=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go to the protected dependency now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print("Circuit breaker closed: primary model recovered")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"Circuit breaker opened after {self.failures} failures")
+                self.state = OPEN
+                self.opened_at = self.clock()
+                self._trial_in_flight = False
+
+    def record_skipped(self):
+        """The allowed call never reached the dependency: count nothing, free the trial"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def status(self):
+        return {'state': self.state, 'consecutive_failures': self.failures}
+
+
+def load_model_predictor(model_path, shared=True):
+    """predict(features) for a trained model file, or None if it can't be loaded.
+
+    With `shared`, a current export made by models/export_shared_model.py is
+    served from memory-mapped arrays that all workers share. Without one,
+    the pickle is loaded into this process.
+    """
+    if not os.path.exists(model_path):
+        print(f"No trained model at {model_path}; using the heuristic predictor")
+        return None
+    try:
+        if shared and is_current(model_path):
+            model = SharedModelPredictor(shared_model_path(model_path))
+            print(f"Serving {model_path} from shared memory-mapped weights ({model.export_dir})")
+        else:
+            if shared:
+                print(f"No current shared export of {model_path}; loading the pickle "
+                      "(run python -m models.export_shared_model)")
+            from models.train_model import VolvoServicePredictor
+            model = VolvoServicePredictor().load_model(model_path)
+    except Exception as e:
+        print(f"ML model unavailable ({model_path}): {e}; using the heuristic predictor")
+        return None
+
+    def predict(features):
+        return float(model.predict_service_time(dataset_row_from_features(features)))
+    return predict
+
+
+class TieredPredictor:
+    """Primary model under a latency budget, with heuristic fallback and a circuit breaker"""
+
+    def __init__(self, primary=None, fallback=None, budget_ms=25.0, breaker=None, max_workers=4):
+        self.primary = primary
+        self.fallback = fallback or ServiceTimePredictor()
+        self.budget = budget_ms / 1000.0
+        self.breaker = breaker or CircuitBreaker()
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='predictor') if primary else None
+        # A call that can't get a thread at once falls back instead of
+        # queueing behind a stalled model
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self.fallbacks = {}
+        self._lock = threading.Lock()
+
+    def _call_primary(self, features):
+        try:
+            return self.primary(features)
+        finally:
+            self._slots.release()
+
+    def _primary(self, features):
+        """(hours, None) from the primary model, or (None, reason it was skipped)"""
+        if self.primary is None:
+            return None, 'no_model'
+        if not self.breaker.allow():
+            return None, 'circuit_open'
+        if not self._slots.acquire(blocking=False):
+            # Every slot is busy with a call still running: that is load,
+            # not a failing model, so it doesn't count against the breaker
+            self.breaker.record_skipped()
+            return None, 'saturated'
+
+        future = self._executor.submit(self._call_primary, features)
+        try:
+            hours = future.result(timeout=self.budget)
+        except FutureTimeoutError:
+            self.breaker.record_failure()
+            return None, 'timeout'
+        except Exception as e:
+            print(f"Primary model failed: {e}")
+            self.breaker.record_failure()
+            return None, 'error'
+        self.breaker.record_success()
+        return hours, None
+
+    def _serve(self, features, fallback_method):
+        hours, reason = self._primary(features)
+        if reason is None:
+            return round(max(1.0, hours), 1), MODEL_TIER, None
+        with self._lock:
+            self.fallbacks[reason] = self.fallbacks.get(reason, 0) + 1
+        return fallback_method(features), HEURISTIC_TIER, reason
+
+    def predict(self, features):
+        """(hours, tier, fallback reason or None) for a booking"""
+        return self._serve(features, self.fallback.predict)
+
+    def quote(self, features):
+        """As predict, but the heuristic tier is the jitter-free estimate"""
+        return self._serve(features, self.fallback.quote)
+
+    def status(self):
+        return {
+            'primary': self.primary is not None,
+            'budget_ms': self.budget * 1000,
+            'circuit': self.breaker.status(),
+            'fallbacks': self.fallbacks.copy()
+        }